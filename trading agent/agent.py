@@ -4,21 +4,45 @@ Core AI Trading Agent with metabolism and survival mechanics
 """
 import time
 import json
+import uuid
 import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from trading import CryptoComTrader
-from strategy import get_strategy
+from strategy import get_strategy, SignalCache
+from metrics import get_agent_metrics
+from profiler import install_signal_handler
+from agent_http import start_agent_server
+from log_pipeline import flush_logging
+from scheduler import HeartbeatScheduler
+from events import MarketEventSource, EventPipeline
+from position_book import PositionBook, LONG
+from exit_engine import ExitEngine
+from screener import UniverseScreener
+from checkpoint import Checkpointer
+from trade_journal import get_trade_journal
+from price_service import PriceService
+from price_oracle import get_price_oracle
 from config import *
 
 logger = logging.getLogger(__name__)
 
+BANNER = "=" * 80
+
 
 class TradingAgent:
     """AI Trading Agent with life mechanics"""
     
-    def __init__(self, name: str = "Agent"):
+    def __init__(self, name: str = "Agent",
+                 strategy_type: str = STRATEGY_TYPE,
+                 confidence_threshold: float = 0.70,
+                 survival_confidence_threshold: float = 0.85,
+                 price_service: Optional[PriceService] = None):
         self.name = name
+        self.confidence_threshold = confidence_threshold
+        self.survival_confidence_threshold = survival_confidence_threshold
         self.gmac = INITIAL_GMAC
         self.goodwill = INITIAL_GOODWILL
         self.alive = True
@@ -27,7 +51,19 @@ class TradingAgent:
         
         # Trading components
         self.trader = CryptoComTrader()
-        self.strategy = get_strategy(STRATEGY_TYPE)
+        self.strategy = get_strategy(strategy_type)
+        self.signal_cache = SignalCache()
+        self.screener = UniverseScreener(self.trader) if SCREENER_ENABLED else None
+        self._screener_refreshes_billed = 0
+        self._book_fetches_billed = 0
+        self._fetched_symbols: List[str] = []  # requested by the last prefetch, billed by the next fetch
+        self.fetch_cost_share = 1.0  # fraction of fetch GMAC paid (a swarm splits one feed)
+        self.coordinator = None  # CoordinatorClient when running as part of a multi-host swarm
+        self.tradable: Optional[List[str]] = None  # entry universe set by a swarm node (its assigned symbols)
+        
+        # Marks, exits and sizing read consolidated quotes; this agent's tickers feed them
+        self.price_service = price_service or PriceService({})
+        self.price_venue = "cryptocom"
         
         # Statistics
         self.heartbeats = 0
@@ -37,78 +73,198 @@ class TradingAgent:
         self.total_pnl = 0.0
         self.daily_pnl = 0.0
         self.daily_trades = 0
-        self.positions = []
+        self.positions = PositionBook()
+        self.exit_engine = ExitEngine(PROFIT_TARGET, STOP_LOSS)
+        self._pnl_day = datetime.now().date()
+        
+        # USD valuation shares the dashboard's oracle so both report the same numbers
+        self.oracle = get_price_oracle()
+        self.equity_usd = 0.0
+        self.pnl_usd = 0.0
+        self.realized_pnl_usd = 0.0
+        
+        # Instrumentation (served by this process's agent_http endpoint)
+        self.metrics = get_agent_metrics(self.name)
+        
+        # Guards agent state when stages run on separate threads (event mode)
+        self._state_lock = threading.RLock()
         
-        logger.info(f"Agent {self.name} initialized with {self.gmac} GMAC")
+        # Crash recovery (see enable_checkpointing)
+        self.checkpointer: Optional[Checkpointer] = None
+        
+        # Durable trade history for the dashboard (writes are batched off-thread)
+        self.trade_journal = get_trade_journal() if TRADE_JOURNAL_ENABLED else None
+        
+        logger.info("Agent %s initialized with %s GMAC", self.name, self.gmac)
+    
+    @contextmanager
+    def _phase(self, name: str):
+        """Time a heartbeat phase and attribute its API calls"""
+        calls_before = self.trader.thread_api_calls
+        try:
+            with self.metrics.phase(name):
+                yield
+        finally:
+            self.metrics.count_api_calls(name, self.trader.thread_api_calls - calls_before)
+    
+    def _spend_gmac(self, amount: float, phase: str):
+        """Consume GMAC and attribute it to a heartbeat phase"""
+        self.gmac -= amount
+        self.metrics.spend_gmac(phase, amount)
+        if self.trade_journal is not None:
+            self.trade_journal.record_gmac(self.name, phase, amount)
     
-    def heartbeat(self) -> bool:
-        """Process one heartbeat cycle"""
+    def heartbeat(self, market_data: Optional[Dict] = None) -> bool:
+        """Process one heartbeat cycle
+        
+        market_data may be a snapshot prefetched by the scheduler; when None
+        the data is fetched inline.
+        """
         if not self.alive:
             return False
         
+        with self._phase("heartbeat"):
+            alive = self._heartbeat(market_data)
+        if self.checkpointer is not None:
+            with self._phase("checkpoint"):
+                self._checkpoint()
+        return alive
+    
+    def _heartbeat(self, market_data: Optional[Dict] = None) -> bool:
+        """Heartbeat body - timed as a whole by heartbeat()"""
         self.heartbeats += 1
-        self.gmac -= GMAC_HEARTBEAT_COST
+        self._spend_gmac(GMAC_HEARTBEAT_COST, "heartbeat")
+        self._roll_day()
         
-        logger.info(f"\n{'='*80}")
-        logger.info(f"HEARTBEAT #{self.heartbeats} - Agent: {self.name}")
-        logger.info(f"GMAC: {self.gmac:.2f} | Goodwill: {self.goodwill}")
-        logger.info(f"Trades: {self.trades_executed} (W:{self.winning_trades} L:{self.losing_trades})")
-        logger.info(f"P&L: ${self.total_pnl:.2f} (Today: ${self.daily_pnl:.2f})")
+        logger.info("\n%s", BANNER)
+        logger.info("HEARTBEAT #%d - Agent: %s", self.heartbeats, self.name)
+        logger.info("GMAC: %.2f | Goodwill: %s", self.gmac, self.goodwill)
+        logger.info("Trades: %d (W:%d L:%d)",
+                    self.trades_executed, self.winning_trades, self.losing_trades)
+        logger.info("Equity: $%.2f | P&L: $%.2f (Today: $%.2f)", self.equity_usd, self.pnl_usd, self.daily_pnl)
         
         # Check survival status
-        self._check_survival_status()
+        with self._phase("survival"):
+            self._check_survival_status()
         
         if not self.alive:
             return False
         
         # Get market data
-        market_data = self._fetch_market_data()
+        with self._phase("fetch"):
+            market_data = self._fetch_market_data(market_data)
+        
+        # Revalue open positions
+        with self._phase("mark"):
+            prices = self._mark_positions(market_data)
+        
+        # Take-profit / stop-loss exits run even in critical mode
+        with self._phase("exits"):
+            self._process_exits(prices)
         
         # Analyze and trade
         if not self.critical_mode:
-            signal = self._analyze_market(market_data)
-            self._execute_trade_decision(signal)
+            with self._phase("analyze"):
+                entries = set(self._entry_symbols())
+                signal = self._analyze_market({symbol: data for symbol, data in market_data.items()
+                                               if symbol in entries})
+            with self._phase("execute"):
+                self._execute_trade_decision(signal)
         else:
             logger.warning("Critical mode - skipping trading to conserve GMAC")
         
-        logger.info("="*80)
+        logger.info(BANNER)
         return True
     
     def _check_survival_status(self):
         """Check and update survival status"""
         if self.gmac <= GMAC_DEATH_THRESHOLD:
             self.alive = False
-            logger.error(f"Agent {self.name} has died - GMAC depleted")
+            logger.error("Agent %s has died - GMAC depleted", self.name)
             return
         
         if self.gmac <= GMAC_CRITICAL_THRESHOLD:
             if not self.critical_mode:
                 self.critical_mode = True
-                logger.error(f"CRITICAL MODE - GMAC: {self.gmac:.2f}")
+                logger.error("CRITICAL MODE - GMAC: %.2f", self.gmac)
         elif self.gmac <= GMAC_SURVIVAL_THRESHOLD:
             if not self.survival_mode:
                 self.survival_mode = True
-                logger.warning(f"SURVIVAL MODE - GMAC: {self.gmac:.2f}")
+                logger.warning("SURVIVAL MODE - GMAC: %.2f", self.gmac)
         else:
             self.survival_mode = False
             self.critical_mode = False
     
-    def _fetch_market_data(self) -> Dict:
-        """Fetch market data and consume GMAC"""
-        self.gmac -= GMAC_API_CALL_COST * len(TRADING_PAIRS)
-        logger.debug(f"Fetching market data... (GMAC: {self.gmac:.2f})")
-        return self.trader.get_market_data(TRADING_PAIRS)
+    def _fetch_market_data(self, prefetched: Optional[Dict] = None) -> Dict:
+        """Fetch market data (unless prefetched) and consume GMAC"""
+        if prefetched is None:
+            logger.debug("Fetching market data... (GMAC: %.2f)", self.gmac)
+            prefetched = self.prefetch_market_data()
+        self._bill_fetch(prefetched)
+        return prefetched
+    
+    def _bill_fetch(self, market_data: Dict):
+        """Charge for the symbols the last prefetch requested (a snapshot fetched elsewhere - a swarm's - by its size)"""
+        fetched = len(self._fetched_symbols) if self._fetched_symbols else len(market_data)
+        self._fetched_symbols = []
+        self._spend_gmac(self._fetch_cost(fetched), "fetch")
+    
+    def _entry_symbols(self) -> List[str]:
+        """Symbols the strategy may open new positions in"""
+        if self.tradable is not None:
+            return self.tradable
+        return self.screener.current if self.screener is not None else TRADING_PAIRS
+    
+    def _held_symbols(self) -> List[str]:
+        return sorted({position["symbol"] for position in self.positions.open_positions()})
+    
+    def prefetch_market_data(self) -> Dict:
+        """Fetch the next heartbeat's market data (the scheduler runs it between heartbeats, never during one)
+        
+        Symbols still held are fetched even after they leave the screener's
+        candidates, so their positions keep being marked and exit-checked.
+        """
+        symbols = list(self.screener.candidates() if self.screener is not None else TRADING_PAIRS)
+        symbols += [symbol for symbol in self._held_symbols() if symbol not in symbols]
+        self._fetched_symbols = symbols
+        return self.trader.get_market_data(symbols)
+    
+    def scheduled_prefetch(self) -> Dict:
+        """prefetch_market_data for the scheduler's worker thread, its API calls reported as "prefetch" """
+        calls_before = self.trader.thread_api_calls
+        try:
+            return self.prefetch_market_data()
+        finally:
+            self.metrics.count_api_calls("prefetch", self.trader.thread_api_calls - calls_before)
+    
+    def _fetch_cost(self, symbols: int) -> float:
+        """GMAC for fetching `symbols` symbols, plus any screener scans and order book fetches since the last one"""
+        book_fetches = self.trader.book_fetches - self._book_fetches_billed
+        self._book_fetches_billed = self.trader.book_fetches
+        scans = 0
+        if self.screener is not None:
+            scans = self.screener.refreshes - self._screener_refreshes_billed
+            self._screener_refreshes_billed = self.screener.refreshes
+        return GMAC_API_CALL_COST * (symbols + scans + book_fetches) * self.fetch_cost_share
     
     def _analyze_market(self, market_data: Dict) -> Dict:
-        """Analyze market and generate signal"""
-        self.gmac -= GMAC_INFERENCE_BASE_COST
-        signal = self.strategy.analyze(market_data)
+        """Analyze market and generate signal (memoized on unchanged candles)"""
+        key = self.signal_cache.key(self.strategy, market_data)
+        signal = self.signal_cache.get(key)
+        if signal is None:
+            self._spend_gmac(GMAC_INFERENCE_BASE_COST, "analyze")
+            signal = self.strategy.analyze(market_data)
+            self.signal_cache.put(key, signal)
+            self.metrics.increment("signal_cache_miss")
+        else:
+            self.metrics.increment("signal_cache_hit")
+            logger.debug("Signal cache hit (hit rate %.1f%%)", self.signal_cache.hit_rate * 100)
         
         if signal.get("action") != "HOLD":
-            logger.info(f"Signal: {signal['action']} {signal.get('symbol')} "
-                       f"(confidence: {signal['confidence']:.1%})")
-            if signal.get("reasons"):
-                logger.info(f"   Reasons: {', '.join(signal['reasons'])}")
+            logger.info("Signal: %s %s (confidence: %.1f%%)",
+                        signal['action'], signal.get('symbol'), signal['confidence'] * 100)
+            if signal.get("reasons") and logger.isEnabledFor(logging.INFO):
+                logger.info("   Reasons: %s", ', '.join(signal['reasons']))
         
         return signal
     
@@ -118,13 +274,13 @@ class TradingAgent:
             logger.info("No trade signal")
             return
         
-        confidence_threshold = 0.70
+        confidence_threshold = self.confidence_threshold
         if self.survival_mode:
-            confidence_threshold = 0.85
+            confidence_threshold = self.survival_confidence_threshold
         
         if signal.get("confidence", 0) < confidence_threshold:
-            logger.info(f"Signal confidence {signal['confidence']:.1%} "
-                       f"below threshold {confidence_threshold:.1%}")
+            logger.info("Signal confidence %.1f%% below threshold %.1f%%",
+                        signal['confidence'] * 100, confidence_threshold * 100)
             return
         
         # Execute trade
@@ -132,11 +288,11 @@ class TradingAgent:
     
     def _execute_trade(self, signal: Dict):
         """Execute a trade"""
-        self.gmac -= GMAC_TRADE_COST
+        self._spend_gmac(GMAC_TRADE_COST, "execute")
         
         symbol = signal["symbol"]
         side = signal["action"]
-        price = signal["price"]
+        price = self._quote_price(symbol, side, signal["price"])
         
         # Calculate position size
         balance = self.trader.get_balance()
@@ -150,28 +306,352 @@ class TradingAgent:
         trade_amount = available * position_size_pct
         quantity = trade_amount / price
         
+        # Never take more than the book can fill near the touch
+        book = getattr(self.trader, "order_books", {}).get(symbol)
+        if book is not None and len(book):
+            quantity = min(quantity, book.quantity_within(side, MAX_ENTRY_SLIPPAGE))
+        
         # Execute order
-        result = self.trader.place_order(symbol, side, "MARKET", quantity, price)
+        result = self._place_order(symbol, side, quantity, price)
         
         if result.get("success"):
             self.trades_executed += 1
             self.daily_trades += 1
-            logger.info(f"TRADE EXECUTED: {side} {quantity:.6f} {symbol} @ ${price:.2f}")
+            fill_price = result.get("price", price)
+            fill_quantity = result.get("quantity", quantity)
+            logger.info("TRADE EXECUTED: %s %.6f %s @ $%.2f", side, fill_quantity, symbol, fill_price)
             
             # Track position
-            self.positions.append({
-                "symbol": symbol,
-                "side": side,
-                "entry_price": price,
-                "quantity": quantity,
-                "timestamp": time.time()
-            })
+            opened, closes = self._record_fill(symbol, side, fill_price, fill_quantity)
+            self._journal_trade(symbol, side, fill_price, fill_quantity, result.get("fee", 0.0), closes,
+                                opened=opened)
             
             # Earn goodwill
             self.goodwill += GOODWILL_TASK_COMPLETE
-            logger.info(f"Goodwill: {self.goodwill} (+{GOODWILL_TASK_COMPLETE})")
+            logger.info("Goodwill: %s (+%s)", self.goodwill, GOODWILL_TASK_COMPLETE)
+            self._journal("fill", durable=True, symbol=symbol, side=side, price=fill_price,
+                          quantity=fill_quantity, fee=result.get("fee", 0.0))
+        else:
+            logger.error("Trade failed: %s", result.get('error'))
+    
+    def _place_order(self, symbol: str, side: str, quantity: float, price: float) -> Dict:
+        """Market order, claimed through the swarm coordinator when one is attached
+        
+        The claim keeps another node from trading the same wallet/symbol at
+        the same time; a market order has filled or failed when place_order
+        returns, so the claim is released right after.
+        """
+        if self.coordinator is None:
+            return self.trader.place_order(symbol, side, "MARKET", quantity, price)
+        
+        client_order_id = f"{self.coordinator.node_id}:{self.name}:{uuid.uuid4().hex[:12]}"
+        try:
+            claimed = self.coordinator.claim_order(COORDINATOR_WALLET, symbol, side, client_order_id)
+        except OSError as e:
+            return {"success": False, "error": f"coordinator unreachable: {e}"}
+        if not claimed:
+            return {"success": False, "error": f"{symbol} order claim rejected by coordinator"}
+        try:
+            return self.trader.place_order(symbol, side, "MARKET", quantity, price)
+        finally:
+            try:
+                self.coordinator.release_order(COORDINATOR_WALLET, symbol, client_order_id)
+            except OSError as e:
+                # the claim lapses after COORDINATOR_ORDER_WINDOW anyway
+                logger.warning("Could not release order %s: %s", client_order_id, e)
+    
+    def _record_fill(self, symbol: str, side: str, price: float, quantity: float) -> Tuple[Optional[int], List[Dict]]:
+        """Open (BUY) or close (SELL, FIFO) positions and realize P&L
+        
+        Returns the uid of the position a BUY opened and the position fills a SELL settled.
+        """
+        opened, fills = None, []
+        if side == "BUY":
+            position_id = self.positions.open(symbol, LONG, price, quantity)
+            self.exit_engine.register(position_id, symbol, price)
+            opened = self.positions.get(position_id)["uid"]
+        else:
+            fills = self.positions.reduce(symbol, quantity, price)
+            for fill in fills:
+                if fill["closed"]:
+                    self.exit_engine.unregister(fill["position_id"])
+                self._on_position_closed(symbol, fill)
+        self.total_pnl = self.positions.total_pnl
+        return opened, fills
+    
+    def _journal_trade(self, symbol: str, side: str, price: float, quantity: float,
+                       fee: float, closes: List[Dict], reason: Optional[str] = None,
+                       opened: Optional[int] = None):
+        if self.trade_journal is not None:
+            self.trade_journal.record_fill(self.name, symbol, side, quantity, price, fee, closes,
+                                           strategy=self.strategy.name, reason=reason, opened=opened)
+    
+    def _on_position_closed(self, symbol: str, fill: Dict):
+        """Book realized P&L and goodwill for a closed position"""
+        self.daily_pnl += fill["pnl"]
+        self._book_realized_usd(symbol, fill["pnl"])
+        self.winning_trades = self.positions.wins
+        self.losing_trades = self.positions.losses
+        
+        if fill["pnl_pct"] > PROFIT_TARGET:
+            self.goodwill += GOODWILL_PROFITABLE_TRADE
+        elif fill["pnl_pct"] < -STOP_LOSS:
+            self.goodwill += GOODWILL_BAD_TRADE
+        logger.info("CLOSED: %.6f %s @ $%.2f (P&L $%.2f, %.2f%%)",
+                    fill["quantity"], symbol, fill["exit_price"], fill["pnl"], fill["pnl_pct"] * 100)
+    
+    def _quote_price(self, symbol: str, side: str, fallback: float) -> float:
+        """Price a market order would pay: best ask to buy, best bid to sell"""
+        best = self.price_service.best(symbol)
+        if best is None:
+            return fallback
+        return best["ask"] if side == "BUY" else best["bid"]
+    
+    def _mark_prices(self, market_data: Dict) -> Dict[str, float]:
+        """Consolidated mid per symbol from the price service, the ticker's last when it has none"""
+        self.price_service.ingest(self.price_venue, [data["ticker"] for data in market_data.values()
+                                                     if data.get("ticker")])
+        prices = {}
+        for symbol, data in market_data.items():
+            price = self.price_service.mid(symbol)
+            if price is None and data.get("ticker"):
+                price = data["ticker"]["last"]
+            if price:
+                prices[symbol] = price
+        return prices
+    
+    def _mark_positions(self, market_data: Dict) -> Dict[str, float]:
+        """Mark every open position to the price service's latest prices"""
+        prices = self._mark_prices(market_data)
+        self.positions.mark_to_market(prices)
+        self.total_pnl = self.positions.total_pnl
+        self._value_account()
+        return prices
+    
+    def _value_account(self) -> Dict:
+        """Paper balances and P&L in USD from the shared price oracle (the dashboard's valuation)"""
+        account = self.oracle.value(self.trader.get_balance())
+        unrealized, unpriced = 0.0, list(account["unpriced"])
+        for position in self.positions.open_positions():
+            base, quote = position["symbol"].split("_")
+            base_usd, quote_usd = self.oracle.price(base), self.oracle.price(quote)
+            if base_usd is None or quote_usd is None:
+                unpriced.append(position["symbol"])
+                continue
+            direction = 1 if position["side"] == "BUY" else -1
+            unrealized += (base_usd - position["entry_price"] * quote_usd) * position["quantity"] * direction
+        self.equity_usd = account["total_usd"]
+        self.pnl_usd = self.realized_pnl_usd + unrealized
+        return {
+            "assets": account["assets"],
+            "total_usd": self.equity_usd,
+            "realized_usd": self.realized_pnl_usd,
+            "unrealized_usd": unrealized,
+            "pnl_usd": self.pnl_usd,
+            "unpriced": unpriced
+        }
+    
+    def _book_realized_usd(self, symbol: str, pnl: float):
+        """Add a close's P&L (quote currency) to the USD total at the oracle's current rate"""
+        quote_usd = self.oracle.price(symbol.split("_")[1])
+        if quote_usd is None:
+            logger.warning("No USD price for %s - realized P&L left out of the USD total", symbol)
+            return
+        self.realized_pnl_usd += pnl * quote_usd
+    
+    def _process_exits(self, prices: Dict[str, float]):
+        """Close positions whose take-profit or stop-loss level was crossed"""
+        for exit_order in self.exit_engine.check(prices):
+            self._execute_exit(exit_order)
+    
+    def _execute_exit(self, exit_order: Dict):
+        """Sell one triggered position - no signal or inference involved"""
+        position_id = exit_order["position_id"]
+        position = self.positions.get(position_id)
+        if not position["open"]:
+            return
+        
+        self._spend_gmac(GMAC_TRADE_COST, "exits")
+        symbol = position["symbol"]
+        price = self._quote_price(symbol, "SELL", exit_order["price"])
+        result = self._place_order(symbol, "SELL", position["quantity"], price)
+        if not result.get("success"):
+            logger.error("Exit failed: %s", result.get('error'))
+            self.exit_engine.register(position_id, symbol, position["entry_price"])
+            return
+        
+        self.trades_executed += 1
+        self.daily_trades += 1
+        fill = self.positions.settle(position_id, result.get("price", price),
+                                     result.get("quantity", position["quantity"]))
+        if not fill["closed"]:
+            self.exit_engine.register(position_id, symbol, position["entry_price"])
+        self.metrics.increment("exit_" + exit_order["reason"])
+        logger.info("EXIT (%s): level $%.2f crossed at $%.2f",
+                    exit_order["reason"], exit_order["level"], exit_order["price"])
+        self._on_position_closed(symbol, fill)
+        self.total_pnl = self.positions.total_pnl
+        self._journal_trade(symbol, "SELL", fill["exit_price"], fill["quantity"], result.get("fee", 0.0),
+                            [fill], reason=exit_order["reason"])
+        self._journal("exit", durable=True, position_id=position_id, symbol=symbol,
+                      price=fill["exit_price"], quantity=fill["quantity"], fee=result.get("fee", 0.0))
+    
+    def _roll_day(self):
+        """Reset daily counters when the calendar day changes"""
+        today = datetime.now().date()
+        if today != self._pnl_day:
+            self._pnl_day = today
+            self.daily_pnl = 0.0
+            self.daily_trades = 0
+    
+    def get_state(self) -> Dict:
+        """Full agent, position book and paper account state (JSON-serializable)"""
+        return {
+            "scalars": self._scalars(),
+            "positions": self.positions.get_state(),
+            "trader": self.trader.get_state()
+        }
+    
+    def set_state(self, state: Dict):
+        self.positions.set_state(state["positions"])
+        self.trader.set_state(state["trader"])
+        self._set_scalars(state["scalars"])
+    
+    def _scalars(self) -> Dict:
+        return {
+            "gmac": self.gmac,
+            "goodwill": self.goodwill,
+            "alive": self.alive,
+            "survival_mode": self.survival_mode,
+            "critical_mode": self.critical_mode,
+            "heartbeats": self.heartbeats,
+            "trades_executed": self.trades_executed,
+            "daily_pnl": self.daily_pnl,
+            "daily_trades": self.daily_trades,
+            "realized_pnl_usd": self.realized_pnl_usd,
+            "pnl_day": self._pnl_day.isoformat()
+        }
+    
+    def _set_scalars(self, scalars: Dict):
+        for key, value in scalars.items():
+            if key == "pnl_day":
+                self._pnl_day = datetime.fromisoformat(value).date()
+            else:
+                setattr(self, key, value)
+        self.winning_trades = self.positions.wins
+        self.losing_trades = self.positions.losses
+        self.total_pnl = self.positions.total_pnl
+    
+    def enable_checkpointing(self, directory: str = CHECKPOINT_DIR) -> bool:
+        """Restore the latest checkpoint (if any), then checkpoint every heartbeat
+        
+        Returns True when previous state was recovered.
+        """
+        checkpointer = Checkpointer(self.name, directory)
+        state, events = checkpointer.restore()
+        
+        # Warm start: candle windows resume and only the gap since the save is fetched
+        candles = checkpointer.load_file("candles")
+        if candles is not None:
+            self.trader.candle_aggregator.set_state(candles)
+        if state is not None:
+            self.set_state(state)
+        for event in events:
+            self._replay(event)
+        
+        # Exit levels derive from open positions, so they are rebuilt, not stored
+        self.exit_engine = ExitEngine(PROFIT_TARGET, STOP_LOSS)
+        for position in self.positions.open_positions():
+            self.exit_engine.register(position["id"], position["symbol"], position["entry_price"])
+        
+        self.checkpointer = checkpointer
+        restored = state is not None or bool(events)
+        if restored:
+            logger.info("Restored %s: GMAC %.2f, %d open position(s), %d journal event(s) replayed",
+                        self.name, self.gmac, len(self.positions), len(events))
+            checkpointer.snapshot(self.get_state())
+        return restored
+    
+    def _replay(self, event: Dict):
+        """Re-apply one journaled event on top of the restored state"""
+        if event["t"] == "fill":
+            self.trader.apply_paper_fill(event["symbol"], event["side"], event["quantity"],
+                                         event["price"], event["fee"])
+            self._record_fill(event["symbol"], event["side"], event["price"], event["quantity"])
+        elif event["t"] == "exit":
+            self.trader.apply_paper_fill(event["symbol"], "SELL", event["quantity"],
+                                         event["price"], event["fee"])
+            self.positions.settle(event["position_id"], event["price"], event["quantity"])
+        self._set_scalars(event["s"])
+    
+    def _journal(self, event_type: str, durable: bool = False, **fields):
+        if self.checkpointer is not None:
+            self.checkpointer.record(event_type, durable=durable, s=self._scalars(), **fields)
+    
+    def _checkpoint(self):
+        """Snapshot every CHECKPOINT_INTERVAL heartbeats, journal the scalars otherwise"""
+        if self.heartbeats % CHECKPOINT_INTERVAL == 0:
+            self.checkpointer.snapshot(self.get_state())
+            self.checkpointer.save_file("candles", self.trader.candle_aggregator.get_state())
         else:
-            logger.error(f"Trade failed: {result.get('error')}")
+            self._journal("hb")
+    
+    def run_event_driven(self, duration: Optional[float] = None,
+                         poll_interval: float = EVENT_POLL_INTERVAL) -> Dict:
+        """Event-driven mode: analyze only on candle closes and large price moves
+        
+        Each poll still pays the heartbeat and API call metabolism, but
+        inference (GMAC_INFERENCE_BASE_COST) and trading only happen when the
+        ingestion stage emits an event for a symbol.
+        """
+        source = MarketEventSource(EVENT_PRICE_MOVE_THRESHOLD)
+        latest = {"market_data": {}}
+        pipeline = None
+        
+        def ingest():
+            with self._state_lock:
+                if not self.alive:
+                    pipeline.stop()
+                    return []
+                self.heartbeats += 1
+                self._spend_gmac(GMAC_HEARTBEAT_COST, "heartbeat")
+                self._roll_day()
+                self._check_survival_status()
+                if not self.alive:
+                    pipeline.stop()
+                    return []
+                critical = self.critical_mode
+            with self._phase("event_ingest"):
+                market_data = self.prefetch_market_data()
+                with self._state_lock:
+                    self._bill_fetch(market_data)
+                    prices = self._mark_positions(market_data)
+                    self._process_exits(prices)
+                    if self.checkpointer is not None:
+                        self._checkpoint()
+                latest["market_data"] = market_data
+                events = source.detect(market_data)
+            if critical:
+                return []
+            return events
+        
+        def analyze(events):
+            symbols = {event["symbol"] for event in events} & set(self._entry_symbols())
+            market_data = latest["market_data"]
+            subset = {symbol: market_data[symbol] for symbol in symbols if symbol in market_data}
+            if not subset:
+                return None
+            logger.debug("Analyzing %d event(s) for %s", len(events), sorted(symbols))
+            with self._state_lock, self._phase("analyze"):
+                return self._analyze_market(subset)
+        
+        def execute(signal):
+            with self._state_lock, self._phase("execute"):
+                self._execute_trade_decision(signal)
+        
+        pipeline = EventPipeline(ingest, analyze, execute, poll_interval=poll_interval)
+        pipeline.run(duration)
+        return pipeline.stats
 
 
 def run_agent_demo(cycles: int = 5):
@@ -181,14 +661,31 @@ def run_agent_demo(cycles: int = 5):
     print("="*80)
     
     agent = TradingAgent("Demo-Agent")
+    if CHECKPOINT_ENABLED:
+        agent.enable_checkpointing()
+    install_signal_handler()
+    if AGENT_HTTP_ENABLED:
+        start_agent_server()
+    
+    def tick(market_data: Optional[Dict]) -> bool:
+        logger.info("[Cycle %d/%d]", scheduler.ticks, cycles)
+        if not agent.heartbeat(market_data):
+            logger.info("Agent stopped")
+            return False
+        return True
     
-    for i in range(cycles):
-        print(f"\n[Cycle {i+1}/{cycles}]")
-        if not agent.heartbeat():
-            print("Agent stopped")
-            break
-        time.sleep(2)  # Wait 2 seconds between cycles
+    # Fire every 2 seconds, fetching the next cycle's data in the background
+    prefetch = agent.scheduled_prefetch if HEARTBEAT_PREFETCH else None
+    scheduler = HeartbeatScheduler(2, prefetch=prefetch, metrics=agent.metrics)
+    scheduler.run(tick, max_ticks=cycles)
+    if agent.checkpointer is not None:
+        agent.checkpointer.snapshot(agent.get_state())
+        agent.checkpointer.save_file("candles", agent.trader.candle_aggregator.get_state())
+        agent.checkpointer.close()
+    if agent.trade_journal is not None:
+        agent.trade_journal.flush()
     
+    flush_logging()
     print("\n" + "="*80)
     print("DEMO COMPLETE")
     print("="*80)
@@ -199,4 +696,5 @@ def run_agent_demo(cycles: int = 5):
     print(f"  Heartbeats: {agent.heartbeats}")
     print(f"  Trades: {agent.trades_executed}")
     print(f"  Balance: {agent.trader.get_balance()}")
+    print(f"  Equity: ${agent._value_account()['total_usd']:.2f}")
     print()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Agent-side HTTP endpoint - exposes state that only lives inside the agent process
+"""
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+import metrics
+from profiler import get_profiler
+from config import AGENT_HTTP_PORT, PROFILE_DEFAULT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# (method, path) -> handler(query) returning (status, content type, body)
+Handler = Callable[[Dict[str, str]], Tuple[int, str, str]]
+_routes: Dict[Tuple[str, str], Handler] = {}
+
+
+def route(method: str, path: str):
+    """Register a handler on the agent endpoint"""
+    def register(handler: Handler) -> Handler:
+        _routes[(method, path)] = handler
+        return handler
+    return register
+
+
+@route("GET", "/metrics")
+def _metrics(query: Dict[str, str]) -> Tuple[int, str, str]:
+    return 200, "text/plain; version=0.0.4", metrics.render_prometheus()
+
+
+@route("POST", "/profile")
+def _start_profile(query: Dict[str, str]) -> Tuple[int, str, str]:
+    """Capture the agent thread (registered by install_signal_handler) for ?seconds="""
+    profiler = get_profiler()
+    seconds = float(query.get("seconds", PROFILE_DEFAULT_SECONDS))
+    started = profiler.start(seconds)
+    return 200, "application/json", json.dumps({"started": started, "running": profiler.running,
+                                                "seconds": seconds})
+
+
+@route("GET", "/profile")
+def _profile_status(query: Dict[str, str]) -> Tuple[int, str, str]:
+    profiler = get_profiler()
+    return 200, "application/json", json.dumps({"running": profiler.running,
+                                                "last_report": profiler.last_report})
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    def _dispatch(self, method: str):
+        url = urlparse(self.path)
+        handler = _routes.get((method, url.path))
+        if handler is None:
+            status, content_type, body = 404, "text/plain", "not found\n"
+        else:
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                status, content_type, body = handler(query)
+            except Exception as e:
+                logger.error("Agent endpoint %s %s failed: %s", method, url.path, e)
+                status, content_type, body = 500, "text/plain", f"{e}\n"
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, format, *args):
+        logger.debug("Agent endpoint: " + format, *args)
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_agent_server(port: int = AGENT_HTTP_PORT) -> Optional[ThreadingHTTPServer]:
+    """Serve the agent endpoint on a daemon thread (once per process)
+
+    Returns None when the port is taken - e.g. a second agent process on
+    the same host; the agent runs on without an endpoint.
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", port), _RequestHandler)
+        except OSError as e:
+            logger.warning("Agent endpoint not started on port %d: %s", port, e)
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="agent-http", daemon=True).start()
+        logger.info("Agent endpoint on http://127.0.0.1:%d", port)
+        _server = server
+        return server
+
+
+def stop_agent_server():
+    global _server
+    with _server_lock:
+        if _server is not None:
+            _server.shutdown()
+            _server.server_close()
+            _server = None
@@ -5,25 +5,33 @@ Aggressive Uniswap Trading Agent - Trades more frequently
 import sys
 import time
 import logging
+from contextlib import contextmanager
+from typing import Dict, Optional
 from uniswap_trading import UniswapTrader
-from strategy import get_strategy
+from strategy import get_strategy, SignalCache
+from metrics import get_agent_metrics
+from profiler import install_signal_handler
+from agent_http import start_agent_server
+from log_pipeline import start_logging, stop_logging
+from scheduler import HeartbeatScheduler
+from position_book import PositionBook, LONG
+from exit_engine import ExitEngine
+from trade_journal import get_trade_journal
+from price_service import PriceService
+from price_oracle import get_price_oracle
 from config import *
 
 sys.stdout.reconfigure(encoding='utf-8') if hasattr(sys.stdout, 'reconfigure') else None
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
-
 logger = logging.getLogger(__name__)
 
+BANNER = "=" * 70
+
 
 class AggressiveAgent:
     """Aggressive trading agent for Uniswap"""
     
-    def __init__(self, name: str = "Uniswap-Trader"):
+    def __init__(self, name: str = "Uniswap-Trader", price_service: Optional[PriceService] = None):
         self.name = name
         self.gmac = INITIAL_GMAC
         self.goodwill = INITIAL_GOODWILL
@@ -34,6 +42,11 @@ class AggressiveAgent:
         # Use Uniswap trader
         self.trader = UniswapTrader()
         self.strategy = get_strategy(STRATEGY_TYPE)
+        self.signal_cache = SignalCache()
+        
+        # Marks, exits and sizing read consolidated quotes; this agent's tickers feed them
+        self.price_service = price_service or PriceService({})
+        self.price_venue = "uniswap"
         
         # Statistics
         self.heartbeats = 0
@@ -41,37 +54,95 @@ class AggressiveAgent:
         self.winning_trades = 0
         self.losing_trades = 0
         self.total_pnl = 0.0
-        self.positions = []
+        self.positions = PositionBook()
+        self.exit_engine = ExitEngine(PROFIT_TARGET, STOP_LOSS)
+        self.trade_journal = get_trade_journal() if TRADE_JOURNAL_ENABLED else None
+        
+        # USD valuation shares the dashboard's oracle so both report the same numbers
+        self.oracle = get_price_oracle()
+        self.equity_usd = 0.0
+        self.pnl_usd = 0.0
+        self.realized_pnl_usd = 0.0
+        
+        # Instrumentation (served by this process's agent_http endpoint)
+        self.metrics = get_agent_metrics(self.name)
         
-        logger.info(f"Agent {self.name} initialized | GMAC: {self.gmac} | Platform: Uniswap")
+        logger.info("Agent %s initialized | GMAC: %s | Platform: Uniswap", self.name, self.gmac)
     
-    def heartbeat(self) -> bool:
+    @contextmanager
+    def _phase(self, name: str):
+        """Time a heartbeat phase and attribute its API calls"""
+        calls_before = self.trader.thread_api_calls
+        try:
+            with self.metrics.phase(name):
+                yield
+        finally:
+            self.metrics.count_api_calls(name, self.trader.thread_api_calls - calls_before)
+    
+    def _spend_gmac(self, amount: float, phase: str):
+        """Consume GMAC and attribute it to a heartbeat phase"""
+        self.gmac -= amount
+        self.metrics.spend_gmac(phase, amount)
+        if self.trade_journal is not None:
+            self.trade_journal.record_gmac(self.name, phase, amount)
+    
+    def heartbeat(self, market_data: Optional[Dict] = None) -> bool:
         """Process one heartbeat - more aggressive trading"""
         if not self.alive:
             return False
         
+        with self._phase("heartbeat"):
+            return self._heartbeat(market_data)
+    
+    def _heartbeat(self, market_data: Optional[Dict] = None) -> bool:
+        """Heartbeat body - timed as a whole by heartbeat()"""
         self.heartbeats += 1
-        self.gmac -= GMAC_HEARTBEAT_COST
+        self._spend_gmac(GMAC_HEARTBEAT_COST, "heartbeat")
         
-        print(f"\n{'='*70}")
-        print(f"HEARTBEAT #{self.heartbeats} - {self.name}")
-        print(f"GMAC: {self.gmac:.1f} | Goodwill: {self.goodwill} | Trades: {self.trades_executed}")
-        print('='*70)
+        logger.info("\n%s", BANNER)
+        logger.info("HEARTBEAT #%d - %s", self.heartbeats, self.name)
+        logger.info("GMAC: %.1f | Goodwill: %s | Trades: %d",
+                    self.gmac, self.goodwill, self.trades_executed)
+        logger.info(BANNER)
         
         # Check survival
-        self._check_survival()
+        with self._phase("survival"):
+            self._check_survival()
         if not self.alive:
             return False
         
-        # Fetch market data
-        print("Fetching Uniswap market data...")
-        market_data = self.trader.get_market_data(TRADING_PAIRS)
-        self.gmac -= GMAC_API_CALL_COST * len(TRADING_PAIRS)
+        # Fetch market data (unless the scheduler prefetched it)
+        with self._phase("fetch"):
+            if market_data is None:
+                logger.info("Fetching Uniswap market data...")
+                market_data = self.prefetch_market_data()
+            self._spend_gmac(GMAC_API_CALL_COST * len(TRADING_PAIRS), "fetch")
+        
+        # Revalue open positions
+        with self._phase("mark"):
+            prices = self._mark_prices(market_data)
+            self.positions.mark_to_market(prices)
+            self.total_pnl = self.positions.total_pnl
+            self._value_account()
+            logger.info("Equity: $%.2f | P&L: $%.2f", self.equity_usd, self.pnl_usd)
+        
+        # Take-profit / stop-loss exits
+        with self._phase("exits"):
+            for exit_order in self.exit_engine.check(prices):
+                self._execute_exit(exit_order)
         
         # Analyze (aggressive - lower threshold)
         if not self.critical_mode and market_data:
-            self.gmac -= GMAC_INFERENCE_BASE_COST
-            signal = self.strategy.analyze(market_data)
+            with self._phase("analyze"):
+                key = self.signal_cache.key(self.strategy, market_data)
+                signal = self.signal_cache.get(key)
+                if signal is None:
+                    self._spend_gmac(GMAC_INFERENCE_BASE_COST, "analyze")
+                    signal = self.strategy.analyze(market_data)
+                    self.signal_cache.put(key, signal)
+                    self.metrics.increment("signal_cache_miss")
+                else:
+                    self.metrics.increment("signal_cache_hit")
             
             if signal.get("action") != "HOLD":
                 confidence = signal.get("confidence", 0)
@@ -80,44 +151,109 @@ class AggressiveAgent:
                 if self.survival_mode:
                     threshold = 0.65
                 
-                print(f"\nSignal: {signal['action']} {signal.get('symbol')}")
-                print(f"Confidence: {confidence:.1%} | Threshold: {threshold:.1%}")
+                logger.info("Signal: %s %s", signal['action'], signal.get('symbol'))
+                logger.info("Confidence: %.1f%% | Threshold: %.1f%%", confidence * 100, threshold * 100)
                 
                 if confidence >= threshold:
-                    self._execute_trade(signal)
+                    with self._phase("execute"):
+                        self._execute_trade(signal)
                 else:
-                    print(f"Signal too weak - need {threshold:.1%}, got {confidence:.1%}")
+                    logger.info("Signal too weak - need %.1f%%, got %.1f%%",
+                                threshold * 100, confidence * 100)
             else:
-                print("No trade signal")
+                logger.info("No trade signal")
         
         return True
     
+    def prefetch_market_data(self) -> Dict:
+        """Fetch the next heartbeat's market data (the scheduler runs it between heartbeats, never during one)"""
+        return self.trader.get_market_data(TRADING_PAIRS)
+    
+    def scheduled_prefetch(self) -> Dict:
+        """prefetch_market_data for the scheduler's worker thread, its API calls reported as "prefetch" """
+        calls_before = self.trader.thread_api_calls
+        try:
+            return self.prefetch_market_data()
+        finally:
+            self.metrics.count_api_calls("prefetch", self.trader.thread_api_calls - calls_before)
+    
     def _check_survival(self):
         """Check survival status"""
         if self.gmac <= GMAC_DEATH_THRESHOLD:
             self.alive = False
-            print(f"\n!!! AGENT DIED - GMAC depleted !!!")
+            logger.error("!!! AGENT DIED - GMAC depleted !!!")
             return
         
         if self.gmac <= GMAC_CRITICAL_THRESHOLD:
             if not self.critical_mode:
                 self.critical_mode = True
-                print(f"\n!!! CRITICAL MODE - GMAC: {self.gmac:.1f} !!!")
+                logger.error("!!! CRITICAL MODE - GMAC: %.1f !!!", self.gmac)
         elif self.gmac <= GMAC_SURVIVAL_THRESHOLD:
             if not self.survival_mode:
                 self.survival_mode = True
-                print(f"\n!!! SURVIVAL MODE - GMAC: {self.gmac:.1f} !!!")
+                logger.warning("!!! SURVIVAL MODE - GMAC: %.1f !!!", self.gmac)
         else:
             self.survival_mode = False
             self.critical_mode = False
     
+    def _quote_price(self, symbol: str, side: str, fallback: float) -> float:
+        """Price a market order would pay: best ask to buy, best bid to sell"""
+        best = self.price_service.best(symbol)
+        if best is None:
+            return fallback
+        return best["ask"] if side == "BUY" else best["bid"]
+    
+    def _mark_prices(self, market_data: Dict) -> Dict[str, float]:
+        """Consolidated mid per symbol from the price service, the ticker's last when it has none"""
+        self.price_service.ingest(self.price_venue, [data["ticker"] for data in market_data.values()
+                                                     if data.get("ticker")])
+        prices = {}
+        for symbol, data in market_data.items():
+            price = self.price_service.mid(symbol)
+            if price is None and data.get("ticker"):
+                price = data["ticker"]["last"]
+            if price:
+                prices[symbol] = price
+        return prices
+    
+    def _value_account(self) -> Dict:
+        """Paper balances and P&L in USD from the shared price oracle (the dashboard's valuation)"""
+        account = self.oracle.value(self.trader.get_balance())
+        unrealized, unpriced = 0.0, list(account["unpriced"])
+        for position in self.positions.open_positions():
+            base, quote = position["symbol"].split("_")
+            base_usd, quote_usd = self.oracle.price(base), self.oracle.price(quote)
+            if base_usd is None or quote_usd is None:
+                unpriced.append(position["symbol"])
+                continue
+            direction = 1 if position["side"] == "BUY" else -1
+            unrealized += (base_usd - position["entry_price"] * quote_usd) * position["quantity"] * direction
+        self.equity_usd = account["total_usd"]
+        self.pnl_usd = self.realized_pnl_usd + unrealized
+        return {
+            "assets": account["assets"],
+            "total_usd": self.equity_usd,
+            "realized_usd": self.realized_pnl_usd,
+            "unrealized_usd": unrealized,
+            "pnl_usd": self.pnl_usd,
+            "unpriced": unpriced
+        }
+    
+    def _book_realized_usd(self, symbol: str, pnl: float):
+        """Add a close's P&L (quote currency) to the USD total at the oracle's current rate"""
+        quote_usd = self.oracle.price(symbol.split("_")[1])
+        if quote_usd is None:
+            logger.warning("No USD price for %s - realized P&L left out of the USD total", symbol)
+            return
+        self.realized_pnl_usd += pnl * quote_usd
+    
     def _execute_trade(self, signal: Dict):
         """Execute trade aggressively"""
-        self.gmac -= GMAC_TRADE_COST
+        self._spend_gmac(GMAC_TRADE_COST, "execute")
         
         symbol = signal["symbol"]
         side = signal["action"]
-        price = signal["price"]
+        price = self._quote_price(symbol, side, signal["price"])
         
         # Get balance
         balance = self.trader.get_balance()
@@ -132,8 +268,8 @@ class AggressiveAgent:
         trade_amount = available * position_pct
         quantity = trade_amount / price if price > 0 else 0
         
-        print(f"\nExecuting: {side} {quantity:.6f} {symbol} @ ${price:.2f}")
-        print(f"Trade value: ${trade_amount:.2f}")
+        logger.info("Executing: %s %.6f %s @ $%.2f", side, quantity, symbol, price)
+        logger.info("Trade value: $%.2f", trade_amount)
         
         # Execute
         result = self.trader.place_order(symbol, side, "MARKET", quantity, price)
@@ -142,24 +278,78 @@ class AggressiveAgent:
             self.trades_executed += 1
             self.goodwill += GOODWILL_TASK_COMPLETE
             
-            print(f"SUCCESS! Trade #{self.trades_executed}")
-            print(f"Goodwill: {self.goodwill} (+{GOODWILL_TASK_COMPLETE})")
-            print(f"New balance: {self.trader.get_balance()}")
+            logger.info("SUCCESS! Trade #%d", self.trades_executed)
+            logger.info("Goodwill: %s (+%s)", self.goodwill, GOODWILL_TASK_COMPLETE)
+            logger.info("New balance: %s", self.trader.get_balance())
             
             # Track position
-            self.positions.append({
-                "symbol": symbol,
-                "side": side,
-                "price": price,
-                "quantity": quantity,
-                "time": time.time()
-            })
+            fill_price = result.get("price", price)
+            fill_quantity = result.get("quantity", quantity)
+            opened, closes = None, []
+            if side == "BUY":
+                position_id = self.positions.open(symbol, LONG, fill_price, fill_quantity)
+                self.exit_engine.register(position_id, symbol, fill_price)
+                opened = self.positions.get(position_id)["uid"]
+            else:
+                closes = self.positions.reduce(symbol, fill_quantity, fill_price)
+                for fill in closes:
+                    if fill["closed"]:
+                        self.exit_engine.unregister(fill["position_id"])
+                    self._on_position_closed(symbol, fill)
+            self.total_pnl = self.positions.total_pnl
+            if self.trade_journal is not None:
+                self.trade_journal.record_fill(self.name, symbol, side, fill_quantity, fill_price,
+                                               result.get("fee", 0.0), closes, strategy=self.strategy.name,
+                                               opened=opened)
         else:
-            print(f"FAILED: {result.get('error')}")
+            logger.error("FAILED: %s", result.get('error'))
+    
+    def _execute_exit(self, exit_order: Dict):
+        """Sell a position whose take-profit or stop-loss level was crossed"""
+        position_id = exit_order["position_id"]
+        position = self.positions.get(position_id)
+        if not position["open"]:
+            return
+        
+        self._spend_gmac(GMAC_TRADE_COST, "exits")
+        symbol = position["symbol"]
+        price = self._quote_price(symbol, "SELL", exit_order["price"])
+        result = self.trader.place_order(symbol, "SELL", "MARKET", position["quantity"], price)
+        if not result.get("success"):
+            logger.error("Exit failed: %s", result.get('error'))
+            self.exit_engine.register(position_id, symbol, position["entry_price"])
+            return
+        
+        self.trades_executed += 1
+        fill = self.positions.settle(position_id, result.get("price", price),
+                                     result.get("quantity", position["quantity"]))
+        if not fill["closed"]:
+            self.exit_engine.register(position_id, symbol, position["entry_price"])
+        self.metrics.increment("exit_" + exit_order["reason"])
+        logger.info("EXIT (%s) %s @ $%.2f | P&L: $%.2f",
+                    exit_order["reason"], symbol, fill["exit_price"], fill["pnl"])
+        self._on_position_closed(symbol, fill)
+        self.total_pnl = self.positions.total_pnl
+        if self.trade_journal is not None:
+            self.trade_journal.record_fill(self.name, symbol, "SELL", fill["quantity"], fill["exit_price"],
+                                           result.get("fee", 0.0), [fill], strategy=self.strategy.name,
+                                           reason=exit_order["reason"])
+    
+    def _on_position_closed(self, symbol: str, fill: Dict):
+        """Goodwill and win/loss bookkeeping for a closed position"""
+        self._book_realized_usd(symbol, fill["pnl"])
+        if fill["pnl_pct"] > PROFIT_TARGET:
+            self.goodwill += GOODWILL_PROFITABLE_TRADE
+        elif fill["pnl_pct"] < -STOP_LOSS:
+            self.goodwill += GOODWILL_BAD_TRADE
+        self.winning_trades = self.positions.wins
+        self.losing_trades = self.positions.losses
 
 
 def run_aggressive_demo():
     """Run aggressive trading demo"""
+    start_logging()
+    
     print("\n" + "="*70)
     print(" "*15 + "AGGRESSIVE UNISWAP TRADING AGENT")
     print(" "*20 + "Lower confidence threshold")
@@ -167,6 +357,9 @@ def run_aggressive_demo():
     print("="*70)
     
     agent = AggressiveAgent("Uniswap-Alpha")
+    install_signal_handler()
+    if AGENT_HTTP_ENABLED:
+        start_agent_server()
     
     print("\nTrading on Uniswap DEX")
     print("Pairs: WETH/USDT, WETH/USDC, USDC/USDT")
@@ -175,27 +368,29 @@ def run_aggressive_demo():
     print("\nRunning until we make a trade...")
     print("Press Ctrl+C to stop\n")
     
-    cycles = 0
     max_cycles = 20  # Safety limit
     
+    def tick(market_data: Optional[Dict]) -> bool:
+        logger.info("[Cycle %d] Searching for trade opportunity...", agent.heartbeats + 1)
+        
+        if not agent.heartbeat(market_data):
+            return False
+        
+        if agent.trades_executed > 0:
+            logger.info("TRADE EXECUTED!")
+            return False
+        return True
+    
     try:
-        while agent.trades_executed == 0 and cycles < max_cycles:
-            cycles += 1
-            print(f"\n[Cycle {cycles}] Searching for trade opportunity...")
-            
-            if not agent.heartbeat():
-                break
-            
-            if agent.trades_executed > 0:
-                print(f"\n{'*'*70}")
-                print(" "*20 + "TRADE EXECUTED!")
-                print('*'*70)
-                break
-            
-            # Wait before next cycle
-            time.sleep(5)
+        # One heartbeat every 5 seconds, next cycle's data prefetched meanwhile
+        prefetch = agent.scheduled_prefetch if HEARTBEAT_PREFETCH else None
+        scheduler = HeartbeatScheduler(5, prefetch=prefetch, metrics=agent.metrics)
+        scheduler.run(tick, max_ticks=max_cycles)
+        if agent.trade_journal is not None:
+            agent.trade_journal.flush()
         
-        # Summary
+        # Summary (drain queued log lines first so the report prints last)
+        stop_logging()
         print("\n" + "="*70)
         print(" "*25 + "DEMO COMPLETE")
         print("="*70)
@@ -209,10 +404,13 @@ def run_aggressive_demo():
             if amt > 0.0001:
                 print(f"  {curr}: {amt:.6f}")
         
-        if agent.positions:
-            print(f"\nPositions Opened: {len(agent.positions)}")
-            for i, pos in enumerate(agent.positions, 1):
-                print(f"  {i}. {pos['side']} {pos['quantity']:.6f} {pos['symbol']} @ ${pos['price']:.2f}")
+        if len(agent.positions):
+            print(f"\nOpen Positions: {len(agent.positions)}")
+            for i, pos in enumerate(agent.positions.open_positions(), 1):
+                print(f"  {i}. {pos['side']} {pos['quantity']:.6f} {pos['symbol']} @ ${pos['entry_price']:.2f}")
+        valuation = agent._value_account()
+        print(f"Equity: ${valuation['total_usd']:.2f}")
+        print(f"P&L: ${valuation['pnl_usd']:.2f}")
         
     except KeyboardInterrupt:
         print("\n\nStopped by user")
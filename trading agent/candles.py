@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Local multi-timeframe candle aggregation from a 1m base stream
+"""
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from config import CANDLE_BASE_TIMEFRAME, CANDLE_TIMEFRAMES, CANDLE_HISTORY
+
+TIMEFRAME_MS = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000,
+    "1D": 86_400_000
+}
+
+
+def _merge(candle: Dict, base: Dict) -> Dict:
+    """Fold a base candle into a (copied) aggregate candle"""
+    return {
+        "timestamp": candle["timestamp"],
+        "open": candle["open"],
+        "high": max(candle["high"], base["high"]),
+        "low": min(candle["low"], base["low"]),
+        "close": base["close"],
+        "volume": candle["volume"] + base["volume"]
+    }
+
+
+class _Series:
+    """Finished candles of one timeframe plus the bucket being built"""
+
+    def __init__(self, step: int, history: int):
+        self.step = step
+        self.finished: Deque[Dict] = deque(maxlen=history)
+        self.current: Optional[Dict] = None
+
+    def commit(self, base: Dict):
+        bucket = base["timestamp"] // self.step * self.step
+        if self.finished and bucket <= self.finished[-1]["timestamp"]:
+            return  # inside a seeded (exchange-native) candle
+        if self.current is not None and self.current["timestamp"] != bucket:
+            self.finished.append(self.current)
+            self.current = None
+        if self.current is None:
+            self.current = dict(base, timestamp=bucket)
+        else:
+            self.current = _merge(self.current, base)
+
+    def view(self, provisional: Optional[Dict]) -> List[Dict]:
+        candles = list(self.finished)
+        current = self.current
+        if provisional is not None:
+            bucket = provisional["timestamp"] // self.step * self.step
+            if current is not None and current["timestamp"] == bucket:
+                current = _merge(current, provisional)
+            else:
+                if current is not None:
+                    candles.append(current)
+                current = dict(provisional, timestamp=bucket)
+        if current is not None:
+            candles.append(current)
+        return candles
+
+
+class CandleAggregator:
+    """Builds higher timeframes locally from one base-resolution stream
+
+    Buckets are aligned to the epoch (timestamp // step * step, in ms), which
+    matches exchange candles - 4h candles open at 00:00, 04:00, ... UTC.
+    Each base candle is folded into every timeframe once, when it is
+    committed; the newest base candle is kept provisional because the
+    exchange keeps updating it until its minute ends. Timeframes longer
+    than the base backfill can cover are seeded with the exchange's native
+    candles first (seed).
+    """
+
+    def __init__(self, base: str = CANDLE_BASE_TIMEFRAME,
+                 timeframes: List[str] = CANDLE_TIMEFRAMES,
+                 history: int = CANDLE_HISTORY):
+        self.base = base
+        self.base_step = TIMEFRAME_MS[base]
+        self.timeframes = [base] + [tf for tf in timeframes if tf != base]
+        self.history = history
+        self._series: Dict[str, Dict[str, _Series]] = {}
+        self._committed_ts: Dict[str, int] = {}
+        self._provisional: Dict[str, Dict] = {}
+
+    def _symbol_series(self, symbol: str) -> Dict[str, _Series]:
+        series = self._series.get(symbol)
+        if series is None:
+            series = self._series[symbol] = {tf: _Series(TIMEFRAME_MS[tf], self.history)
+                                             for tf in self.timeframes}
+        return series
+
+    def _commit(self, symbol: str, base: Dict):
+        for series in self._symbol_series(symbol).values():
+            series.commit(base)
+        self._committed_ts[symbol] = base["timestamp"]
+
+    def ingest(self, symbol: str, candles: List[Dict]) -> int:
+        """Add base candles (oldest first); returns how many were committed
+
+        Candles at or before the last committed one are ignored, so
+        overlapping fetches are safe. The last candle becomes provisional.
+        """
+        if not candles:
+            return 0
+        last_ts = self._committed_ts.get(symbol, -1)
+        committed = 0
+        for candle in candles[:-1]:
+            if candle["timestamp"] > last_ts:
+                self._commit(symbol, candle)
+                committed += 1
+        newest = candles[-1]
+        if newest["timestamp"] > self._committed_ts.get(symbol, -1):
+            self._provisional[symbol] = newest
+            self._symbol_series(symbol)
+        return committed
+
+    def seed(self, symbol: str, timeframe: str, candles: List[Dict]):
+        """Start a timeframe from the exchange's own finished candles (oldest first)
+
+        For timeframes the base backfill is too short to fill: base candles
+        that fall inside a seeded bucket are skipped, so the base stream only
+        builds the buckets after it. The still-forming candle is dropped.
+        """
+        series = self._symbol_series(symbol).get(timeframe)
+        if series is None or series.finished or series.current is not None:
+            return
+        now = int(time.time() * 1000)
+        series.finished.extend(candle for candle in candles if candle["timestamp"] + series.step <= now)
+
+    def ingest_tick(self, symbol: str, price: float, volume: float = 0.0,
+                    timestamp: Optional[int] = None):
+        """Fold a trade/ticker price into the provisional base candle"""
+        timestamp = timestamp if timestamp is not None else int(time.time() * 1000)
+        bucket = timestamp // self.base_step * self.base_step
+        provisional = self._provisional.get(symbol)
+        if provisional is not None and provisional["timestamp"] == bucket:
+            self._provisional[symbol] = _merge(provisional, {
+                "high": price, "low": price, "close": price, "volume": volume
+            })
+            return
+        if provisional is not None:
+            self._commit(symbol, provisional)
+        self._symbol_series(symbol)
+        self._provisional[symbol] = {
+            "timestamp": bucket, "open": price, "high": price,
+            "low": price, "close": price, "volume": volume
+        }
+
+    def last_timestamp(self, symbol: str) -> Optional[int]:
+        """Timestamp of the newest base candle seen (committed or provisional)"""
+        provisional = self._provisional.get(symbol)
+        if provisional is not None:
+            return provisional["timestamp"]
+        return self._committed_ts.get(symbol)
+
+    def reset(self, symbol: str):
+        """Forget a symbol (e.g. after a gap too long to backfill)"""
+        self._series.pop(symbol, None)
+        self._committed_ts.pop(symbol, None)
+        self._provisional.pop(symbol, None)
+
+    def get_state(self) -> Dict:
+        """Rolling windows of every symbol and timeframe, JSON-serializable"""
+        return {
+            "base": self.base,
+            "symbols": {
+                symbol: {
+                    "committed_ts": self._committed_ts.get(symbol),
+                    "provisional": self._provisional.get(symbol),
+                    "series": {tf: {"finished": list(s.finished), "current": s.current}
+                               for tf, s in series.items()}
+                }
+                for symbol, series in self._series.items()
+            }
+        }
+
+    def set_state(self, state: Dict):
+        """Restore get_state() output; timeframes not configured any more are dropped"""
+        if state.get("base") != self.base:
+            return
+        for symbol, saved in state["symbols"].items():
+            series = self._symbol_series(symbol)
+            for tf, saved_series in saved["series"].items():
+                if tf in series:
+                    series[tf].finished.extend(saved_series["finished"])
+                    series[tf].current = saved_series["current"]
+            if saved["committed_ts"] is not None:
+                self._committed_ts[symbol] = saved["committed_ts"]
+            if saved["provisional"] is not None:
+                self._provisional[symbol] = saved["provisional"]
+
+    def candles(self, symbol: str, timeframe: str) -> List[Dict]:
+        series = self._series.get(symbol, {}).get(timeframe)
+        if series is None:
+            return []
+        return series.view(self._provisional.get(symbol))
+
+    def get_timeframes(self, symbol: str) -> Dict[str, List[Dict]]:
+        """Every timeframe's candles for a symbol, oldest first"""
+        return {tf: self.candles(symbol, tf) for tf in self.timeframes}
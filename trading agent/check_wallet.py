@@ -6,6 +6,7 @@ import sys
 sys.stdout.reconfigure(encoding='utf-8') if hasattr(sys.stdout, 'reconfigure') else None
 
 from real_wallet import RealWalletTrader
+from price_oracle import get_price_oracle
 
 # Your wallet address
 WALLET_ADDRESS = "0x83cc3b8731f6344D7DA6529566D94ACf30271C08"
@@ -35,26 +36,20 @@ try:
     print("="*70)
     
     if balances:
-        total_usd = 0
+        valuation = get_price_oracle().value(balances)
         for token, amount in balances.items():
             print(f"\n{token}: {amount:.6f}")
             
-            # Estimate USD value (approximate)
-            if token == "USDC" or token == "USDT":
-                usd_value = amount
-            elif token == "ETH":
-                usd_value = amount * 2500  # Approximate
-            elif token == "DAI":
-                usd_value = amount
-            else:
-                usd_value = 0
-            
-            if usd_value > 0:
-                print(f"  ≈ ${usd_value:.2f} USD")
-                total_usd += usd_value
+            asset = valuation["assets"][token]
+            if asset["usd_value"] is None:
+                print("  (no USD price available)")
+            elif asset["usd_value"] > 0:
+                print(f"  ≈ ${asset['usd_value']:.2f} USD (@ ${asset['usd_price']:,.2f})")
         
         print("\n" + "="*70)
-        print(f"Total Value: ≈ ${total_usd:.2f} USD")
+        print(f"Total Value: ≈ ${valuation['total_usd']:.2f} USD")
+        if valuation["unpriced"]:
+            print(f"Not valued (no price): {', '.join(valuation['unpriced'])}")
         print("="*70)
     else:
         print("\nNo balances found")
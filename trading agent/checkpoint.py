@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Crash-safe checkpointing - atomic snapshots plus an append-only event journal
+"""
+import os
+import json
+import glob
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from config import CHECKPOINT_DIR
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write(path: str, data: bytes):
+    """Write a file so readers see either the old or the new contents, never a mix
+
+    The data goes to a temporary file in the same directory, is fsynced and
+    renamed over the target; the directory is fsynced so the rename itself
+    survives a power loss.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _encode(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+class Checkpointer:
+    """Snapshots plus a journal of events since the last snapshot
+
+    Journal files are numbered by generation. Taking a snapshot starts a new
+    generation: the state is serialized on the caller's thread, new events
+    immediately go to the next journal, and the snapshot write (fsync and
+    rename) plus removal of the older journals happen on a background
+    thread. Restore loads the newest snapshot and replays every journal of
+    its generation or later, so a crash at any point loses nothing that
+    was journaled durably.
+
+    Routine events are flushed but not fsynced (a lost tail costs a few
+    heartbeats of GMAC bookkeeping); events passed with durable=True, such
+    as trades, are fsynced before record() returns.
+    """
+
+    def __init__(self, name: str, directory: str = CHECKPOINT_DIR):
+        self.name = name
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.generation = 0
+        self.sequence = 0
+        self._journal = None
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+        self._pending = None
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, f"{self.name}.snapshot.json")
+
+    def _journal_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"{self.name}.{generation:08d}.journal")
+
+    def _journals(self) -> List[Tuple[int, str]]:
+        pattern = os.path.join(glob.escape(self.directory), f"{glob.escape(self.name)}.*.journal")
+        journals = []
+        for path in glob.glob(pattern):
+            try:
+                journals.append((int(path.rsplit(".", 2)[-2]), path))
+            except ValueError:
+                continue
+        return sorted(journals)
+
+    def _open_journal(self):
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self._journal_path(self.generation), "ab")
+
+    def record(self, event_type: str, durable: bool = False, **fields):
+        """Append one event to the current journal"""
+        with self._lock:
+            if self._journal is None:
+                self._open_journal()
+            self.sequence += 1
+            fields["t"] = event_type
+            fields["seq"] = self.sequence
+            self._journal.write(_encode(fields) + b"\n")
+            self._journal.flush()
+            if durable:
+                os.fsync(self._journal.fileno())
+
+    def snapshot(self, state: Dict):
+        """Start a new generation and persist `state` in the background"""
+        with self._lock:
+            self.generation += 1
+            payload = _encode({"generation": self.generation, "sequence": self.sequence, "state": state})
+            self._open_journal()
+            generation = self.generation
+        if self._pending is not None:
+            self._pending.result()  # keep snapshots in order
+        self._pending = self._writer.submit(self._write_snapshot, payload, generation)
+
+    def save_file(self, suffix: str, state: Dict):
+        """Persist auxiliary state (e.g. candle windows) atomically in the background"""
+        payload = _encode(state)
+        path = os.path.join(self.directory, f"{self.name}.{suffix}.json")
+        self._writer.submit(self._write_file, path, payload)
+
+    def load_file(self, suffix: str) -> Optional[Dict]:
+        path = os.path.join(self.directory, f"{self.name}.{suffix}.json")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return json.loads(f.read())
+        except ValueError as e:
+            logger.warning("Ignoring unreadable %s: %s", path, e)
+            return None
+
+    @staticmethod
+    def _write_file(path: str, payload: bytes):
+        try:
+            atomic_write(path, payload)
+        except OSError as e:
+            logger.error("Write of %s failed: %s", path, e)
+
+    def _write_snapshot(self, payload: bytes, generation: int):
+        try:
+            atomic_write(self.snapshot_path, payload)
+            for journal_generation, path in self._journals():
+                if journal_generation < generation:
+                    os.remove(path)
+        except OSError as e:
+            logger.error("Checkpoint write failed: %s", e)
+
+    def restore(self) -> Tuple[Optional[Dict], List[Dict]]:
+        """Latest snapshot state (or None) and the journal events recorded after it"""
+        generation, sequence, state = 0, 0, None
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "rb") as f:
+                snapshot = json.loads(f.read())
+            generation, sequence, state = snapshot["generation"], snapshot["sequence"], snapshot["state"]
+
+        events = []
+        for journal_generation, path in self._journals():
+            if journal_generation < generation:
+                continue
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        logger.warning("Ignoring torn journal record in %s", path)
+                        break
+                    if event["seq"] > sequence:
+                        events.append(event)
+
+        # Continue numbering after whatever was recovered, in a fresh generation
+        with self._lock:
+            self.sequence = max([sequence] + [event["seq"] for event in events])
+            self.generation = max([generation] + [g for g, _ in self._journals()]) + 1
+            self._open_journal()
+        return state, events
+
+    def close(self):
+        if self._pending is not None:
+            self._pending.result()
+        self._writer.shutdown(wait=True)
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
@@ -11,11 +11,17 @@ API_BASE_URL = "https://api.crypto.com/v2/"
 # Agent Metabolism Settings
 INITIAL_GMAC = 1000.0
 HEARTBEAT_INTERVAL = 30  # seconds
+HEARTBEAT_PREFETCH = True  # fetch next cycle's market data in the background
 GMAC_HEARTBEAT_COST = 0.5
 GMAC_INFERENCE_BASE_COST = 1.0
 GMAC_TRADE_COST = 2.0
 GMAC_API_CALL_COST = 0.1
 
+# Event-driven mode (TradingAgent.run_event_driven)
+EVENT_POLL_INTERVAL = 5  # seconds between market data polls
+EVENT_PRICE_MOVE_THRESHOLD = 0.003  # 0.3% move triggers re-analysis
+EVENT_QUEUE_SIZE = 64  # bounded stage queues (backpressure when full)
+
 # Survival Mode Thresholds
 GMAC_SURVIVAL_THRESHOLD = 100.0
 GMAC_CRITICAL_THRESHOLD = 20.0
@@ -44,9 +50,32 @@ MAX_TRADE_AMOUNT = 100.0  # USDT
 PROFIT_TARGET = 0.05  # 5%
 STOP_LOSS = 0.10  # 10%
 
+# Universe screener (screener.py) - scan every Crypto.com instrument instead of TRADING_PAIRS
+SCREENER_ENABLED = False
+SCREENER_TOP_K = 5  # symbols passed to the strategy
+SCREENER_REFRESH_INTERVAL = 300  # seconds between bulk ticker scans
+SCREENER_MIN_VOLUME = 1000000.0  # 24h traded value (quote)
+SCREENER_MAX_SPREAD = 0.002  # 0.2% bid/ask spread
+SCREENER_MIN_CHANGE = 0.01  # |24h change| of at least 1%
+SCREENER_QUOTES = ["USDT", "USD"]
+
+# Swarm runtime (swarm.py)
+SWARM_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # worker processes hosting agents
+SWARM_SNAPSHOT_BYTES = 4 * 1024 * 1024  # shared memory for the published market data
+SWARM_LOG_LEVEL = "WARNING"  # per-agent logging inside workers
+SWARM_STEP_TIMEOUT = 60  # seconds to wait for every worker's results before failing the tick
+
+# Cross-node coordination (coordinator.py)
+COORDINATOR_HOST = "127.0.0.1"
+COORDINATOR_PORT = 8765
+COORDINATOR_NODE_TIMEOUT = 15  # seconds without a heartbeat before a node's symbols move
+COORDINATOR_ORDER_WINDOW = 30  # seconds an order claim blocks others on the same wallet/symbol
+COORDINATOR_WALLET = os.getenv('COORDINATOR_WALLET', 'paper')  # account the swarm's order claims are keyed on
+
 # Risk Management
 MAX_POSITION_SIZE = 0.25  # 25% of balance
 SURVIVAL_MODE_POSITION_SIZE = 0.10  # 10% in survival mode
+MAX_ENTRY_SLIPPAGE = 0.005  # cap size to book depth within 0.5% of the touch
 MAX_DAILY_TRADES = 20
 
 # Strategy Settings
@@ -57,10 +86,128 @@ RSI_OVERSOLD = 30
 RSI_OVERBOUGHT = 70
 MA_FAST = 7
 MA_SLOW = 21
+SIGNAL_CACHE_SIZE = 256  # memoized signals (LRU) keyed by closed-candle bucket and latest close
+
+# Candles - one 1m base stream aggregated locally (candles.py)
+CANDLE_BASE_TIMEFRAME = "1m"
+CANDLE_TIMEFRAMES = ["5m", "15m", "1h", "4h"]
+CANDLE_DEFAULT_TIMEFRAME = "5m"  # what strategies see as market_data[symbol]["candles"]
+CANDLE_WINDOW = 50  # candles handed to strategies per timeframe
+CANDLE_HISTORY = 200  # finished candles kept per timeframe
+CANDLE_BASE_BACKFILL = 300  # base candles fetched on first use - must span the longest timeframe's candle
+# Timeframes the backfill can't fill to CANDLE_WINDOW (15m, 1h, 4h here) start from the exchange's own candles
 
 # Logging
 LOG_LEVEL = "INFO"
 LOG_FILE = "trading_agent.log"
+LOG_QUEUE_SIZE = 10000  # records buffered for the background writer (drops when full)
+LOG_STOP_TIMEOUT = 5  # seconds shutdown waits for queue room to signal the writer
+LOG_JSONL_FILE = None  # e.g. "trading_agent.jsonl" for structured event records
+
+# Profiling (on demand - SIGUSR1 or dashboard /api/profile)
+PROFILE_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+PROFILE_DEFAULT_SECONDS = 30
+PROFILE_OUTPUT_DIR = "profiles"
+PROFILE_TOP_N = 25
+
+# Agent HTTP endpoint (agent_http.py) - /metrics served from inside the agent process
+AGENT_HTTP_ENABLED = True
+AGENT_HTTP_PORT = int(os.getenv('AGENT_HTTP_PORT', '9108'))
+AGENT_HTTP_URL = os.getenv('AGENT_HTTP_URL', f"http://127.0.0.1:{AGENT_HTTP_PORT}")  # where the dashboard relays to
+
+# Local order books (order_book.py, Crypto.com)
+ORDER_BOOK_DEPTH = 150  # levels per side in a full snapshot
+ORDER_BOOK_TOP_DEPTH = 10  # levels per side in the per-heartbeat top-of-book poll merged between snapshots
+ORDER_BOOK_RESYNC_INTERVAL = 300  # seconds between full snapshots
+
+# Paper fill simulation (fill_simulator.py)
+PAPER_FILL_LATENCY = 0.25  # seconds from decision to fill (priced as adverse drift)
+PAPER_FILL_REALTIME = False  # also sleep for the latency (off for fast backtests)
+PAPER_SPREAD = 0.0005  # assumed spread when the snapshot has no bid/ask
+PAPER_BOOK_DEPTH = 50000.0  # quote notional resting within 1% of the touch
+PAPER_MAX_SLIPPAGE = 0.01  # never fill deeper than this past the touch (rest unfilled)
+PAPER_TAKER_FEE = 0.00075  # 0.075%
+PAPER_SNAPSHOT_MAX_AGE = 30  # seconds before a cached snapshot is refetched
+UNISWAP_POOL_FEE = 0.003  # 0.3% pool
+UNISWAP_POOL_LIQUIDITY = 2000000.0  # quote value (both sides) of a simulated pool with no on-chain state
+
+# Consolidated pricing (price_service.py) - best bid/ask across venues
+PRICE_VENUES = {
+    "cryptocom": {"fee": PAPER_TAKER_FEE, "gas": False},
+    "uniswap": {"fee": UNISWAP_POOL_FEE, "gas": True}
+}
+PRICE_ASSET_ALIASES = {"WETH": "ETH"}  # venue asset -> cross-venue asset
+PRICE_CRYPTOCOM_PAIRS = ["ETH_USDT", "ETH_USDC", "USDC_USDT"]  # overlap with TRADING_PAIRS
+PRICE_REFRESH_INTERVAL = 5  # seconds between concurrent venue polls
+PRICE_MAX_AGE = 10  # seconds before a venue quote is ignored
+PRICE_GAS_COST_USD = 5.0  # per on-chain leg
+PRICE_SPREAD_NOTIONAL = 1000.0  # trade size gas is amortized over when judging a spread
+
+# Uniswap routing (route_finder.py) - multi-hop quotes from a cached pool graph
+ROUTE_MAX_HOPS = 3
+ROUTE_PRICE_TOLERANCE = 0.001  # pool price move (relative) that invalidates cached routes
+ROUTE_LIQUIDITY_TOLERANCE = 0.10  # TVL change (relative) that invalidates cached routes
+ROUTE_REFERENCE_NOTIONAL = 1000.0  # USD trade size the liquidity penalty is priced for
+ROUTE_POOL_COUNT = 100  # top pools by TVL loaded from the subgraph
+ROUTE_POOL_REFRESH = 60  # seconds between pool graph refreshes
+
+# On-chain pool reads (multicall.py, pool_reader.py) - subgraph only for discovery
+UNISWAP_ONCHAIN_PRICES = True
+ETH_RPC_URL = os.getenv('ETH_RPC_URL', 'https://eth.llamarpc.com')
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+ETH_BLOCK_TIME = 12  # seconds; pool state is reread at most once per block
+
+# Live transactions (tx_pipeline.py)
+UNISWAP_ROUTER_ADDRESS = "0x68b3465833fb72A70ecDF485E0e4C7bD8665Fc45"  # SwapRouter02
+TX_CONFIRMATIONS = 2  # blocks (including the one it was mined in) before a tx counts as final
+TX_POLL_INTERVAL = 2.0  # seconds between receipt polls
+TX_STUCK_SECONDS = 60  # unmined this long -> resend the nonce with higher fees
+TX_FEE_BUMP = 1.2  # nodes require at least +10% to accept a replacement
+TX_MAX_REPLACEMENTS = 5
+LIVE_SWAP_SLIPPAGE = 0.005  # minimum output = quote * (1 - slippage)
+
+# Gas estimation (gas_oracle.py) - rolling eth_feeHistory window, estimates served from memory
+GAS_HISTORY_BLOCKS = 20  # blocks of base fees and priority-fee samples kept
+GAS_REWARD_PERCENTILES = [10, 50, 90]  # priority-fee percentiles sampled per block
+GAS_PRIORITY_PERCENTILE = 50  # tip used for live transactions
+GAS_FEE_HORIZON = 6  # blocks a max fee must survive at +12.5% each (about 2x base fee)
+GAS_SWAP_UNITS = 200000  # gas limit sent with a single-pool router swap, and what its cost is priced at
+GAS_MAX_COST_FRACTION = 0.01  # skip trades whose gas would eat more than this share of notional
+
+# Portfolio monitor (portfolio_monitor.py) - many wallets, balances batched through Multicall3
+PORTFOLIO_WALLETS = [address.strip() for address in
+                     os.getenv('PORTFOLIO_WALLETS', '0x83cc3b8731f6344D7DA6529566D94ACf30271C08').split(',')
+                     if address.strip()]
+PORTFOLIO_MAX_WALLETS = 1000  # registrations beyond this are refused
+PORTFOLIO_TOKENS = ["USDC", "USDT", "WETH", "DAI"]  # symbols from uniswap_trading.TOKENS
+PORTFOLIO_BATCH_CALLS = 500  # balance reads per eth_call
+PORTFOLIO_CONCURRENCY = 8  # eth_calls in flight at once over the shared provider
+PORTFOLIO_REFRESH_INTERVAL = 30  # seconds between background refreshes
+
+# Shared USD price oracle (price_oracle.py) - one cached price per asset for UI and agent valuation
+PRICE_ORACLE_TTL = 15  # seconds a price is served before it is refetched
+PRICE_ORACLE_MAX_STALE = 300  # seconds a last-known price is still served (flagged stale) when fetches fail
+PRICE_ORACLE_PEGGED = {"USDC": 1.0, "USDT": 1.0, "DAI": 1.0, "USD": 1.0}  # valued at par, never fetched
+PRICE_ORACLE_QUOTES = ["USD", "USDT", "USDC"]  # Crypto.com quote currencies, most preferred first
+
+# Paper ledger (ledger.py) - balances in integer base units
+ASSET_DECIMALS = {
+    "USDT": 6, "USDC": 6, "DAI": 18, "WETH": 18,
+    "ETH": 18, "BTC": 8, "CRO": 8, "USD": 6
+}
+DEFAULT_ASSET_DECIMALS = 18
+LEDGER_AUDIT_SIZE = 10000  # most recent balance movements kept
+
+# Checkpointing (checkpoint.py) - restore agent state after a restart
+CHECKPOINT_ENABLED = True
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_INTERVAL = 20  # heartbeats between snapshots (journal in between)
+
+# Trade journal (trade_journal.py) - durable SQLite history of fills and GMAC spend
+TRADE_JOURNAL_ENABLED = True
+TRADE_JOURNAL_PATH = "trades.db"
+TRADE_JOURNAL_BATCH = 500  # records per write transaction
+TRADE_JOURNAL_FLUSH_INTERVAL = 1.0  # seconds a record may wait in the queue
 
 # Safety Features
 ENABLE_PAPER_TRADING = True  # Set to False for live trading
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+Cross-node swarm coordinator - JSON lines over TCP
+"""
+import json
+import time
+import socket
+import hashlib
+import logging
+import threading
+import socketserver
+from typing import Dict, List, Optional
+from config import (
+    TRADING_PAIRS,
+    GOODWILL_LEVEL_SWARM_LEADER,
+    COORDINATOR_HOST,
+    COORDINATOR_PORT,
+    COORDINATOR_NODE_TIMEOUT,
+    COORDINATOR_ORDER_WINDOW
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _weight(symbol: str, node_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{symbol}|{node_id}".encode(), digest_size=8).digest(), "big")
+
+
+class SwarmState:
+    """Membership, leadership, symbol assignment, order claims and P&L
+
+    Symbols are assigned by rendezvous hashing: each symbol goes to the live
+    node with the highest hash(symbol, node), so a node joining or dropping
+    out only moves the symbols it gains or held. The leader is the live node
+    with the most goodwill, provided it has reached
+    GOODWILL_LEVEL_SWARM_LEADER (ties go to the lowest node id). Every
+    change of leader or assignment bumps the epoch.
+    """
+
+    def __init__(self, symbols: List[str] = TRADING_PAIRS,
+                 node_timeout: float = COORDINATOR_NODE_TIMEOUT,
+                 order_window: float = COORDINATOR_ORDER_WINDOW):
+        self.symbols = list(symbols)
+        self.node_timeout = node_timeout
+        self.order_window = order_window
+        self.nodes: Dict[str, Dict] = {}
+        self.assignment: Dict[str, str] = {}
+        self.leader: Optional[str] = None
+        self.epoch = 0
+        self._claims: Dict[tuple, Dict] = {}  # (wallet, symbol) -> claim
+        self._decisions: Dict[str, tuple] = {}  # client_order_id -> (time, response)
+        self._lock = threading.Lock()
+
+    def _rebalance(self):
+        live = sorted(self.nodes)
+        assignment = {symbol: max(live, key=lambda node: _weight(symbol, node))
+                      for symbol in self.symbols} if live else {}
+        eligible = [node for node in live if self.nodes[node]["goodwill"] >= GOODWILL_LEVEL_SWARM_LEADER]
+        leader = min(eligible, key=lambda node: (-self.nodes[node]["goodwill"], node), default=None)
+        if assignment != self.assignment or leader != self.leader:
+            self.assignment = assignment
+            self.leader = leader
+            self.epoch += 1
+            logger.info("Swarm epoch %d: leader=%s, %d node(s)", self.epoch, leader, len(live))
+
+    def _view(self, node_id: str) -> Dict:
+        return {
+            "ok": True,
+            "epoch": self.epoch,
+            "leader": self.leader,
+            "symbols": sorted(symbol for symbol, node in self.assignment.items() if node == node_id)
+        }
+
+    def register(self, node_id: str, goodwill: float = 0, **_) -> Dict:
+        with self._lock:
+            self.nodes[node_id] = {"goodwill": goodwill, "last_seen": time.monotonic(),
+                                   "realized": 0.0, "unrealized": 0.0, "trades": 0}
+            self._rebalance()
+            return self._view(node_id)
+
+    def heartbeat(self, node_id: str, goodwill: float = 0, realized: float = 0.0,
+                  unrealized: float = 0.0, trades: int = 0, **_) -> Dict:
+        with self._lock:
+            node = self.nodes.get(node_id)
+            if node is None:
+                return {"ok": False, "error": "unknown node - register again"}
+            node.update(goodwill=goodwill, realized=realized, unrealized=unrealized,
+                        trades=trades, last_seen=time.monotonic())
+            self._rebalance()
+            return self._view(node_id)
+
+    def leave(self, node_id: str, **_) -> Dict:
+        with self._lock:
+            self.nodes.pop(node_id, None)
+            self._rebalance()
+            return {"ok": True}
+
+    def expire(self) -> List[str]:
+        """Drop nodes whose heartbeats stopped; their symbols move to survivors"""
+        now = time.monotonic()
+        with self._lock:
+            dead = [node_id for node_id, node in self.nodes.items()
+                    if now - node["last_seen"] > self.node_timeout]
+            for node_id in dead:
+                logger.warning("Node %s timed out - reassigning its symbols", node_id)
+                del self.nodes[node_id]
+            if dead:
+                self._rebalance()
+            return dead
+
+    def claim_order(self, node_id: str, wallet: str, symbol: str, side: str,
+                    client_order_id: str, **_) -> Dict:
+        """Grant at most one live order per (wallet, symbol) within the order window
+
+        Retries of the same client_order_id get the original decision, so a
+        node can resend safely after a dropped connection.
+        """
+        now = time.monotonic()
+        with self._lock:
+            previous = self._decisions.get(client_order_id)
+            if previous is not None:
+                return previous[1]
+
+            key = (wallet.lower(), symbol)
+            claim = self._claims.get(key)
+            if claim is not None and now - claim["at"] < self.order_window:
+                response = {"ok": False, "error": f"{claim['side']} by {claim['node_id']} already pending",
+                            "conflict": claim["client_order_id"]}
+            else:
+                self._claims[key] = {"node_id": node_id, "side": side, "at": now,
+                                     "client_order_id": client_order_id}
+                response = {"ok": True}
+
+            self._decisions[client_order_id] = (now, response)
+            if len(self._decisions) > 1024:
+                self._decisions = {cid: decision for cid, decision in self._decisions.items()
+                                   if now - decision[0] < self.order_window}
+            return response
+
+    def release_order(self, wallet: str, symbol: str, client_order_id: str, **_) -> Dict:
+        with self._lock:
+            key = (wallet.lower(), symbol)
+            claim = self._claims.get(key)
+            if claim is not None and claim["client_order_id"] == client_order_id:
+                del self._claims[key]
+            return {"ok": True}
+
+    def status(self, **_) -> Dict:
+        with self._lock:
+            realized = sum(node["realized"] for node in self.nodes.values())
+            unrealized = sum(node["unrealized"] for node in self.nodes.values())
+            return {
+                "ok": True,
+                "epoch": self.epoch,
+                "leader": self.leader,
+                "nodes": {node_id: {key: value for key, value in node.items() if key != "last_seen"}
+                          for node_id, node in self.nodes.items()},
+                "assignment": dict(self.assignment),
+                "realized_pnl": realized,
+                "unrealized_pnl": unrealized,
+                "total_pnl": realized + unrealized,
+                "trades": sum(node["trades"] for node in self.nodes.values())
+            }
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One JSON request per line, one JSON response per line"""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                op = request.pop("op")
+                handler = self.server.operations.get(op)
+                if handler is None:
+                    response = {"ok": False, "error": f"unknown op {op}"}
+                else:
+                    response = handler(**request)
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+class Coordinator(socketserver.ThreadingTCPServer):
+    """TCP front end for SwarmState plus a reaper thread for dead nodes"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = COORDINATOR_HOST, port: int = COORDINATOR_PORT,
+                 state: Optional[SwarmState] = None):
+        super().__init__((host, port), _Handler)
+        self.state = state or SwarmState()
+        self.operations = {
+            "register": self.state.register,
+            "heartbeat": self.state.heartbeat,
+            "leave": self.state.leave,
+            "claim_order": self.state.claim_order,
+            "release_order": self.state.release_order,
+            "status": self.state.status
+        }
+        self._stop = threading.Event()
+        self._background: List[threading.Thread] = []
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "Coordinator":
+        """Serve and reap on background threads"""
+        for name, target in (("serve", self.serve_forever), ("reaper", self._reap)):
+            thread = threading.Thread(target=target, name=f"coordinator-{name}", daemon=True)
+            thread.start()
+            self._background.append(thread)
+        logger.info("Coordinator listening on %s:%d", *self.server_address)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.shutdown()
+        self.server_close()
+
+    def _reap(self):
+        while not self._stop.wait(self.state.node_timeout / 3):
+            self.state.expire()
+
+
+class CoordinatorClient:
+    """Node-side connection to the coordinator (one persistent socket)"""
+
+    def __init__(self, node_id: str, host: str = COORDINATOR_HOST, port: int = COORDINATOR_PORT,
+                 timeout: float = 5.0):
+        self.node_id = node_id
+        self.address = (host, port)
+        self.timeout = timeout
+        self.symbols: List[str] = []
+        self.leader: Optional[str] = None
+        self.epoch = 0
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection(self.address, timeout=self.timeout)
+        self._file = self._sock.makefile("rwb")
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = None
+
+    def request(self, op: str, **fields) -> Dict:
+        """Send one request; reconnects once if the connection dropped"""
+        payload = json.dumps(dict(fields, op=op, node_id=self.node_id)).encode() + b"\n"
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._file.write(payload)
+                    self._file.flush()
+                    line = self._file.readline()
+                    if not line:
+                        raise ConnectionError("coordinator closed the connection")
+                    return json.loads(line)
+                except (OSError, ConnectionError):
+                    self.close()
+                    if attempt:
+                        raise
+
+    def _apply(self, response: Dict) -> Dict:
+        if response.get("ok") and "symbols" in response:
+            if response["symbols"] != self.symbols:
+                logger.info("Node %s now owns %s (epoch %d)", self.node_id, response["symbols"], response["epoch"])
+            self.symbols = response["symbols"]
+            self.leader = response["leader"]
+            self.epoch = response["epoch"]
+        return response
+
+    def register(self, goodwill: float = 0) -> Dict:
+        return self._apply(self.request("register", goodwill=goodwill))
+
+    def heartbeat(self, goodwill: float = 0, realized: float = 0.0,
+                  unrealized: float = 0.0, trades: int = 0) -> Dict:
+        response = self.request("heartbeat", goodwill=goodwill, realized=realized,
+                                unrealized=unrealized, trades=trades)
+        if not response.get("ok"):
+            response = self.register(goodwill)  # coordinator restarted or we timed out
+        return self._apply(response)
+
+    def claim_order(self, wallet: str, symbol: str, side: str, client_order_id: str) -> bool:
+        response = self.request("claim_order", wallet=wallet, symbol=symbol, side=side,
+                                client_order_id=client_order_id)
+        if not response.get("ok"):
+            logger.warning("Order %s on %s rejected: %s", client_order_id, symbol, response.get("error"))
+        return bool(response.get("ok"))
+
+    def release_order(self, wallet: str, symbol: str, client_order_id: str):
+        self.request("release_order", wallet=wallet, symbol=symbol, client_order_id=client_order_id)
+
+    def leave(self):
+        try:
+            self.request("leave")
+        finally:
+            self.close()
+
+    def status(self) -> Dict:
+        return self.request("status")
+
+    @property
+    def is_leader(self) -> bool:
+        return self.leader == self.node_id
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    server = Coordinator()
+    print(f"Coordinator on {COORDINATOR_HOST}:{server.port} - Ctrl+C to stop")
+    try:
+        server.start()
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
@@ -5,11 +5,16 @@ Enhanced Dashboard with Full Agent Data
 import sys
 sys.stdout.reconfigure(encoding='utf-8') if hasattr(sys.stdout, 'reconfigure') else None
 
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request, Response
 from flask_cors import CORS
 import json
 from pathlib import Path
 from enhanced_wallet import EnhancedWalletTrader
+import requests
+from trade_journal import get_trade_journal
+from portfolio_monitor import get_portfolio_monitor
+from price_oracle import get_price_oracle
+from config import PROFILE_DEFAULT_SECONDS, AGENT_HTTP_URL
 import logging
 
 app = Flask(__name__)
@@ -51,19 +56,14 @@ def wallet_info():
     try:
         w = get_wallet()
         balances = w.get_all_balances()
-        
-        # Calculate total USD value
-        total_usd = 0
-        for token, amount in balances.items():
-            if token in ["USDC", "USDT"]:
-                total_usd += amount
-            elif token == "ETH":
-                total_usd += amount * 2500  # Approximate
+        valuation = get_price_oracle().value(balances)
         
         return jsonify({
             'address': WALLET_ADDRESS,
             'balances': balances,
-            'total_usd': total_usd,
+            'assets': valuation['assets'],
+            'total_usd': valuation['total_usd'],
+            'unpriced': valuation['unpriced'],
             'connected': True
         })
     except Exception as e:
@@ -82,6 +82,107 @@ def agent_info():
     """Get agent status"""
     return jsonify(agent_state)
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Heartbeat phase latencies and counters in Prometheus text format
+    
+    The registry lives in the agent process, so this relays its agent_http
+    endpoint (scrape AGENT_HTTP_URL/metrics directly to skip the hop).
+    """
+    try:
+        upstream = requests.get(f"{AGENT_HTTP_URL}/metrics", timeout=5)
+    except requests.RequestException as e:
+        return Response(f"agent endpoint unreachable at {AGENT_HTTP_URL}: {e}\n", status=503, mimetype='text/plain')
+    return Response(upstream.text, status=upstream.status_code, mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profile', methods=['GET', 'POST'])
+def profile():
+    """Start a sampling capture of the agent thread (POST) or show the last report
+    
+    The profiler has to run in the agent process to see its thread, so
+    this relays to the agent_http endpoint (reports land in the agent's
+    PROFILE_OUTPUT_DIR).
+    """
+    seconds = request.args.get('seconds', PROFILE_DEFAULT_SECONDS, type=float)
+    try:
+        if request.method == 'POST':
+            upstream = requests.post(f"{AGENT_HTTP_URL}/profile", params={'seconds': seconds}, timeout=5)
+        else:
+            upstream = requests.get(f"{AGENT_HTTP_URL}/profile", timeout=5)
+    except requests.RequestException as e:
+        return jsonify({'error': f"agent endpoint unreachable at {AGENT_HTTP_URL}: {e}"}), 503
+    return Response(upstream.text, status=upstream.status_code, mimetype='application/json')
+
+@app.route('/api/journal/summary')
+def journal_summary():
+    """Win rate, realized P&L, fees and GMAC spent from the trade journal"""
+    agent = request.args.get('agent')
+    return jsonify(get_trade_journal().summary(agent))
+
+@app.route('/api/journal/symbols')
+def journal_symbols():
+    """Realized P&L per symbol (optionally since ?since=YYYY-MM-DD)"""
+    return jsonify(get_trade_journal().pnl_by_symbol(request.args.get('agent'), request.args.get('since')))
+
+@app.route('/api/journal/daily')
+def journal_daily():
+    """P&L and GMAC spent per day, newest first"""
+    return jsonify(get_trade_journal().pnl_by_day(request.args.get('agent'), request.args.get('symbol'),
+                                                  request.args.get('days', 30, type=int)))
+
+@app.route('/api/journal/trades')
+def journal_trades():
+    """Recent trades, filterable by symbol, strategy and agent"""
+    return jsonify(get_trade_journal().trades(symbol=request.args.get('symbol'),
+                                              strategy=request.args.get('strategy'),
+                                              agent=request.args.get('agent'),
+                                              since=request.args.get('since', type=float),
+                                              limit=request.args.get('limit', 100, type=int)))
+
+@app.route('/api/prices')
+def prices():
+    """Cached USD prices (?asset= for one, with its age and staleness)"""
+    oracle = get_price_oracle()
+    asset = request.args.get('asset')
+    if asset:
+        quote = oracle.quote(asset.upper())
+        if quote is None:
+            return jsonify({'error': f'No price for {asset}'}), 404
+        return jsonify(quote)
+    return jsonify(oracle.snapshot())
+
+@app.route('/api/portfolio')
+def portfolio():
+    """Balances and USD value of every monitored wallet (?address= for one), from the cached snapshot
+    
+    Read-only: wallets come from PORTFOLIO_WALLETS or POST /api/portfolio/wallets.
+    """
+    monitor = get_portfolio_monitor()
+    address = request.args.get('address')
+    if address:
+        try:
+            if not monitor.monitored(address):
+                return jsonify({'error': f'Wallet not monitored: {address}'}), 404
+        except ValueError:
+            return jsonify({'error': f'Invalid address: {address}'}), 400
+    snapshot = monitor.snapshot(address)
+    if snapshot is None:
+        return jsonify({'error': 'Not refreshed yet - try again shortly', 'wallets': len(monitor.wallets)}), 503
+    return jsonify(snapshot)
+
+@app.route('/api/portfolio/wallets', methods=['POST'])
+def register_wallet():
+    """Add a wallet to the monitor ({"address": ...}); its balances appear after the next refresh"""
+    address = (request.get_json(silent=True) or {}).get('address') or request.args.get('address')
+    if not address:
+        return jsonify({'error': 'address required'}), 400
+    monitor = get_portfolio_monitor()
+    try:
+        added = monitor.add_wallet(address)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'address': address, 'added': added, 'wallets': len(monitor.wallets)}), 201 if added else 200
+
 @app.route('/api/status')
 def full_status():
     """Get everything in one call"""
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Event-driven market pipeline - analyze only when something changed
+"""
+import queue
+import threading
+import logging
+from typing import Callable, Dict, List, Optional
+from config import EVENT_POLL_INTERVAL, EVENT_PRICE_MOVE_THRESHOLD, EVENT_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+CANDLE_CLOSED = "candle_closed"
+PRICE_MOVED = "price_moved"
+
+
+class MarketEventSource:
+    """Turns successive market data snapshots into events
+
+    A candle counts as closed when a newer candle timestamp appears for the
+    symbol. A price move fires when the ticker has moved more than the
+    threshold since the last event emitted for that symbol.
+    """
+
+    def __init__(self, move_threshold: float = EVENT_PRICE_MOVE_THRESHOLD):
+        self.move_threshold = move_threshold
+        self._last_candle: Dict[str, int] = {}
+        self._reference_price: Dict[str, float] = {}
+
+    def detect(self, market_data: Dict) -> List[Dict]:
+        events = []
+        for symbol, data in market_data.items():
+            candles = data.get("candles")
+            if not candles:
+                continue
+            candle_ts = candles[-1]["timestamp"]
+            price = data.get("ticker", {}).get("last") or candles[-1]["close"]
+
+            previous_ts = self._last_candle.get(symbol)
+            if previous_ts is None or candle_ts > previous_ts:
+                self._last_candle[symbol] = candle_ts
+                self._reference_price[symbol] = price
+                events.append({
+                    "type": CANDLE_CLOSED,
+                    "symbol": symbol,
+                    "timestamp": previous_ts if previous_ts is not None else candle_ts,
+                    "price": price
+                })
+                continue
+
+            reference = self._reference_price.get(symbol)
+            if reference and abs(price - reference) / reference > self.move_threshold:
+                self._reference_price[symbol] = price
+                events.append({
+                    "type": PRICE_MOVED,
+                    "symbol": symbol,
+                    "change": (price - reference) / reference,
+                    "price": price
+                })
+        return events
+
+
+class EventPipeline:
+    """Ingestion thread -> strategy worker -> execution worker
+
+    Stages are connected by bounded queues. A full queue blocks the stage
+    feeding it (backpressure), so a slow executor throttles analysis and a
+    slow strategy throttles polling instead of letting work pile up. The
+    strategy worker drains all queued events per pass, so a burst of events
+    costs one analysis.
+    """
+
+    def __init__(self,
+                 ingest: Callable[[], List[Dict]],
+                 analyze: Callable[[List[Dict]], Optional[Dict]],
+                 execute: Callable[[Dict], None],
+                 poll_interval: float = EVENT_POLL_INTERVAL,
+                 queue_size: int = EVENT_QUEUE_SIZE):
+        self.ingest = ingest
+        self.analyze = analyze
+        self.execute = execute
+        self.poll_interval = poll_interval
+        self.events = queue.Queue(maxsize=queue_size)
+        self.signals = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        self.stats = {
+            "polls": 0,
+            "events": 0,
+            "analyses": 0,
+            "signals": 0,
+            "executions": 0,
+            "backpressure_waits": 0
+        }
+
+    def start(self):
+        self._stop.clear()
+        for name, target in (("ingest", self._ingest_loop),
+                             ("strategy", self._strategy_loop),
+                             ("execution", self._execution_loop)):
+            thread = threading.Thread(target=target, name=f"events-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def join(self, timeout: Optional[float] = None):
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def run(self, duration: Optional[float] = None):
+        """Run the pipeline on background threads until stopped or duration elapses"""
+        self.start()
+        try:
+            self._stop.wait(duration)
+        finally:
+            self.stop()
+            self.join()
+
+    def _put(self, target: queue.Queue, item: Dict) -> bool:
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=self.poll_interval)
+                return True
+            except queue.Full:
+                self.stats["backpressure_waits"] += 1
+        return False
+
+    def _ingest_loop(self):
+        while not self._stop.is_set():
+            try:
+                events = self.ingest()
+            except Exception as e:
+                logger.error("Market ingestion failed: %s", e)
+                events = []
+            self.stats["polls"] += 1
+            for event in events:
+                if not self._put(self.events, event):
+                    return
+                self.stats["events"] += 1
+            self._stop.wait(self.poll_interval)
+
+    def _strategy_loop(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self.events.get(timeout=self.poll_interval)]
+            except queue.Empty:
+                continue
+            while True:
+                try:
+                    batch.append(self.events.get_nowait())
+                except queue.Empty:
+                    break
+
+            self.stats["analyses"] += 1
+            try:
+                signal = self.analyze(batch)
+            except Exception as e:
+                logger.error("Event analysis failed: %s", e)
+                continue
+            if signal and signal.get("action") != "HOLD":
+                self.stats["signals"] += 1
+                if not self._put(self.signals, signal):
+                    return
+
+    def _execution_loop(self):
+        while not self._stop.is_set():
+            try:
+                signal = self.signals.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            try:
+                self.execute(signal)
+                self.stats["executions"] += 1
+            except Exception as e:
+                logger.error("Event execution failed: %s", e)
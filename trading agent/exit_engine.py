@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Take-profit / stop-loss exit engine backed by sorted price indexes
+"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, List, Optional, Tuple
+from config import PROFIT_TARGET, STOP_LOSS
+from position_book import LONG
+
+TAKE_PROFIT = "take_profit"
+STOP = "stop_loss"
+
+
+class _LevelIndex:
+    """Sorted (level, position_id) pairs for one symbol and one direction"""
+
+    def __init__(self):
+        self.entries: List[Tuple[float, int]] = []
+
+    def add(self, level: float, position_id: int):
+        insort(self.entries, (level, position_id))
+
+    def remove(self, level: float, position_id: int):
+        index = bisect_left(self.entries, (level, position_id))
+        if index < len(self.entries) and self.entries[index] == (level, position_id):
+            del self.entries[index]
+
+    def pop_at_or_below(self, price: float) -> List[Tuple[float, int]]:
+        """Levels <= price (fire on a rising price)"""
+        end = bisect_right(self.entries, (price, float("inf")))
+        if not end:
+            return []
+        triggered = self.entries[:end]
+        del self.entries[:end]
+        return triggered
+
+    def pop_at_or_above(self, price: float) -> List[Tuple[float, int]]:
+        """Levels >= price (fire on a falling price)"""
+        start = bisect_left(self.entries, (price, -1))
+        if start == len(self.entries):
+            return []
+        triggered = self.entries[start:]
+        del self.entries[start:]
+        return triggered
+
+
+class ExitEngine:
+    """Registers PROFIT_TARGET / STOP_LOSS levels per position
+
+    Each symbol keeps two sorted indexes: levels that trigger when the price
+    rises to them and levels that trigger when it falls to them. A price
+    update is two binary searches plus the triggered slice, so the cost
+    depends on the number of exits that fire, not on how many positions are
+    open.
+    """
+
+    def __init__(self, profit_target: float = PROFIT_TARGET, stop_loss: float = STOP_LOSS):
+        self.profit_target = profit_target
+        self.stop_loss = stop_loss
+        self._rising: Dict[str, _LevelIndex] = {}
+        self._falling: Dict[str, _LevelIndex] = {}
+        # position_id -> (symbol, rising level, rising reason, falling level, falling reason)
+        self._registered: Dict[int, Tuple[str, float, str, float, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._registered)
+
+    def register(self, position_id: int, symbol: str, entry_price: float, side: int = LONG) -> Dict:
+        """Add exit levels for a newly opened position"""
+        self.unregister(position_id)
+        if side == LONG:
+            rising = (entry_price * (1 + self.profit_target), TAKE_PROFIT)
+            falling = (entry_price * (1 - self.stop_loss), STOP)
+        else:
+            rising = (entry_price * (1 + self.stop_loss), STOP)
+            falling = (entry_price * (1 - self.profit_target), TAKE_PROFIT)
+
+        self._rising.setdefault(symbol, _LevelIndex()).add(rising[0], position_id)
+        self._falling.setdefault(symbol, _LevelIndex()).add(falling[0], position_id)
+        self._registered[position_id] = (symbol, rising[0], rising[1], falling[0], falling[1])
+        return {"take_profit": rising[0] if rising[1] == TAKE_PROFIT else falling[0],
+                "stop_loss": rising[0] if rising[1] == STOP else falling[0]}
+
+    def unregister(self, position_id: int):
+        """Drop a position's levels (closed elsewhere)"""
+        entry = self._registered.pop(position_id, None)
+        if entry is None:
+            return
+        symbol, rising_level, _, falling_level, _ = entry
+        self._rising[symbol].remove(rising_level, position_id)
+        self._falling[symbol].remove(falling_level, position_id)
+
+    def check(self, prices: Dict[str, float]) -> List[Dict]:
+        """Return (and unregister) every position whose exit level was crossed"""
+        exits = []
+        for symbol, price in prices.items():
+            if not price:
+                continue
+            rising = self._rising.get(symbol)
+            falling = self._falling.get(symbol)
+            if rising is None:
+                continue
+            triggered = rising.pop_at_or_below(price) + falling.pop_at_or_above(price)
+            for level, position_id in triggered:
+                entry = self._registered.pop(position_id, None)
+                if entry is None:
+                    continue  # both levels crossed in one jump - already handled
+                _, rising_level, rising_reason, falling_level, falling_reason = entry
+                if level == rising_level:
+                    reason = rising_reason
+                    falling.remove(falling_level, position_id)
+                else:
+                    reason = falling_reason
+                    rising.remove(rising_level, position_id)
+                exits.append({
+                    "position_id": position_id,
+                    "symbol": symbol,
+                    "reason": reason,
+                    "level": level,
+                    "price": price
+                })
+        return exits
+
+    def levels(self, position_id: int) -> Optional[Dict]:
+        entry = self._registered.get(position_id)
+        if entry is None:
+            return None
+        symbol, rising_level, rising_reason, falling_level, falling_reason = entry
+        return {"symbol": symbol, rising_reason: rising_level, falling_reason: falling_level}
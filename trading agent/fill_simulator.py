@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+Paper trading fill simulation - latency, spread, slippage, partial fills and fees
+"""
+import math
+import time
+import numpy as np
+from typing import Dict, List, Optional
+from order_book import OrderBook
+from config import (
+    PAPER_FILL_LATENCY,
+    PAPER_FILL_REALTIME,
+    PAPER_SPREAD,
+    PAPER_BOOK_DEPTH,
+    PAPER_MAX_SLIPPAGE,
+    PAPER_TAKER_FEE,
+    PAPER_SNAPSHOT_MAX_AGE,
+    UNISWAP_POOL_FEE,
+    UNISWAP_POOL_LIQUIDITY
+)
+
+
+class MarketSnapshot:
+    """Last market data fetched by the heartbeat, reused to price paper orders"""
+
+    def __init__(self, max_age: float = PAPER_SNAPSHOT_MAX_AGE):
+        self.max_age = max_age
+        self._data: Dict = {}
+        self._updated_at = 0.0
+
+    def update(self, market_data: Dict):
+        self._data = market_data
+        self._updated_at = time.monotonic()
+
+    def get(self, symbol: str) -> Optional[Dict]:
+        """Symbol data if the snapshot is fresh enough, else None"""
+        if time.monotonic() - self._updated_at > self.max_age:
+            return None
+        return self._data.get(symbol)
+
+
+def latency_drift(candles: Optional[List[Dict]], latency: float) -> float:
+    """One standard deviation of price change over the latency window
+
+    Volatility is estimated from the snapshot's candle closes, so the cost of
+    latency scales with how fast the market is actually moving.
+    """
+    if not candles or len(candles) < 3 or latency <= 0:
+        return 0.0
+    closes = np.fromiter((c["close"] for c in candles), dtype=np.float64, count=len(candles))
+    if np.any(closes <= 0):
+        return 0.0
+    interval = (candles[-1]["timestamp"] - candles[0]["timestamp"]) / 1000 / (len(candles) - 1)
+    if interval <= 0:
+        return 0.0
+    sigma = float(np.std(np.diff(np.log(closes))))
+    return sigma * math.sqrt(latency / interval)
+
+
+class FillSimulator:
+    """Order book venue model (Crypto.com)
+
+    With a local order book the order walks the real resting levels.
+    Without one it is priced off the ticker touch (bid for sells, ask for
+    buys) and walked through a linear book holding ``depth`` quote notional
+    per 1% of price. Either way the price moves against us by the expected
+    drift over the fill latency, whatever would fill deeper than
+    ``max_slippage`` past the touch (or past a limit price) is left
+    unfilled, and a taker fee is charged in quote.
+    """
+
+    def __init__(self,
+                 latency: float = PAPER_FILL_LATENCY,
+                 spread: float = PAPER_SPREAD,
+                 depth: float = PAPER_BOOK_DEPTH,
+                 max_slippage: float = PAPER_MAX_SLIPPAGE,
+                 fee_rate: float = PAPER_TAKER_FEE,
+                 realtime: bool = PAPER_FILL_REALTIME):
+        self.latency = latency
+        self.spread = spread
+        self.depth = depth
+        self.max_slippage = max_slippage
+        self.fee_rate = fee_rate
+        self.realtime = realtime
+
+    def _touch(self, side: str, ticker: Dict) -> float:
+        last = ticker["last"]
+        bid, ask = ticker.get("bid") or 0, ticker.get("ask") or 0
+        if side == "BUY":
+            return ask if ask >= bid > 0 else last * (1 + self.spread / 2)
+        return bid if ask >= bid > 0 else last * (1 - self.spread / 2)
+
+    def simulate(self, side: str, quantity: float, ticker: Dict,
+                 candles: Optional[List[Dict]] = None,
+                 limit_price: Optional[float] = None,
+                 book: Optional[OrderBook] = None) -> Dict:
+        """Return filled quantity, average price, fee and whether the fill was partial"""
+        if self.realtime and self.latency > 0:
+            time.sleep(self.latency)
+
+        direction = 1 if side == "BUY" else -1
+        drift = 1 + direction * latency_drift(candles, self.latency)
+        level = None
+        if book is not None:
+            level = book.best_ask() if side == "BUY" else book.best_bid()
+        touch = level[0] if level else self._touch(side, ticker)
+        if quantity <= 0 or touch <= 0:
+            return {"filled": 0.0, "price": touch, "fee": 0.0, "partial": False, "error": "Nothing to fill"}
+
+        max_walk = self.max_slippage
+        if limit_price:
+            max_walk = min(max_walk, (limit_price / (touch * drift) - 1) * direction)
+            if max_walk < 0:
+                return {"filled": 0.0, "price": touch, "fee": 0.0, "partial": False,
+                        "error": "Limit price not marketable"}
+
+        if level:
+            price, filled = book.vwap(side, quantity, touch * (1 + direction * max_walk))
+            price *= drift
+        else:
+            # Linear book: walking a fraction x past the touch consumes depth * x / 1% notional
+            touch *= drift
+            walk = quantity * touch / (self.depth * 100)
+            filled = quantity
+            if walk > max_walk:
+                filled = quantity * max_walk / walk
+                walk = max_walk
+            price = touch * (1 + direction * walk / 2)
+
+        return {
+            "filled": filled,
+            "price": price,
+            "fee": filled * price * self.fee_rate,
+            "partial": filled < quantity,
+            "latency": self.latency
+        }
+
+
+class ConstantProductSimulator(FillSimulator):
+    """Uniswap-style x*y=k pool model
+
+    The pool holds ``liquidity`` quote value split evenly across both
+    reserves at the ticker price. Swaps pay the pool fee on the input token
+    and move the price along the curve; a swap whose price impact exceeds
+    ``max_slippage`` reverts, as it would on chain. Callers with on-chain
+    pool state pass the real pool's liquidity and fee per swap; the
+    constructor values are the fallback.
+    """
+
+    def __init__(self,
+                 liquidity: float = UNISWAP_POOL_LIQUIDITY,
+                 fee_rate: float = UNISWAP_POOL_FEE,
+                 latency: float = PAPER_FILL_LATENCY,
+                 max_slippage: float = PAPER_MAX_SLIPPAGE,
+                 realtime: bool = PAPER_FILL_REALTIME):
+        super().__init__(latency=latency, max_slippage=max_slippage, fee_rate=fee_rate, realtime=realtime)
+        self.liquidity = liquidity
+
+    def simulate(self, side: str, quantity: float, ticker: Dict,
+                 candles: Optional[List[Dict]] = None,
+                 limit_price: Optional[float] = None,
+                 book: Optional[OrderBook] = None,
+                 liquidity: Optional[float] = None,
+                 fee_rate: Optional[float] = None) -> Dict:
+        if self.realtime and self.latency > 0:
+            time.sleep(self.latency)
+
+        liquidity = liquidity or self.liquidity
+        fee_rate = self.fee_rate if fee_rate is None else fee_rate
+        direction = 1 if side == "BUY" else -1
+        mid = ticker["last"] * (1 + direction * latency_drift(candles, self.latency))
+        base_reserve = liquidity / 2 / mid
+        quote_reserve = liquidity / 2
+        if quantity <= 0 or quantity >= base_reserve:
+            return {"filled": 0.0, "price": mid, "fee": 0.0, "partial": False,
+                    "error": "Insufficient pool liquidity"}
+
+        if side == "BUY":
+            # Exact output: quote in (before fee) to take `quantity` base out
+            quote_net = quote_reserve * quantity / (base_reserve - quantity)
+            fee = quote_net / (1 - fee_rate) - quote_net
+        else:
+            # Exact input: base in, fee taken from the input amount
+            base_net = quantity * (1 - fee_rate)
+            quote_net = quote_reserve * base_net / (base_reserve + base_net)
+            fee = quantity * fee_rate * quote_net / base_net
+        price = quote_net / quantity if side == "BUY" else quote_net / (quantity * (1 - fee_rate))
+
+        impact = (price / mid - 1) * direction
+        tolerance = self.max_slippage
+        if limit_price:
+            tolerance = min(tolerance, (limit_price / mid - 1) * direction)
+        if impact > tolerance:
+            return {"filled": 0.0, "price": price, "fee": 0.0, "partial": False,
+                    "error": f"Price impact {impact:.2%} exceeds slippage tolerance"}
+
+        return {
+            "filled": quantity,
+            "price": price,
+            "fee": fee,
+            "partial": False,
+            "latency": self.latency
+        }
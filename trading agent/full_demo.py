@@ -5,16 +5,13 @@ Full Trading Agent Demo - Watch it make real trading decisions!
 import sys
 import logging
 from agent import run_agent_demo
+from log_pipeline import start_logging
 
 # Fix encoding for Windows
 sys.stdout.reconfigure(encoding='utf-8') if hasattr(sys.stdout, 'reconfigure') else None
 
 # Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+start_logging(fmt='%(asctime)s - %(levelname)s - %(message)s')
 
 if __name__ == "__main__":
     print("="*70)
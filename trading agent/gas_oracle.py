@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Gas oracle - rolling eth_feeHistory window, fee forecasts and trade gas costs from memory
+"""
+import math
+import time
+import logging
+import threading
+import requests
+from collections import deque
+from statistics import median
+from typing import Callable, Dict, List, Optional, Tuple
+from config import (
+    ETH_RPC_URL,
+    ETH_BLOCK_TIME,
+    GAS_HISTORY_BLOCKS,
+    GAS_REWARD_PERCENTILES,
+    GAS_PRIORITY_PERCENTILE,
+    GAS_FEE_HORIZON,
+    GAS_SWAP_UNITS,
+    GAS_MAX_COST_FRACTION
+)
+
+logger = logging.getLogger(__name__)
+
+GWEI = 10 ** 9
+BASE_FEE_MAX_CHANGE = 0.125  # EIP-1559: base fee moves at most 12.5% per block
+
+
+class GasOracle:
+    """Fee estimates kept current off the trading path
+
+    The oracle holds the last `window` blocks of eth_feeHistory (base fee,
+    gas used ratio and the priority fees paid at each of `percentiles`).
+    The first update() loads the whole window; after that each update asks
+    only for the blocks mined since the last one (usually one), and is a
+    no-op until the next block is due. Estimates are recomputed once per
+    new block and every read - fees(), base_fee(), priority_fee(),
+    gas_cost_usd() - is answered from memory.
+
+    Base fee: feeHistory already returns the next block's base fee; later
+    blocks are projected with the EIP-1559 update rule at the window's
+    average gas used ratio. The max fee offered is sized for the worst
+    case over `horizon` blocks (+12.5% per full block). Priority fee: the
+    median over the window of each sampled percentile.
+    """
+
+    def __init__(self, rpc_url: str = ETH_RPC_URL, window: int = GAS_HISTORY_BLOCKS,
+                 percentiles: List[int] = GAS_REWARD_PERCENTILES,
+                 priority_percentile: int = GAS_PRIORITY_PERCENTILE,
+                 horizon: int = GAS_FEE_HORIZON, block_time: float = ETH_BLOCK_TIME,
+                 timeout: float = 10.0):
+        self.rpc_url = rpc_url
+        self.window = window
+        self.percentiles = list(percentiles)
+        self.priority_percentile = priority_percentile
+        self.horizon = horizon
+        self.block_time = block_time
+        self.timeout = timeout
+        self.block = 0  # newest block in the window
+        self._blocks: deque = deque(maxlen=window)  # (number, base fee, gas used ratio, rewards)
+        self._estimates: Optional[Dict] = None
+        self._fresh_until = 0.0
+        self._last_update = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.requests = 0
+
+    # ------------------------------------------------------------------
+    # Fee history
+    # ------------------------------------------------------------------
+
+    def _fee_history(self, count: int) -> Optional[Dict]:
+        payload = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "eth_feeHistory",
+            "params": [hex(count), "latest", self.percentiles]
+        }
+        try:
+            self.requests += 1
+            body = requests.post(self.rpc_url, json=payload, timeout=self.timeout).json()
+            if "error" in body:
+                logger.error("eth_feeHistory failed: %s", body["error"])
+                return None
+            return body["result"]
+        except Exception as e:
+            logger.error("eth_feeHistory from %s failed: %s", self.rpc_url, e)
+            return None
+
+    def update(self, force: bool = False) -> bool:
+        """Pull blocks mined since the last update; True if the window moved"""
+        now = time.time()
+        if not force and now < self._fresh_until:
+            return False
+        if self._blocks:
+            # Blocks expected since the last update, plus one of overlap to detect gaps
+            expected = math.ceil((now - self._last_update) / self.block_time)
+            count = min(self.window, max(1, expected) + 1)
+        else:
+            count = self.window
+        history = self._fee_history(count)
+        if history is None:
+            self._fresh_until = now + 1.0  # keep serving the last estimates
+            return False
+
+        oldest = int(history["oldestBlock"], 16)
+        newest = oldest + len(history["gasUsedRatio"]) - 1
+        if self._blocks and oldest > self.block + 1 and count < self.window:
+            # Fell behind by more than we asked for - reload the whole window
+            history = self._fee_history(self.window) or history
+            oldest = int(history["oldestBlock"], 16)
+            newest = oldest + len(history["gasUsedRatio"]) - 1
+
+        self._last_update = now
+        if newest <= self.block:
+            self._fresh_until = now + 1.0  # next block not mined yet
+            return False
+        self._fresh_until = now + self.block_time
+
+        base_fees = [int(fee, 16) for fee in history["baseFeePerGas"]]
+        rewards = history.get("reward") or [[] for _ in history["gasUsedRatio"]]
+        with self._lock:
+            for index, ratio in enumerate(history["gasUsedRatio"]):
+                number = oldest + index
+                if number <= self.block:
+                    continue
+                self._blocks.append((number, base_fees[index], ratio,
+                                     tuple(int(reward, 16) for reward in rewards[index])))
+            self.block = newest
+            self._estimates = self._estimate(base_fees[-1])  # last entry is the next block's base fee
+        return True
+
+    def _estimate(self, next_base_fee: int) -> Dict:
+        ratios = [ratio for _, _, ratio, _ in self._blocks]
+        average_ratio = sum(ratios) / len(ratios)
+        trend = 1 + BASE_FEE_MAX_CHANGE * max(-1.0, min(1.0, (average_ratio - 0.5) / 0.5))
+        priority = {}
+        for index, percentile in enumerate(self.percentiles):
+            samples = [reward[index] for _, _, _, reward in self._blocks if len(reward) > index]
+            priority[percentile] = int(median(samples)) if samples else 0
+        return {
+            "block": self.block,
+            "next_base_fee": next_base_fee,
+            "trend": trend,
+            "gas_used_ratio": average_ratio,
+            "priority": priority,
+            "updated": time.time()
+        }
+
+    # ------------------------------------------------------------------
+    # Estimates (from memory)
+    # ------------------------------------------------------------------
+
+    def estimates(self) -> Optional[Dict]:
+        """Snapshot of the current estimates, None before the first successful update"""
+        with self._lock:
+            return dict(self._estimates) if self._estimates else None
+
+    def base_fee(self, blocks_ahead: int = 1) -> Optional[int]:
+        """Forecast base fee (wei) `blocks_ahead` blocks out; 1 is the next block (exact)"""
+        estimates = self.estimates()
+        if estimates is None:
+            return None
+        return int(estimates["next_base_fee"] * estimates["trend"] ** max(0, blocks_ahead - 1))
+
+    def priority_fee(self, percentile: Optional[int] = None) -> Optional[int]:
+        """Median tip (wei) at the sampled percentile nearest to `percentile`"""
+        estimates = self.estimates()
+        if estimates is None:
+            return None
+        wanted = self.priority_percentile if percentile is None else percentile
+        nearest = min(estimates["priority"], key=lambda p: abs(p - wanted))
+        return estimates["priority"][nearest]
+
+    def fees(self) -> Tuple[int, int]:
+        """(max_fee_per_gas, max_priority_fee_per_gas) in wei - drop-in for TxPipeline(fees=...)"""
+        self.update()
+        estimates = self.estimates()
+        if estimates is None:
+            raise RuntimeError(f"No fee history from {self.rpc_url}")
+        priority = self.priority_fee()
+        worst_base = estimates["next_base_fee"] * (1 + BASE_FEE_MAX_CHANGE) ** max(0, self.horizon - 1)
+        return int(worst_base) + priority, priority
+
+    def gas_cost_eth(self, gas_units: int = GAS_SWAP_UNITS) -> Optional[float]:
+        """Expected cost in ETH of a transaction using gas_units, mined in the next block"""
+        base_fee, priority = self.base_fee(), self.priority_fee()
+        if base_fee is None:
+            return None
+        return gas_units * (base_fee + priority) / 1e18
+
+    def gas_cost_usd(self, eth_price: Optional[float], gas_units: int = GAS_SWAP_UNITS) -> Optional[float]:
+        cost = self.gas_cost_eth(gas_units)
+        if cost is None or not eth_price:
+            return None
+        return cost * eth_price
+
+    def worth_trading(self, notional_usd: float, eth_price: Optional[float],
+                      gas_units: int = GAS_SWAP_UNITS,
+                      max_fraction: float = GAS_MAX_COST_FRACTION) -> bool:
+        """False when gas would eat more than max_fraction of the trade (or can't be estimated)"""
+        cost = self.gas_cost_usd(eth_price, gas_units)
+        return cost is not None and cost <= notional_usd * max_fraction
+
+    # ------------------------------------------------------------------
+    # Background updates
+    # ------------------------------------------------------------------
+
+    def start(self) -> "GasOracle":
+        """Keep the window current on a background thread (one request per block)"""
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.update()
+                except Exception as e:
+                    logger.error("Gas oracle update failed: %s", e)
+                self._stop.wait(max(0.5, self._fresh_until - time.time()))
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="gas-oracle", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    oracle = GasOracle()
+    if not oracle.update():
+        print(f"No fee history from {oracle.rpc_url}")
+    else:
+        max_fee, priority = oracle.fees()
+        print(f"Block {oracle.block}: next base fee {oracle.base_fee() / GWEI:.2f} gwei, "
+              f"in {oracle.horizon} blocks {oracle.base_fee(oracle.horizon) / GWEI:.2f} gwei")
+        for percentile in oracle.percentiles:
+            print(f"  Priority p{percentile}: {oracle.priority_fee(percentile) / GWEI:.3f} gwei")
+        print(f"  Max fee offered: {max_fee / GWEI:.2f} gwei")
+        print(f"  Swap ({GAS_SWAP_UNITS} gas): {oracle.gas_cost_eth():.6f} ETH")
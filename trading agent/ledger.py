@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Fixed-point paper ledger - balances held as integer base units per asset
+"""
+import time
+from collections import deque
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR, ROUND_HALF_EVEN
+from typing import Deque, Dict, List, Optional
+from config import ASSET_DECIMALS, DEFAULT_ASSET_DECIMALS, LEDGER_AUDIT_SIZE
+
+
+class Ledger:
+    """Paper balances in integer base units (wei for 18-decimal tokens, etc.)
+
+    All arithmetic on balances is integer, so thousands of fills never
+    drift and every balance is directly comparable with an on-chain
+    amount. Floats only appear at the edges: to_units() converts a float
+    through its shortest decimal repr, and fills round in the house's
+    favour - a purchase's cost rounds up, a sale's proceeds round down -
+    while base quantities round to nearest so selling exactly what was
+    bought leaves zero. Every movement is appended to a bounded audit
+    trail of (seq, time, asset, delta, balance, memo) tuples.
+    """
+
+    def __init__(self, balances: Optional[Dict[str, float]] = None,
+                 decimals: Optional[Dict[str, int]] = None,
+                 audit_size: int = LEDGER_AUDIT_SIZE):
+        self.decimals = dict(ASSET_DECIMALS if decimals is None else decimals)
+        self._units: Dict[str, int] = {}
+        self._audit: Deque[tuple] = deque(maxlen=audit_size)
+        self.sequence = 0
+        for asset, amount in (balances or {}).items():
+            self._units[asset] = self.to_units(asset, amount)
+
+    def scale(self, asset: str) -> int:
+        return 10 ** self.decimals.get(asset, DEFAULT_ASSET_DECIMALS)
+
+    def to_units(self, asset: str, amount: float, rounding: str = ROUND_HALF_EVEN) -> int:
+        """Convert a float amount of an asset to integer base units"""
+        return int((Decimal(repr(float(amount))) * self.scale(asset)).to_integral_value(rounding))
+
+    def from_units(self, asset: str, units: int) -> float:
+        return units / self.scale(asset)
+
+    def units(self, asset: str) -> int:
+        return self._units.get(asset, 0)
+
+    def balance(self, asset: str) -> float:
+        return self.from_units(asset, self._units.get(asset, 0))
+
+    def balances(self) -> Dict[str, float]:
+        """Every balance as a float (display and sizing only)"""
+        return {asset: self.from_units(asset, units) for asset, units in self._units.items()}
+
+    def _post(self, asset: str, delta: int, memo: str):
+        balance = self._units.get(asset, 0) + delta
+        self._units[asset] = balance
+        self.sequence += 1
+        self._audit.append((self.sequence, time.time(), asset, delta, balance, memo))
+
+    def credit(self, asset: str, units: int, memo: str = ""):
+        self._post(asset, units, memo)
+
+    def debit(self, asset: str, units: int, memo: str = "") -> bool:
+        """Take units from an asset; False (and no change) if the balance is short"""
+        if self._units.get(asset, 0) < units:
+            return False
+        self._post(asset, -units, memo)
+        return True
+
+    def apply_fill(self, base: str, quote: str, side: str, quantity: float,
+                   price: float, fee: float = 0.0) -> Optional[str]:
+        """Settle a fill of `quantity` base at `price` quote; returns an error if unfunded"""
+        base_units = self.to_units(base, quantity)
+        memo = f"{side} {quantity} {base}_{quote} @ {price}"
+        if side == "BUY":
+            cost = self.to_units(quote, quantity * price + fee, ROUND_CEILING)
+            if not self.debit(quote, cost, memo):
+                return "Insufficient balance"
+            self.credit(base, base_units, memo)
+        elif side == "SELL":
+            if not self.debit(base, base_units, memo):
+                return "Insufficient balance"
+            revenue = self.to_units(quote, quantity * price - fee, ROUND_FLOOR)
+            self.credit(quote, revenue, memo)
+        return None
+
+    def audit(self, limit: Optional[int] = None) -> List[tuple]:
+        """Most recent movements, oldest first"""
+        entries = list(self._audit)
+        return entries[-limit:] if limit else entries
+
+    def get_state(self) -> Dict:
+        # Units as strings: 18-decimal balances overflow JSON readers that parse numbers as doubles
+        return {"units": {asset: str(units) for asset, units in self._units.items()},
+                "sequence": self.sequence}
+
+    def set_state(self, state: Dict):
+        self._units = {asset: int(units) for asset, units in state["units"].items()}
+        self.sequence = state["sequence"]
+        self._audit.clear()
@@ -6,14 +6,11 @@ import sys
 import logging
 import time
 from agent import TradingAgent
+from log_pipeline import start_logging, stop_logging
 
 sys.stdout.reconfigure(encoding='utf-8') if hasattr(sys.stdout, 'reconfigure') else None
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(message)s',
-    handlers=[logging.StreamHandler(sys.stdout)]
-)
+start_logging(fmt='%(asctime)s - %(message)s')
 
 logger = logging.getLogger(__name__)
 
@@ -41,29 +38,27 @@ Will run 15 cycles (~7.5 minutes). Press Ctrl+C to stop early.
     
     try:
         for i in range(cycles):
-            print(f"\n{'*'*70}")
-            print(f" Cycle {i+1}/{cycles} - {time.strftime('%H:%M:%S')}")
-            print('*'*70)
+            logger.info("Cycle %d/%d", i + 1, cycles)
             
             if not agent.heartbeat():
                 logger.error("Agent has died!")
                 break
             
             # Show current status
-            print(f"\n>>> Status: GMAC={agent.gmac:.1f} | "
-                  f"Goodwill={agent.goodwill} | "
-                  f"Trades={agent.trades_executed}")
+            logger.info(">>> Status: GMAC=%.1f | Goodwill=%s | Trades=%d",
+                        agent.gmac, agent.goodwill, agent.trades_executed)
             
             if agent.survival_mode:
-                print(">>> MODE: SURVIVAL (conserving energy)")
+                logger.info(">>> MODE: SURVIVAL (conserving energy)")
             elif agent.critical_mode:
-                print(">>> MODE: CRITICAL (minimal operations)")
+                logger.info(">>> MODE: CRITICAL (minimal operations)")
             
             if i < cycles - 1:
-                print(f"\nNext heartbeat in {cycle_interval} seconds...")
+                logger.info("Next heartbeat in %d seconds...", cycle_interval)
                 time.sleep(cycle_interval)
         
-        # Final report
+        # Final report (drain queued log lines first)
+        stop_logging()
         print("\n" + "="*70)
         print(" "*20 + "SESSION COMPLETE")
         print("="*70)
@@ -74,7 +69,9 @@ Will run 15 cycles (~7.5 minutes). Press Ctrl+C to stop early.
         print(f"Total Heartbeats: {agent.heartbeats}")
         print(f"Trades Executed: {agent.trades_executed}")
         print(f"Win/Loss: {agent.winning_trades}/{agent.losing_trades}")
-        print(f"Total P&L: ${agent.total_pnl:.2f}")
+        valuation = agent._value_account()
+        print(f"Equity: ${valuation['total_usd']:.2f}")
+        print(f"Total P&L: ${valuation['pnl_usd']:.2f}")
         print(f"\nFinal Balance:")
         for currency, amount in agent.trader.get_balance().items():
             if amount > 0.0001:
@@ -82,6 +79,7 @@ Will run 15 cycles (~7.5 minutes). Press Ctrl+C to stop early.
         print()
         
     except KeyboardInterrupt:
+        stop_logging()
         print("\n\nSession interrupted by user")
         print(f"\nQuick Stats:")
         print(f"  GMAC: {agent.gmac:.2f}")
@@ -82,6 +82,13 @@ print()
 from enhanced_wallet import EnhancedWalletTrader
 from web3 import Web3
 from eth_account import Account
+from uniswap_trading import UniswapTrader, TOKENS
+from strategy import get_strategy
+from tx_pipeline import TxPipeline
+from gas_oracle import GasOracle, GWEI
+from price_oracle import get_price_oracle
+from portfolio_monitor import get_portfolio_monitor
+from config import STRATEGY_TYPE, LIVE_SWAP_SLIPPAGE, GAS_SWAP_UNITS
 
 # Verify wallet access
 print("Step 1: Verifying wallet access...")
@@ -145,9 +152,44 @@ print("Press Ctrl+C anytime to STOP")
 print()
 print("-"*70)
 
+# Transaction pipeline: local nonces, approvals cached, receipts tracked in the background
+if wallet.w3 is None:
+    print("ERROR: No Ethereum RPC connection - cannot send transactions")
+    sys.exit(1)
+gas_oracle = GasOracle()
+if not gas_oracle.update():
+    print("ERROR: No fee history from the RPC node - cannot price gas")
+    sys.exit(1)
+gas_oracle.start()
+swap_gas_eth = gas_oracle.gas_cost_eth(GAS_SWAP_UNITS)
+if swap_gas_eth is None:
+    print("ERROR: Gas oracle has no estimate - cannot price swaps")
+    sys.exit(1)
+covered = f"{eth_balance / swap_gas_eth:.0f} swaps covered by balance" if swap_gas_eth > 0 else "no base fee or tip"
+print(f"Gas: base fee {gas_oracle.base_fee() / GWEI:.2f} gwei, tip {gas_oracle.priority_fee() / GWEI:.3f} gwei"
+      f" - a swap costs up to ~{swap_gas_eth:.6f} ETH ({covered})")
+if eth_balance < swap_gas_eth:
+    print("ERROR: ETH balance cannot cover the gas of a single swap")
+    sys.exit(1)
+
+pipeline = TxPipeline(wallet.w3, account, fees=gas_oracle.fees)
+# Balances are read from the portfolio monitor's cached snapshot - no RPC call per cycle
+monitor = get_portfolio_monitor()
+if monitor.add_wallet(WALLET_ADDRESS):
+    monitor.refresh_now()
+trader = UniswapTrader()
+strategy = get_strategy(STRATEGY_TYPE)
+
+def on_final(record):
+    print(f"  [{record['status'].upper()}] {record['label']} (nonce {record['nonce']})")
+
+pipeline.subscribe(on_final)
+
 # Start trading loop
 spent_so_far = 0
 trade_count = 0
+SYMBOL = "WETH_USDC"
+FEE_TIER = 500  # USDC/WETH 0.05% pool
 
 print()
 print("Starting market monitoring...")
@@ -155,31 +197,71 @@ print()
 
 try:
     while spent_so_far < TOTAL_BUDGET:
-        print(f"\n[Cycle {trade_count + 1}] Budget remaining: ${TOTAL_BUDGET - spent_so_far:.2f}")
+        print(f"\n[Cycle {trade_count + 1}] Budget remaining: ${TOTAL_BUDGET - spent_so_far:.2f}"
+              f" | {pipeline.in_flight} transaction(s) in flight")
         
-        # Simulate market analysis
         time.sleep(10)
         print("Analyzing market...")
+        market_data = trader.get_market_data([SYMBOL])
+        signal = strategy.analyze(market_data)
+        if not signal or signal.get("action") != "BUY":
+            print("  No buy signal")
+            continue
+        
+        held = monitor.balances(WALLET_ADDRESS)
+        if held is None or held["stale"]:
+            print("  Wallet balances not refreshed yet")
+            continue
+        if held["balances"].get("ETH", 0.0) < swap_gas_eth:
+            print(f"  Skipped: {held['balances'].get('ETH', 0.0):.6f} ETH cannot cover a swap's gas")
+            continue
+        amount_usd = min(MAX_TRADE, TOTAL_BUDGET - spent_so_far, held["balances"].get("USDC", 0.0))
+        if amount_usd <= 0:
+            print("  No USDC left in the wallet")
+            continue
+        # Quote the pool the swap goes through, not the best (possibly multi-hop) route
+        expected_weth = trader.pool_quote("USDC", "WETH", FEE_TIER / 1e6, amount_usd)
+        if not expected_weth:
+            print("  No on-chain state for the USDC/WETH 0.05% pool")
+            continue
+        min_out = int(expected_weth * (1 - LIVE_SWAP_SLIPPAGE) * 10 ** TOKENS["WETH"]["decimals"])
+        print(f"  Signal: BUY {expected_weth:.6f} WETH for ${amount_usd:.2f} USDC "
+              f"(confidence {signal['confidence'] * 100:.0f}%)")
         
-        # For safety, let's just show what WOULD happen
-        print()
-        print("This is a framework demo - actual trading requires:")
-        print("  1. Uniswap Router contract integration")
-        print("  2. Token approval transactions")
-        print("  3. Swap execution")
-        print("  4. Gas fee estimation")
-        print()
-        print("To proceed with real trading, we need to:")
-        print("  - Add Uniswap V3 router contract")
-        print("  - Implement token approvals")
-        print("  - Add slippage protection")
-        print()
+        # Gas is priced from the oracle's cached fee history - no estimateGas round trip
+        eth_price = get_price_oracle().price("ETH") or amount_usd / expected_weth
+        gas_usd = gas_oracle.gas_cost_usd(eth_price, GAS_SWAP_UNITS)
+        if not gas_oracle.worth_trading(amount_usd, eth_price, GAS_SWAP_UNITS):
+            print(f"  Skipped: gas ~${gas_usd or 0:.2f} is too large for a ${amount_usd:.2f} trade")
+            continue
+        print(f"  Expected gas: ~${gas_usd:.2f}")
         
-        break
+        if REQUIRE_CONFIRM and input("  Execute this swap? (yes/no): ").lower() != "yes":
+            print("  Skipped")
+            continue
+        
+        # Approval (if the cached allowance is short) and swap go out back to back
+        records = pipeline.swap_exact_input(TOKENS["USDC"]["address"], TOKENS["WETH"]["address"], FEE_TIER,
+                                            int(amount_usd * 10 ** TOKENS["USDC"]["decimals"]), min_out,
+                                            gas=GAS_SWAP_UNITS)
+        for record in records:
+            print(f"  Sent {record['label']} (nonce {record['nonce']}): {record['hashes'][0].hex()}")
+        spent_so_far += amount_usd
+        trade_count += 1
 
 except KeyboardInterrupt:
     print("\n\nTrading stopped by user")
 
+if pipeline.in_flight:
+    print(f"\nWaiting for {pipeline.in_flight} transaction(s) to confirm...")
+    try:
+        while pipeline.in_flight:
+            time.sleep(2)
+    except KeyboardInterrupt:
+        pass
+pipeline.stop()
+gas_oracle.stop()
+
 print()
 print("="*70)
 print("SESSION COMPLETE")
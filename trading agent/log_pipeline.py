@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Asynchronous logging pipeline - keeps log I/O off the heartbeat
+
+Callers only enqueue the raw LogRecord (message template + args); message
+formatting, stream writes and JSONL encoding all happen on a background
+QueueListener thread. The queue is bounded and never blocks: when the
+writer falls behind, new records are dropped and counted instead of
+stalling the agent.
+
+Because formatting is deferred, pass immutable values (numbers, strings)
+as log arguments rather than objects that may change after the call.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional
+from config import LOG_LEVEL, LOG_QUEUE_SIZE, LOG_STOP_TIMEOUT, LOG_JSONL_FILE
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that ships unformatted records and drops when full"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock handler formats here, on the caller's thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop sentinel waits for room in a full queue
+
+    The stock sentinel goes in with put_nowait, which raises queue.Full
+    exactly when shutdown matters most - with the queue backed up.
+    """
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel, timeout=LOG_STOP_TIMEOUT)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Compact one-object-per-line event records
+
+    The message template and its arguments are stored separately, so no
+    prose is rendered. Structured fields can be attached with
+    ``logger.info("trade", extra={"event": {...}})``.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.msg if isinstance(record.msg, str) else str(record.msg)
+        }
+        if record.args:
+            entry["args"] = record.args
+        event = getattr(record, "event", None)
+        if event:
+            entry["event"] = event
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(",", ":"))
+
+
+_listener: Optional[DrainingQueueListener] = None
+_handler: Optional[DeferredQueueHandler] = None
+_sinks = []
+
+
+def start_logging(level: str = LOG_LEVEL,
+                  fmt: str = '%(asctime)s - %(message)s',
+                  jsonl_file: Optional[str] = LOG_JSONL_FILE,
+                  stream=None) -> DrainingQueueListener:
+    """Route the root logger through the background writer (idempotent)"""
+    global _listener, _handler, _sinks
+    if _listener is not None:
+        return _listener
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+
+    stream_handler = logging.StreamHandler(stream or sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(fmt))
+    sinks = [stream_handler]
+
+    if jsonl_file:
+        file_handler = logging.FileHandler(jsonl_file, encoding="utf-8")
+        file_handler.setFormatter(JsonLinesFormatter())
+        sinks.append(file_handler)
+
+    _sinks = sinks
+    _handler = DeferredQueueHandler(log_queue)
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_handler)
+    root.setLevel(level)
+
+    _listener = DrainingQueueListener(log_queue, *sinks, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def flush_logging():
+    """Block until every queued record has been written"""
+    if _listener is not None:
+        _listener.queue.join()
+
+
+def stop_logging():
+    """Drain the queue, stop the writer thread and fall back to direct writes"""
+    global _listener
+    if _listener is None:
+        return
+    try:
+        _listener.stop()
+    except queue.Full:
+        # Writer stalled for LOG_STOP_TIMEOUT - leave its daemon thread and what is still queued
+        sys.stderr.write(f"log pipeline writer stalled - {_listener.queue.qsize()} records not written\n")
+    _listener = None
+
+    root = logging.getLogger()
+    root.removeHandler(_handler)
+    for sink in _sinks:
+        root.addHandler(sink)
+    if _handler is not None and _handler.dropped:
+        sys.stderr.write(f"log pipeline dropped {_handler.dropped} records\n")
+
+
+def dropped_records() -> int:
+    """Records discarded because the writer could not keep up"""
+    return _handler.dropped if _handler is not None else 0
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Heartbeat instrumentation - per-phase latency histograms and counters
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+# Quantiles exported for every phase histogram
+EXPORTED_QUANTILES = (0.5, 0.9, 0.99)
+
+# (family, type, help) in exposition order
+PROMETHEUS_FAMILIES = [
+    ("agent_phase_latency_seconds", "summary", "Heartbeat phase latency quantiles"),
+    ("agent_phase_latency_max_seconds", "gauge", "Slowest observed heartbeat phase"),
+    ("agent_phase_api_calls_total", "counter", "Exchange/RPC calls made per heartbeat phase"),
+    ("agent_phase_gmac_spent_total", "counter", "GMAC consumed per heartbeat phase"),
+    ("agent_events_total", "counter", "Agent event counters (cache hits, exits, ...)"),
+]
+
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of latencies (microsecond resolution)
+
+    Values below 2**sub_bucket_bits are counted exactly; larger values land in
+    power-of-two magnitudes split into 2**(sub_bucket_bits - 1) sub-buckets, so
+    every recorded value keeps roughly 1% relative precision with a fixed,
+    preallocated counts array.
+    """
+
+    def __init__(self, sub_bucket_bits: int = 7, max_value_us: int = 1 << 40):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.sub_bucket_half = self.sub_bucket_count >> 1
+        self.counts = [0] * (self._index(max_value_us) + 1)
+        self.max_value_us = max_value_us
+        self.total_count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_bucket_count:
+            return value
+        magnitude = value.bit_length() - self.sub_bucket_bits
+        return magnitude * self.sub_bucket_half + (value >> magnitude)
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < self.sub_bucket_count:
+            return index
+        magnitude = (index - self.sub_bucket_count) // self.sub_bucket_half + 1
+        sub_bucket = index - magnitude * self.sub_bucket_half
+        return (sub_bucket << magnitude) + (1 << magnitude) - 1
+
+    def record(self, seconds: float):
+        """Record one latency sample given in seconds"""
+        value = min(max(int(seconds * 1e6), 0), self.max_value_us)
+        self.counts[self._index(value)] += 1
+        self.total_count += 1
+        self.total_us += value
+        if value > self.max_us:
+            self.max_us = value
+
+    def percentile(self, quantile: float) -> float:
+        """Latency in seconds at the given quantile (0..1)"""
+        if self.total_count == 0:
+            return 0.0
+        target = max(1, int(quantile * self.total_count + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count:
+                seen += count
+                if seen >= target:
+                    return min(self._highest_equivalent(index), self.max_us) / 1e6
+        return self.max_us / 1e6
+
+    def summary(self) -> Dict:
+        """p50/p99/max snapshot in seconds"""
+        return {
+            "count": self.total_count,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+            "max": self.max_us / 1e6,
+            "mean": (self.total_us / self.total_count / 1e6) if self.total_count else 0.0
+        }
+
+
+class HeartbeatMetrics:
+    """Per-agent phase timers, API call counters and GMAC spend"""
+
+    def __init__(self, agent_name: str):
+        self.agent_name = agent_name
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.api_calls: Dict[str, int] = {}
+        self.gmac_spent: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block of work with the monotonic clock"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, phase: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(phase)
+            if histogram is None:
+                histogram = self.histograms[phase] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def count_api_calls(self, phase: str, calls: int = 1):
+        if calls <= 0:
+            return
+        with self._lock:
+            self.api_calls[phase] = self.api_calls.get(phase, 0) + calls
+
+    def spend_gmac(self, phase: str, amount: float):
+        with self._lock:
+            self.gmac_spent[phase] = self.gmac_spent.get(phase, 0.0) + amount
+
+    def increment(self, counter: str, amount: int = 1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def snapshot(self) -> Dict:
+        """Plain-dict view for logging and JSON endpoints"""
+        with self._lock:
+            return {
+                "phases": {name: h.summary() for name, h in self.histograms.items()},
+                "api_calls": dict(self.api_calls),
+                "gmac_spent": dict(self.gmac_spent),
+                "counters": dict(self.counters)
+            }
+
+    def prometheus_samples(self) -> Dict[str, List[str]]:
+        """Prometheus sample lines grouped by metric family"""
+        agent = _escape_label(self.agent_name)
+        families = {family: [] for family, _, _ in PROMETHEUS_FAMILIES}
+        with self._lock:
+            for name, histogram in sorted(self.histograms.items()):
+                labels = f'agent="{agent}",phase="{_escape_label(name)}"'
+                latency = families["agent_phase_latency_seconds"]
+                for quantile in EXPORTED_QUANTILES:
+                    latency.append(f'agent_phase_latency_seconds{{{labels},quantile="{quantile}"}} '
+                                   f'{histogram.percentile(quantile):.6f}')
+                latency.append(f'agent_phase_latency_seconds_sum{{{labels}}} {histogram.total_us / 1e6:.6f}')
+                latency.append(f'agent_phase_latency_seconds_count{{{labels}}} {histogram.total_count}')
+                families["agent_phase_latency_max_seconds"].append(
+                    f'agent_phase_latency_max_seconds{{{labels}}} {histogram.max_us / 1e6:.6f}')
+            for name, calls in sorted(self.api_calls.items()):
+                families["agent_phase_api_calls_total"].append(
+                    f'agent_phase_api_calls_total{{agent="{agent}",phase="{_escape_label(name)}"}} {calls}')
+            for name, spent in sorted(self.gmac_spent.items()):
+                families["agent_phase_gmac_spent_total"].append(
+                    f'agent_phase_gmac_spent_total{{agent="{agent}",phase="{_escape_label(name)}"}} {spent:.4f}')
+            for name, value in sorted(self.counters.items()):
+                families["agent_events_total"].append(
+                    f'agent_events_total{{agent="{agent}",event="{_escape_label(name)}"}} {value}')
+        return families
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide registry of every agent in this process (served by agent_http)
+_registry: Dict[str, HeartbeatMetrics] = {}
+_registry_lock = threading.Lock()
+
+
+def get_agent_metrics(agent_name: str) -> HeartbeatMetrics:
+    """Get (or create) the metrics for an agent"""
+    with _registry_lock:
+        metrics = _registry.get(agent_name)
+        if metrics is None:
+            metrics = _registry[agent_name] = HeartbeatMetrics(agent_name)
+        return metrics
+
+
+def render_prometheus() -> str:
+    """Render all registered agents in Prometheus text format"""
+    with _registry_lock:
+        agents = list(_registry.values())
+
+    samples = [metrics.prometheus_samples() for metrics in agents]
+    lines = []
+    for family, metric_type, help_text in PROMETHEUS_FAMILIES:
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {metric_type}")
+        for agent_samples in samples:
+            lines.extend(agent_samples[family])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Multicall3 over plain JSON-RPC - many contract reads in one eth_call
+"""
+import logging
+import requests
+from typing import List, Optional, Tuple
+from config import ETH_RPC_URL, MULTICALL3_ADDRESS
+
+logger = logging.getLogger(__name__)
+
+# Function selectors (first 4 bytes of keccak256 of the signature)
+TRY_BLOCK_AND_AGGREGATE = bytes.fromhex("399542e9")  # tryBlockAndAggregate(bool,(address,bytes)[])
+GET_CURRENT_BLOCK_TIMESTAMP = bytes.fromhex("0f28c97d")  # getCurrentBlockTimestamp()
+GET_ETH_BALANCE = bytes.fromhex("4d2301cc")  # getEthBalance(address)
+
+
+def _word(value: int) -> bytes:
+    return value.to_bytes(32, "big")
+
+
+def _address_word(address: str) -> bytes:
+    return bytes(12) + bytes.fromhex(address[2:] if address.startswith("0x") else address)
+
+
+def _padded(data: bytes) -> bytes:
+    return data + bytes(-len(data) % 32)
+
+
+def encode_aggregate(calls: List[Tuple[str, bytes]], require_success: bool = False) -> bytes:
+    """ABI-encode tryBlockAndAggregate(requireSuccess, [(target, callData), ...])"""
+    tuples = []
+    for target, call_data in calls:
+        tuples.append(_address_word(target) + _word(64) + _word(len(call_data)) + _padded(call_data))
+    offsets, position = [], 32 * len(tuples)
+    for encoded in tuples:
+        offsets.append(_word(position))
+        position += len(encoded)
+    array = _word(len(tuples)) + b"".join(offsets) + b"".join(tuples)
+    return TRY_BLOCK_AND_AGGREGATE + _word(int(require_success)) + _word(64) + array
+
+
+def decode_aggregate(data: bytes) -> Tuple[int, List[Tuple[bool, bytes]]]:
+    """Decode (blockNumber, blockHash, [(success, returnData), ...])"""
+    def word(offset: int) -> int:
+        return int.from_bytes(data[offset:offset + 32], "big")
+
+    block_number = word(0)
+    array = word(64)
+    count = word(array)
+    base = array + 32
+    results = []
+    for index in range(count):
+        start = base + word(base + 32 * index)
+        success = bool(word(start))
+        payload = start + word(start + 32)
+        length = word(payload)
+        results.append((success, data[payload + 32:payload + 32 + length]))
+    return block_number, results
+
+
+class Multicall:
+    """Batches read calls into one eth_call against the Multicall3 contract
+
+    Every batch also asks the contract for the block timestamp, so callers
+    learn which block (and when) the whole batch was read at.
+    """
+
+    def __init__(self, rpc_url: str = ETH_RPC_URL, address: str = MULTICALL3_ADDRESS,
+                 timeout: float = 10.0):
+        self.rpc_url = rpc_url
+        self.address = address
+        self.timeout = timeout
+        self.requests = 0
+
+    def call(self, calls: List[Tuple[str, bytes]]) -> Optional[Tuple[int, int, List[Tuple[bool, bytes]]]]:
+        """Run calls in one eth_call; returns (block, block timestamp, results) or None"""
+        batch = [(self.address, GET_CURRENT_BLOCK_TIMESTAMP)] + list(calls)
+        payload = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "eth_call",
+            "params": [{"to": self.address, "data": "0x" + encode_aggregate(batch).hex()}, "latest"]
+        }
+        try:
+            self.requests += 1
+            response = requests.post(self.rpc_url, json=payload, timeout=self.timeout)
+            body = response.json()
+            if "error" in body:
+                logger.error("Multicall failed: %s", body["error"])
+                return None
+            block, results = decode_aggregate(bytes.fromhex(body["result"][2:]))
+        except Exception as e:
+            logger.error("Multicall to %s failed: %s", self.rpc_url, e)
+            return None
+        success, timestamp = results[0]
+        return block, int.from_bytes(timestamp, "big") if success else 0, results[1:]
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Local L2 order book - full snapshots plus merged top-of-book polls
+"""
+import random
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAX_HEIGHT = 16  # skip list levels - plenty for books of tens of thousands of levels
+
+
+def _levels(raw: Iterable) -> List[Tuple[float, float]]:
+    """[[price, size, ...], ...] with string or numeric fields -> [(price, size)]"""
+    return [(float(level[0]), float(level[1])) for level in raw]
+
+
+class _Node:
+    __slots__ = ("key", "price", "next")
+
+    def __init__(self, key: float, price: float, height: int):
+        self.key = key
+        self.price = price
+        self.next: List[Optional["_Node"]] = [None] * height
+
+
+class _BookSide:
+    """Price levels of one side in a skip list ordered best-first, plus a size map
+
+    Bids are keyed by -price so both sides run from the touch outward.
+    Adding or removing a level is an O(log n) expected search down the
+    node towers (heights drawn with p = 1/2) plus relinking; resizing an
+    existing level is a dict write, the touch is the head's first link and
+    depth walks follow the bottom level.
+    """
+
+    def __init__(self, descending: bool = False):
+        self.sign = -1.0 if descending else 1.0
+        self.sizes: Dict[float, float] = {}
+        self._head = _Node(float("-inf"), 0.0, MAX_HEIGHT)
+        self._height = 1
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def clear(self):
+        self.sizes.clear()
+        self._head = _Node(float("-inf"), 0.0, MAX_HEIGHT)
+        self._height = 1
+
+    def _path(self, key: float) -> List[_Node]:
+        """Last node before `key` on every level"""
+        path = [self._head] * MAX_HEIGHT
+        node = self._head
+        for level in range(self._height - 1, -1, -1):
+            while node.next[level] is not None and node.next[level].key < key:
+                node = node.next[level]
+            path[level] = node
+        return path
+
+    def _link(self, price: float):
+        key = self.sign * price
+        path = self._path(key)
+        height = 1
+        while height < MAX_HEIGHT and random.random() < 0.5:
+            height += 1
+        self._height = max(self._height, height)
+        node = _Node(key, price, height)
+        for level in range(height):
+            node.next[level] = path[level].next[level]
+            path[level].next[level] = node
+
+    def _unlink(self, price: float):
+        path = self._path(self.sign * price)
+        node = path[0].next[0]
+        for level in range(len(node.next)):
+            path[level].next[level] = node.next[level]
+        while self._height > 1 and self._head.next[self._height - 1] is None:
+            self._height -= 1
+
+    def set(self, price: float, size: float):
+        """Insert, resize or (size 0) delete a level - O(log n)"""
+        if size <= 0:
+            if self.sizes.pop(price, None) is not None:
+                self._unlink(price)
+            return
+        if price not in self.sizes:
+            self._link(price)
+        self.sizes[price] = size
+
+    def best(self) -> Optional[Tuple[float, float]]:
+        node = self._head.next[0]
+        return (node.price, self.sizes[node.price]) if node is not None else None
+
+    def walk(self, through: Optional[float] = None) -> Iterator[Tuple[float, float]]:
+        """(price, size) from the touch outward, stopping after price `through` if given"""
+        bound = self.sign * through if through is not None else float("inf")
+        node = self._head.next[0]
+        while node is not None and node.key <= bound:
+            yield node.price, self.sizes[node.price]
+            node = node.next[0]
+
+    def merge_top(self, levels: List[Tuple[float, float]]) -> int:
+        """Reconcile the levels a top-of-book snapshot covers; returns how many changed
+
+        Levels from the touch through the snapshot's deepest price that it
+        no longer lists were pulled; listed ones are added or resized. Only
+        levels that differ are written, and deeper levels are left alone.
+        """
+        if not levels:
+            return 0
+        fresh = {price: size for price, size in levels if size > 0}
+        deepest = max(levels, key=lambda level: self.sign * level[0])[0]
+        changed = 0
+        for price, _ in list(self.walk(deepest)):
+            if price not in fresh:
+                self.set(price, 0)
+                changed += 1
+        for price, size in fresh.items():
+            if self.sizes.get(price) != size:
+                self.set(price, size)
+                changed += 1
+        return changed
+
+
+class OrderBook:
+    """L2 book for one instrument
+
+    Each side is a skip list of price levels with a dict of sizes:
+    resizing a level is O(1), adding or removing one O(log n), the best
+    bid/ask is the first node and depth/VWAP queries walk levels outward
+    from the touch. Updates and queries are serialized by a lock, as the
+    book may be refreshed by a prefetch thread.
+
+    Crypto.com's REST book has no sequence numbers, so between full
+    snapshots the book is kept current by merging polled top-of-book
+    snapshots (apply_top) rather than exchange deltas; apply_update takes
+    real per-level changes (e.g. from a websocket feed).
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = _BookSide(descending=True)
+        self.asks = _BookSide()
+        self.timestamp = 0
+        self.updates = 0
+        self.level_changes = 0  # levels written by apply_update/apply_top
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.bids) + len(self.asks)
+
+    def apply_snapshot(self, bids: Iterable, asks: Iterable, timestamp: int = 0):
+        """Replace the whole book"""
+        with self._lock:
+            self.bids.clear()
+            self.asks.clear()
+            for price, size in _levels(bids):
+                self.bids.set(price, size)
+            for price, size in _levels(asks):
+                self.asks.set(price, size)
+            self.timestamp = timestamp
+
+    def apply_update(self, bids: Iterable = (), asks: Iterable = (), timestamp: int = 0):
+        """Apply level changes (a size of 0 removes the level)"""
+        bids, asks = _levels(bids), _levels(asks)
+        with self._lock:
+            for price, size in bids:
+                self.bids.set(price, size)
+            for price, size in asks:
+                self.asks.set(price, size)
+            self.timestamp = max(self.timestamp, timestamp)
+            self.updates += 1
+            self.level_changes += len(bids) + len(asks)
+
+    def apply_top(self, bids: Iterable, asks: Iterable, timestamp: int = 0) -> int:
+        """Merge a shallow top-of-book snapshot into the deeper book; returns levels changed
+
+        Within the price range the snapshot covers, levels are diffed
+        against it (absent ones were pulled); deeper levels are kept from
+        the last full snapshot.
+        """
+        bids, asks = _levels(bids), _levels(asks)
+        with self._lock:
+            changed = self.bids.merge_top(bids) + self.asks.merge_top(asks)
+            self.timestamp = max(self.timestamp, timestamp)
+            self.updates += 1
+            self.level_changes += changed
+        return changed
+
+    def best_bid(self) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            return self.bids.best()
+
+    def best_ask(self) -> Optional[Tuple[float, float]]:
+        with self._lock:
+            return self.asks.best()
+
+    def mid(self) -> Optional[float]:
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return (bid[0] + ask[0]) / 2
+
+    def depth_at(self, price: float) -> float:
+        """Resting size at an exact price level (either side)"""
+        with self._lock:
+            return self.bids.sizes.get(price) or self.asks.sizes.get(price, 0.0)
+
+    def _walk(self, side: str, limit_price: Optional[float]):
+        """(price, size) levels a taker order on `side` would consume, best first"""
+        book_side = self.asks if side == "BUY" else self.bids
+        return book_side.walk(limit_price or None)
+
+    def quantity_within(self, side: str, slippage: float) -> float:
+        """Size a taker can fill without going more than `slippage` past the touch"""
+        touch = self.best_ask() if side == "BUY" else self.best_bid()
+        if touch is None:
+            return 0.0
+        limit_price = touch[0] * (1 + slippage if side == "BUY" else 1 - slippage)
+        with self._lock:
+            return sum(size for _, size in self._walk(side, limit_price))
+
+    def vwap(self, side: str, quantity: float, limit_price: Optional[float] = None) -> Tuple[float, float]:
+        """Average price and filled size for a taker order of `quantity`
+
+        BUY walks the asks upward, SELL the bids downward, stopping at
+        limit_price if given. The filled size is less than quantity when the
+        book (or the limit) runs out first.
+        """
+        remaining = quantity
+        notional = 0.0
+        with self._lock:
+            for price, size in self._walk(side, limit_price):
+                take = min(size, remaining)
+                notional += take * price
+                remaining -= take
+                if remaining <= 0:
+                    break
+        filled = quantity - remaining
+        return (notional / filled if filled else 0.0), filled
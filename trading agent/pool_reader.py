@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+On-chain Uniswap v3 pool state - slot0 and liquidity for every pool in one call per block
+"""
+import time
+import logging
+from typing import Dict, Optional, Tuple
+from multicall import Multicall
+from config import ETH_BLOCK_TIME
+
+logger = logging.getLogger(__name__)
+
+SLOT0 = bytes.fromhex("3850c7bd")  # slot0()
+LIQUIDITY = bytes.fromhex("1a686502")  # liquidity()
+
+Q96 = 2 ** 96
+
+
+def sqrt_price_to_price(sqrt_price_x96: int, decimals0: int, decimals1: int) -> float:
+    """Pool price as token1 per token0 in whole tokens"""
+    return (sqrt_price_x96 / Q96) ** 2 * 10 ** (decimals0 - decimals1)
+
+
+class PoolReader:
+    """Reads every tracked pool's slot0 and liquidity in one Multicall eth_call
+
+    pools maps pool address -> {"token0", "token1", "decimals0",
+    "decimals1", "fee"}. Results are cached for the block they were read
+    at: read() only calls the node again once the next block is due
+    (block timestamp + block_time), so polling it every heartbeat costs at
+    most one RPC request per block.
+    """
+
+    def __init__(self, pools: Dict[str, Dict], multicall: Optional[Multicall] = None,
+                 block_time: float = ETH_BLOCK_TIME):
+        self.pools = {address.lower(): dict(pool) for address, pool in pools.items()}
+        self.multicall = multicall or Multicall()
+        self.block_time = block_time
+        self.block = 0
+        self._states: Dict[str, Dict] = {}
+        self._fresh_until = 0.0
+
+    def add_pool(self, address: str, token0: str, token1: str, decimals0: int, decimals1: int, fee: float):
+        self.pools[address.lower()] = {"token0": token0, "token1": token1,
+                                       "decimals0": decimals0, "decimals1": decimals1, "fee": fee}
+        self._fresh_until = 0.0
+
+    def read(self, force: bool = False) -> Dict[str, Dict]:
+        """State of every pool at the latest block (cached within a block)"""
+        now = time.time()
+        if not force and now < self._fresh_until:
+            return self._states
+        addresses = list(self.pools)
+        calls = []
+        for address in addresses:
+            calls.append((address, SLOT0))
+            calls.append((address, LIQUIDITY))
+        result = self.multicall.call(calls)
+        if result is None:
+            self._fresh_until = now + 1.0  # don't hammer a failing node; keep the last state
+            return self._states
+
+        block, block_timestamp, results = result
+        self._fresh_until = max(block_timestamp + self.block_time, now + 1.0)
+        if block == self.block and self._states:
+            return self._states
+
+        states = {}
+        for index, address in enumerate(addresses):
+            (slot0_ok, slot0), (liquidity_ok, liquidity) = results[2 * index], results[2 * index + 1]
+            if not slot0_ok or len(slot0) < 64 or not liquidity_ok:
+                logger.warning("Pool %s read failed at block %d", address, block)
+                continue
+            pool = self.pools[address]
+            sqrt_price_x96 = int.from_bytes(slot0[:32], "big")
+            if not sqrt_price_x96:
+                continue
+            states[address] = {
+                "address": address,
+                "block": block,
+                "sqrt_price_x96": sqrt_price_x96,
+                "tick": int.from_bytes(slot0[32:64], "big", signed=True),  # int24, sign-extended
+                "liquidity": int.from_bytes(liquidity[:32], "big"),
+                "price": sqrt_price_to_price(sqrt_price_x96, pool["decimals0"], pool["decimals1"])
+            }
+        self.block = block
+        self._states = states
+        return states
+
+    def virtual_reserves(self, address: str) -> Optional[Tuple[float, float]]:
+        """(token0, token1) in-range reserves in whole tokens at the last block read
+
+        L / sqrtP and L * sqrtP: within the current tick range a v3 pool
+        trades like an x*y=k pool holding these. From cache - call read() first.
+        """
+        state = self._states.get(address.lower())
+        if state is None or not state["liquidity"]:
+            return None
+        pool = self.pools[address.lower()]
+        sqrt_price = state["sqrt_price_x96"] / Q96
+        return (state["liquidity"] / sqrt_price / 10 ** pool["decimals0"],
+                state["liquidity"] * sqrt_price / 10 ** pool["decimals1"])
+
+    def price(self, address: str) -> Optional[float]:
+        """token1 per token0 for a pool at the last block read"""
+        state = self.read().get(address.lower())
+        return state["price"] if state else None
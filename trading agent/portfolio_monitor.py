@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-wallet portfolio monitor - every wallet's balances from a few batched async calls
+"""
+import time
+import asyncio
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from web3 import AsyncWeb3, AsyncHTTPProvider
+from multicall import encode_aggregate, decode_aggregate, GET_ETH_BALANCE
+from uniswap_trading import TOKENS
+from price_oracle import get_price_oracle
+from config import (
+    ETH_RPC_URL,
+    MULTICALL3_ADDRESS,
+    PORTFOLIO_WALLETS,
+    PORTFOLIO_MAX_WALLETS,
+    PORTFOLIO_TOKENS,
+    PORTFOLIO_BATCH_CALLS,
+    PORTFOLIO_CONCURRENCY,
+    PORTFOLIO_REFRESH_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+BALANCE_OF = bytes.fromhex("70a08231")  # balanceOf(address)
+
+
+def _with_address(selector: bytes, address: str) -> bytes:
+    return selector + bytes(12) + bytes.fromhex(address[2:])
+
+
+class PortfolioMonitor:
+    """Tracks ETH and token balances for any number of wallets
+
+    A refresh turns every (wallet, asset) pair into one Multicall3 read -
+    getEthBalance for ETH, balanceOf for tokens - and packs them into
+    eth_calls of `batch_calls` reads each. The batches go out concurrently
+    (at most `concurrency` in flight) over a single AsyncWeb3 provider,
+    whose aiohttp session keeps the connections pooled. 1,000 wallets with
+    four assets is 10 eth_calls, not 5,000 sequential requests.
+
+    The latest snapshot is kept in memory for the dashboard and agents:
+    snapshot() never touches the network. start() refreshes on a
+    background thread running its own event loop; refresh_now() runs one
+    refresh from synchronous code. price(asset) values the holdings in USD
+    (the shared price oracle by default; None leaves an asset unpriced).
+    Wallets can be added while a refresh runs (add_wallet is locked, and
+    each refresh works on a copy of the list), up to `max_wallets`.
+    """
+
+    def __init__(self, wallets: List[str] = PORTFOLIO_WALLETS,
+                 tokens: List[str] = PORTFOLIO_TOKENS,
+                 rpc_url: str = ETH_RPC_URL,
+                 multicall_address: str = MULTICALL3_ADDRESS,
+                 batch_calls: int = PORTFOLIO_BATCH_CALLS,
+                 concurrency: int = PORTFOLIO_CONCURRENCY,
+                 max_wallets: int = PORTFOLIO_MAX_WALLETS,
+                 price: Optional[Callable[[str], Optional[float]]] = None):
+        self.max_wallets = max_wallets
+        self.wallets: List[str] = []
+        self._wallets_lock = threading.Lock()
+        for address in wallets:
+            self.add_wallet(address)
+        self.tokens: Dict[str, Dict] = {symbol: TOKENS[symbol] for symbol in tokens}
+        self.rpc_url = rpc_url
+        self.multicall_address = AsyncWeb3.to_checksum_address(multicall_address)
+        self.batch_calls = batch_calls
+        self.concurrency = concurrency
+        self.price = price or get_price_oracle().price
+        self._w3: Optional[AsyncWeb3] = None
+        self._snapshot: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self.requests = 0
+
+    def add_wallet(self, address: str) -> bool:
+        """Monitor a wallet from the next refresh on; False if it already was
+
+        Raises ValueError for an invalid address or when max_wallets are monitored.
+        """
+        address = AsyncWeb3.to_checksum_address(address)
+        with self._wallets_lock:
+            if address in self.wallets:
+                return False
+            if len(self.wallets) >= self.max_wallets:
+                raise ValueError(f"Already monitoring the maximum of {self.max_wallets} wallets")
+            self.wallets.append(address)
+            return True
+
+    def monitored(self, address: str) -> bool:
+        with self._wallets_lock:
+            return AsyncWeb3.to_checksum_address(address) in self.wallets
+
+    def add_token(self, symbol: str, address: str, decimals: int):
+        self.tokens[symbol] = {"address": AsyncWeb3.to_checksum_address(address), "decimals": decimals}
+
+    # ------------------------------------------------------------------
+    # Batched reads
+    # ------------------------------------------------------------------
+
+    def _calls(self, wallets: List[str]) -> List[Tuple[str, str, int, str, bytes]]:
+        """(wallet, asset, decimals, target, call data) for every balance read"""
+        calls = []
+        for wallet in wallets:
+            calls.append((wallet, "ETH", 18, self.multicall_address, _with_address(GET_ETH_BALANCE, wallet)))
+            for symbol, token in self.tokens.items():
+                calls.append((wallet, symbol, token["decimals"], token["address"],
+                              _with_address(BALANCE_OF, wallet)))
+        return calls
+
+    async def _batch(self, semaphore: asyncio.Semaphore,
+                     calls: List[Tuple[str, str, int, str, bytes]]) -> Tuple[int, List[Tuple[bool, bytes]]]:
+        data = encode_aggregate([(target, call_data) for _, _, _, target, call_data in calls])
+        async with semaphore:
+            self.requests += 1
+            result = await self._w3.eth.call({"to": self.multicall_address, "data": data}, "latest")
+        return decode_aggregate(bytes(result))
+
+    async def refresh(self) -> Dict:
+        """Read every wallet's balances in concurrent batches and store the snapshot"""
+        if self._w3 is None:
+            self._w3 = AsyncWeb3(AsyncHTTPProvider(self.rpc_url))
+        started = time.monotonic()
+        with self._wallets_lock:
+            monitored = list(self.wallets)
+        calls = self._calls(monitored)
+        chunks = [calls[i:i + self.batch_calls] for i in range(0, len(calls), self.batch_calls)]
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._batch(semaphore, chunk) for chunk in chunks),
+                                       return_exceptions=True)
+
+        previous = self._snapshot["wallets"] if self._snapshot else {}
+        wallets: Dict[str, Dict[str, float]] = {}
+        stale = set()
+        block = 0
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                logger.error("Balance batch of %d reads failed: %s", len(chunk), result)
+                stale.update(wallet for wallet, *_ in chunk)
+                continue
+            chunk_block, outcomes = result
+            block = max(block, chunk_block)
+            for (wallet, asset, decimals, _, _), (success, data) in zip(chunk, outcomes):
+                if not success or len(data) < 32:
+                    stale.add(wallet)
+                    continue
+                amount = int.from_bytes(data[:32], "big")
+                if amount:
+                    wallets.setdefault(wallet, {})[asset] = amount / 10 ** decimals
+        for wallet in stale:
+            # keep the last known balances for reads that failed this round
+            for asset, amount in previous.get(wallet, {}).get("balances", {}).items():
+                wallets.setdefault(wallet, {}).setdefault(asset, amount)
+
+        # pricing may have to fetch (blocking) - keep it off the event loop
+        snapshot = await asyncio.get_running_loop().run_in_executor(None, self._value, monitored, wallets, block, stale)
+        snapshot["elapsed"] = time.monotonic() - started
+        snapshot["batches"] = len(chunks)
+        with self._lock:
+            self._snapshot = snapshot
+        logger.info("Portfolio refreshed: %d wallets, %d reads in %d batches, %.2fs",
+                    len(monitored), len(calls), len(chunks), snapshot["elapsed"])
+        return snapshot
+
+    def _value(self, monitored: List[str], balances: Dict[str, Dict[str, float]], block: int, stale: set) -> Dict:
+        prices = {asset: self.price(asset) for asset in ["ETH"] + list(self.tokens)}
+        totals: Dict[str, float] = {}
+        wallets = {}
+        for wallet in monitored:
+            held = balances.get(wallet, {})
+            value = 0.0
+            for asset, amount in held.items():
+                totals[asset] = totals.get(asset, 0.0) + amount
+                if prices.get(asset) is not None:
+                    value += amount * prices[asset]
+            wallets[wallet] = {"balances": held, "total_usd": value, "stale": wallet in stale}
+        return {
+            "block": block,
+            "updated": time.time(),
+            "wallets": wallets,
+            "totals": totals,
+            "prices": prices,
+            "unpriced": sorted(asset for asset in totals if prices.get(asset) is None),
+            "total_usd": sum(wallet["total_usd"] for wallet in wallets.values())
+        }
+
+    # ------------------------------------------------------------------
+    # Reads (cached - never fetch)
+    # ------------------------------------------------------------------
+
+    def snapshot(self, address: Optional[str] = None) -> Optional[Dict]:
+        """The whole portfolio, or one wallet's entry; None before the first refresh"""
+        with self._lock:
+            if self._snapshot is None:
+                return None
+            if address is None:
+                return self._snapshot
+            return self._snapshot["wallets"].get(AsyncWeb3.to_checksum_address(address))
+
+    def balances(self, address: str) -> Optional[Dict]:
+        """One wallet's cached balances and their age, for agents sizing trades; None until it is refreshed"""
+        with self._lock:
+            if self._snapshot is None:
+                return None
+            entry = self._snapshot["wallets"].get(AsyncWeb3.to_checksum_address(address))
+            if entry is None:
+                return None
+            return {"balances": dict(entry["balances"]), "block": self._snapshot["block"],
+                    "age": time.time() - self._snapshot["updated"], "stale": entry["stale"]}
+
+    # ------------------------------------------------------------------
+    # Event loop
+    # ------------------------------------------------------------------
+
+    def refresh_now(self, timeout: float = 30.0) -> Dict:
+        """Run one refresh from synchronous code (on the monitor's loop when it is running)"""
+        if self._loop is not None:
+            return asyncio.run_coroutine_threadsafe(self.refresh(), self._loop).result(timeout)
+        self._w3 = None  # a provider's session belongs to the loop that created it
+        try:
+            return asyncio.run(self.refresh())
+        finally:
+            self._w3 = None
+
+    def start(self, interval: float = PORTFOLIO_REFRESH_INTERVAL) -> "PortfolioMonitor":
+        """Refresh every interval seconds on a background thread with its own event loop"""
+        ready = threading.Event()
+
+        async def loop():
+            self._loop = asyncio.get_running_loop()
+            self._stopping = asyncio.Event()
+            ready.set()
+            while not self._stopping.is_set():
+                started = time.monotonic()
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    logger.error("Portfolio refresh failed: %s", e)
+                try:
+                    await asyncio.wait_for(self._stopping.wait(),
+                                           max(0.0, interval - (time.monotonic() - started)))
+                except asyncio.TimeoutError:
+                    pass
+            self._loop = None
+
+        self._w3 = None
+        self._thread = threading.Thread(target=asyncio.run, args=(loop(),), name="portfolio", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join()
+        self._thread = None
+
+
+_monitor: Optional[PortfolioMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def get_portfolio_monitor() -> PortfolioMonitor:
+    """Process-wide monitor over PORTFOLIO_WALLETS, refreshing in the background"""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = PortfolioMonitor().start()
+        return _monitor
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    monitor = PortfolioMonitor()
+    portfolio = monitor.refresh_now()
+    print(f"Block {portfolio['block']}: {len(portfolio['wallets'])} wallet(s) in "
+          f"{portfolio['batches']} batch(es), {portfolio['elapsed']:.2f}s")
+    for address, wallet in portfolio["wallets"].items():
+        held = ", ".join(f"{amount:.6f} {asset}" for asset, amount in wallet["balances"].items()) or "empty"
+        print(f"  {address}: {held}")
+    print(f"Total (priced assets): ${portfolio['total_usd']:.2f}")
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Array-backed position book with incremental mark-to-market P&L
+"""
+import time
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+LONG = 1
+SHORT = -1
+
+POSITION_DTYPE = np.dtype([
+    ("symbol", np.int32),        # index into PositionBook.symbols
+    ("side", np.int8),           # LONG / SHORT
+    ("is_open", np.bool_),
+    ("entry_price", np.float64),
+    ("quantity", np.float64),    # remaining open quantity
+    ("opened_at", np.float64),
+    ("mark_price", np.float64),
+    ("unrealized", np.float64),
+    ("uid", np.int64),           # unique for the book's lifetime (slots are reused, uids never)
+])
+
+
+class PositionBook:
+    """Open positions stored in a NumPy struct array, indexed by symbol
+
+    Slots of closed positions are recycled through a free list, so the array
+    only grows with the peak number of simultaneously open positions. Marking
+    to market is one vectorized pass over the array per price update.
+    Realized P&L and win/loss counts are kept as running totals.
+
+    Position ids are slot indexes and get reused once a position closes;
+    every position also gets a uid from a counter that only increases, for
+    history (the trade journal) that must tell positions apart.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self._rows = np.zeros(capacity, dtype=POSITION_DTYPE)
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self.symbols: List[str] = []
+        self._symbol_index: Dict[str, int] = {}
+        self._open_by_symbol: Dict[int, List[int]] = {}  # slots in FIFO order
+
+        self.realized_pnl = 0.0
+        self.unrealized_pnl = 0.0
+        self.wins = 0
+        self.losses = 0
+        self.closed_count = 0
+        self.next_uid = 1
+
+    def __len__(self) -> int:
+        return len(self._rows) - len(self._free)
+
+    def _symbol_id(self, symbol: str) -> int:
+        index = self._symbol_index.get(symbol)
+        if index is None:
+            index = self._symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return index
+
+    def _grow(self):
+        old_capacity = len(self._rows)
+        rows = np.zeros(old_capacity * 2, dtype=POSITION_DTYPE)
+        rows[:old_capacity] = self._rows
+        self._rows = rows
+        self._free.extend(range(old_capacity * 2 - 1, old_capacity - 1, -1))
+
+    def open(self, symbol: str, side: int, price: float, quantity: float,
+             timestamp: Optional[float] = None) -> int:
+        """Open a position and return its id"""
+        if not self._free:
+            self._grow()
+        slot = self._free.pop()
+        symbol_id = self._symbol_id(symbol)
+
+        row = self._rows[slot]
+        row["symbol"] = symbol_id
+        row["side"] = side
+        row["is_open"] = True
+        row["entry_price"] = price
+        row["quantity"] = quantity
+        row["opened_at"] = timestamp if timestamp is not None else time.time()
+        row["mark_price"] = price
+        row["unrealized"] = 0.0
+        row["uid"] = self.next_uid
+        self.next_uid += 1
+
+        self._open_by_symbol.setdefault(symbol_id, []).append(slot)
+        return slot
+
+    def close(self, position_id: int, price: float, quantity: Optional[float] = None) -> Tuple[float, float]:
+        """Close all or part of a position; returns (realized P&L, closed quantity)"""
+        row = self._rows[position_id]
+        if not row["is_open"]:
+            return 0.0, 0.0
+
+        open_quantity = float(row["quantity"])
+        closed = open_quantity if quantity is None else min(quantity, open_quantity)
+        pnl = (price - float(row["entry_price"])) * closed * int(row["side"])
+
+        self.realized_pnl += pnl
+        remaining = open_quantity - closed
+        if remaining <= open_quantity * 1e-9:
+            self.unrealized_pnl -= float(row["unrealized"])
+            row["is_open"] = False
+            row["quantity"] = 0.0
+            row["unrealized"] = 0.0
+            self._open_by_symbol[int(row["symbol"])].remove(position_id)
+            self._free.append(position_id)
+            self.closed_count += 1
+            if pnl > 0:
+                self.wins += 1
+            elif pnl < 0:
+                self.losses += 1
+        else:
+            row["quantity"] = remaining
+            previous = float(row["unrealized"])
+            row["unrealized"] = (float(row["mark_price"]) - float(row["entry_price"])) * remaining * int(row["side"])
+            self.unrealized_pnl += float(row["unrealized"]) - previous
+        return pnl, closed
+
+    def settle(self, position_id: int, price: float, quantity: Optional[float] = None) -> Dict:
+        """Close all or part of one position and describe the fill"""
+        row = self._rows[position_id]
+        entry_price = float(row["entry_price"])
+        side = int(row["side"])
+        pnl, closed = self.close(position_id, price, quantity)
+        return {
+            "position_id": position_id,
+            "uid": int(row["uid"]),
+            "quantity": closed,
+            "entry_price": entry_price,
+            "exit_price": price,
+            "pnl": pnl,
+            "pnl_pct": (price - entry_price) / entry_price * side if entry_price else 0.0,
+            "closed": not bool(row["is_open"])
+        }
+
+    def reduce(self, symbol: str, quantity: float, price: float, side: int = LONG) -> List[Dict]:
+        """Close positions on one side of a symbol FIFO until quantity is covered"""
+        symbol_id = self._symbol_index.get(symbol)
+        if symbol_id is None:
+            return []
+
+        fills = []
+        for position_id in list(self._open_by_symbol.get(symbol_id, [])):
+            if quantity <= 0:
+                break
+            if int(self._rows[position_id]["side"]) != side:
+                continue
+            fill = self.settle(position_id, price, quantity)
+            quantity -= fill["quantity"]
+            fills.append(fill)
+        return fills
+
+    def mark_to_market(self, prices: Dict[str, float]) -> float:
+        """Revalue every open position in one vectorized step; returns unrealized P&L"""
+        if not len(self):
+            self.unrealized_pnl = 0.0
+            return 0.0
+
+        price_by_symbol = np.full(len(self.symbols), np.nan)
+        for symbol, price in prices.items():
+            index = self._symbol_index.get(symbol)
+            if index is not None and price:
+                price_by_symbol[index] = price
+
+        rows = self._rows
+        marks = price_by_symbol[rows["symbol"]]
+        update = rows["is_open"] & ~np.isnan(marks)
+        rows["mark_price"][update] = marks[update]
+        rows["unrealized"][update] = ((marks[update] - rows["entry_price"][update])
+                                      * rows["quantity"][update] * rows["side"][update])
+        self.unrealized_pnl = float(rows["unrealized"][rows["is_open"]].sum())
+        return self.unrealized_pnl
+
+    @property
+    def total_pnl(self) -> float:
+        return self.realized_pnl + self.unrealized_pnl
+
+    def get_state(self) -> Dict:
+        """Open positions (by slot, FIFO order per symbol), the free list and running totals
+
+        The free list is saved in order so a restored book hands out the
+        same ids as the live one would have - journaled events that refer
+        to positions by id replay onto the right slots.
+        """
+        positions = []
+        for slots in self._open_by_symbol.values():
+            for slot in slots:
+                row = self._rows[slot]
+                positions.append([slot, int(row["symbol"]), int(row["side"]), float(row["entry_price"]),
+                                  float(row["quantity"]), float(row["opened_at"]), float(row["mark_price"]),
+                                  int(row["uid"])])
+        return {
+            "capacity": len(self._rows),
+            "symbols": list(self.symbols),
+            "positions": positions,
+            "free": list(self._free),
+            "next_uid": self.next_uid,
+            "realized_pnl": self.realized_pnl,
+            "wins": self.wins,
+            "losses": self.losses,
+            "closed_count": self.closed_count
+        }
+
+    def set_state(self, state: Dict):
+        """Rebuild the book from get_state() output, keeping position ids"""
+        self._rows = np.zeros(state["capacity"], dtype=POSITION_DTYPE)
+        self.symbols = list(state["symbols"])
+        self._symbol_index = {symbol: index for index, symbol in enumerate(self.symbols)}
+        self._open_by_symbol = {}
+        used = set()
+        for slot, symbol_id, side, entry_price, quantity, opened_at, mark_price, *uid in state["positions"]:
+            row = self._rows[slot]
+            row["uid"] = uid[0] if uid else 0
+            row["symbol"] = symbol_id
+            row["side"] = side
+            row["is_open"] = True
+            row["entry_price"] = entry_price
+            row["quantity"] = quantity
+            row["opened_at"] = opened_at
+            row["mark_price"] = mark_price
+            row["unrealized"] = (mark_price - entry_price) * quantity * side
+            self._open_by_symbol.setdefault(symbol_id, []).append(slot)
+            used.add(slot)
+        if "free" in state:
+            self._free = list(state["free"])
+        else:  # snapshots from before the free list was saved
+            self._free = [slot for slot in range(len(self._rows) - 1, -1, -1) if slot not in used]
+        self.realized_pnl = state["realized_pnl"]
+        self.unrealized_pnl = float(self._rows["unrealized"].sum())
+        self.wins = state["wins"]
+        self.losses = state["losses"]
+        self.closed_count = state["closed_count"]
+        self.next_uid = state.get("next_uid", self.closed_count + len(self) + 1)
+
+    def open_quantity(self, symbol: str, side: int = LONG) -> float:
+        symbol_id = self._symbol_index.get(symbol)
+        if symbol_id is None:
+            return 0.0
+        return float(sum(self._rows[slot]["quantity"] for slot in self._open_by_symbol.get(symbol_id, [])
+                         if int(self._rows[slot]["side"]) == side))
+
+    def get(self, position_id: int) -> Dict:
+        row = self._rows[position_id]
+        return {
+            "id": position_id,
+            "uid": int(row["uid"]),
+            "symbol": self.symbols[int(row["symbol"])],
+            "side": "BUY" if int(row["side"]) == LONG else "SELL",
+            "entry_price": float(row["entry_price"]),
+            "quantity": float(row["quantity"]),
+            "timestamp": float(row["opened_at"]),
+            "mark_price": float(row["mark_price"]),
+            "unrealized": float(row["unrealized"]),
+            "open": bool(row["is_open"])
+        }
+
+    def open_positions(self, symbol: Optional[str] = None) -> List[Dict]:
+        """Open positions as dicts (oldest first per symbol)"""
+        if symbol is not None:
+            symbol_id = self._symbol_index.get(symbol)
+            slots = self._open_by_symbol.get(symbol_id, []) if symbol_id is not None else []
+        else:
+            slots = [slot for slots in self._open_by_symbol.values() for slot in slots]
+        return [self.get(slot) for slot in slots]
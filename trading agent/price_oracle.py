@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Shared USD price oracle - cached per-asset prices with staleness metadata
+"""
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+from config import (
+    PRICE_ORACLE_TTL,
+    PRICE_ORACLE_MAX_STALE,
+    PRICE_ORACLE_PEGGED,
+    PRICE_ORACLE_QUOTES,
+    PRICE_ASSET_ALIASES
+)
+
+logger = logging.getLogger(__name__)
+
+
+def cryptocom_usd_prices(trader=None, quotes: List[str] = PRICE_ORACLE_QUOTES) -> Dict[str, float]:
+    """USD price of every asset Crypto.com lists, from one bulk ticker request
+
+    An asset quoted in several currencies takes the first of `quotes`.
+    """
+    if trader is None:
+        from trading import CryptoComTrader
+        trader = CryptoComTrader()
+    rank = {quote: index for index, quote in enumerate(quotes)}
+    best: Dict[str, tuple] = {}
+    for ticker in trader.get_all_tickers():
+        base, _, quote = ticker["symbol"].partition("_")
+        if quote not in rank or ticker["last"] <= 0:
+            continue
+        if base not in best or rank[quote] < best[base][0]:
+            best[base] = (rank[quote], ticker["last"])
+    return {asset: price for asset, (_, price) in best.items()}
+
+
+class PriceOracle:
+    """One cached USD price per asset, shared by every valuation path
+
+    fetch() returns {asset: usd} for everything the source knows in a
+    single call, so one refresh prices all assets. Prices are served from
+    memory for `ttl` seconds; the first reader after that refetches while
+    concurrent readers keep getting the cached value instead of fetching
+    too. When a fetch fails the last price keeps being served, flagged
+    stale, for up to `max_stale` seconds, then the asset reads as unpriced.
+    Pegged assets (stablecoins) are valued at their peg without fetching,
+    and aliases (WETH -> ETH) share their target's price.
+    """
+
+    def __init__(self, fetch: Optional[Callable[[], Dict[str, float]]] = None,
+                 ttl: float = PRICE_ORACLE_TTL,
+                 max_stale: float = PRICE_ORACLE_MAX_STALE,
+                 pegged: Dict[str, float] = PRICE_ORACLE_PEGGED,
+                 aliases: Dict[str, str] = PRICE_ASSET_ALIASES):
+        self.fetch = fetch or cryptocom_usd_prices
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.pegged = pegged
+        self.aliases = aliases
+        self._prices: Dict[str, float] = {}
+        self._fetched = 0.0  # when the cached prices were fetched
+        self._retry_at = 0.0  # after a failed fetch, don't try again before this
+        self._lock = threading.Lock()  # guards _prices/_fetched
+        self._refresh_lock = threading.Lock()  # one fetch at a time
+        self.fetches = 0
+        self.failures = 0
+
+    def _refresh(self, wait: bool):
+        if not self._refresh_lock.acquire(blocking=wait):
+            return  # someone else is fetching; the cached values stand
+        try:
+            if time.time() - self._fetched < self.ttl:
+                return  # refreshed while we waited
+            self.fetches += 1
+            try:
+                prices = self.fetch()
+            except Exception as e:
+                prices = None
+                logger.error("Price fetch failed: %s", e)
+            if not prices:
+                self.failures += 1
+                self._retry_at = time.time() + self.ttl
+                return
+            with self._lock:
+                self._prices = prices
+                self._fetched = time.time()
+        finally:
+            self._refresh_lock.release()
+
+    def quote(self, asset: str) -> Optional[Dict]:
+        """{"asset", "usd", "source", "age", "stale"} or None when unpriced"""
+        asset = self.aliases.get(asset, asset)
+        if asset in self.pegged:
+            return {"asset": asset, "usd": self.pegged[asset], "source": "peg", "age": 0.0, "stale": False}
+        now = time.time()
+        if now - self._fetched >= self.ttl and now >= self._retry_at:
+            # block only when there is nothing usable cached
+            self._refresh(wait=not self._prices or now - self._fetched > self.max_stale)
+        with self._lock:
+            usd, fetched = self._prices.get(asset), self._fetched
+        age = time.time() - fetched
+        if usd is None or age > self.max_stale:
+            return None
+        return {"asset": asset, "usd": usd, "source": "market", "age": age, "stale": age > self.ttl}
+
+    def price(self, asset: str) -> Optional[float]:
+        quote = self.quote(asset)
+        return quote["usd"] if quote else None
+
+    def value(self, balances: Dict[str, float]) -> Dict:
+        """USD valuation of a set of balances - per asset and total"""
+        assets = {}
+        total = 0.0
+        unpriced = []
+        for asset, amount in balances.items():
+            quote = self.quote(asset)
+            if quote is None:
+                unpriced.append(asset)
+                assets[asset] = {"amount": amount, "usd_price": None, "usd_value": None, "stale": None}
+                continue
+            usd_value = amount * quote["usd"]
+            total += usd_value
+            assets[asset] = {"amount": amount, "usd_price": quote["usd"], "usd_value": usd_value,
+                             "stale": quote["stale"], "age": quote["age"]}
+        return {"assets": assets, "total_usd": total, "unpriced": unpriced}
+
+    def snapshot(self) -> Dict:
+        """Every cached price with its age - for a sidecar endpoint"""
+        with self._lock:
+            prices, fetched = dict(self._prices), self._fetched
+        age = time.time() - fetched if fetched else None
+        return {
+            "prices": prices,
+            "pegged": dict(self.pegged),
+            "age": age,
+            "stale": age is None or age > self.ttl,
+            "fetches": self.fetches,
+            "failures": self.failures
+        }
+
+
+_oracle: Optional[PriceOracle] = None
+_oracle_lock = threading.Lock()
+
+
+def get_price_oracle() -> PriceOracle:
+    """Process-wide price oracle"""
+    global _oracle
+    with _oracle_lock:
+        if _oracle is None:
+            _oracle = PriceOracle()
+        return _oracle
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+Consolidated multi-venue pricing - best bid/ask across venues plus spread events
+"""
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from config import (
+    PRICE_VENUES,
+    PRICE_ASSET_ALIASES,
+    PRICE_CRYPTOCOM_PAIRS,
+    PRICE_REFRESH_INTERVAL,
+    PRICE_MAX_AGE,
+    PRICE_GAS_COST_USD,
+    PRICE_SPREAD_NOTIONAL,
+    TRADING_PAIRS
+)
+
+logger = logging.getLogger(__name__)
+
+SPREAD_OPENED = "spread_opened"
+SPREAD_CLOSED = "spread_closed"
+
+
+def normalize_pair(symbol: str, aliases: Dict[str, str] = PRICE_ASSET_ALIASES) -> str:
+    """Venue symbol -> cross-venue pair key (WETH_USDT -> ETH_USDT)"""
+    base, quote = symbol.split("_")
+    return f"{aliases.get(base, base)}_{aliases.get(quote, quote)}"
+
+
+class PriceService:
+    """One cached price source fed by every venue at once
+
+    Each refresh fetches all venues concurrently (a venue with a bulk
+    get_all_tickers pays one request; otherwise each symbol is its own
+    task), stores the quotes under normalized pairs and recomputes every
+    pair's best bid and ask across venues. For each pair quoted on two or
+    more venues it checks buying at one venue's ask and selling at
+    another's bid: once the edge exceeds both venues' fees plus gas for
+    on-chain legs (amortized over `notional`), a SPREAD_OPENED event is
+    emitted, and SPREAD_CLOSED when it falls back below - or when either
+    venue's quote goes stale or stops arriving (reason "stale").
+
+    Agents push the tickers they fetch anyway through ingest(), so their
+    marks, exits and sizing read this consolidated book at no extra
+    request cost; a started service adds the other venues on top.
+    """
+
+    def __init__(self, venues: Dict[str, Tuple[object, List[str]]],
+                 venue_costs: Dict[str, Dict] = PRICE_VENUES,
+                 max_age: float = PRICE_MAX_AGE,
+                 notional: float = PRICE_SPREAD_NOTIONAL,
+                 gas_cost: Optional[Callable[[], float]] = None):
+        self.venues = venues
+        self.venue_costs = venue_costs
+        self.max_age = max_age
+        self.notional = notional
+        self.gas_cost = gas_cost or (lambda: PRICE_GAS_COST_USD)
+        self._gas_usd = PRICE_GAS_COST_USD  # per on-chain leg, sampled once per refresh
+        self._quotes: Dict[str, Dict[str, Dict]] = {}  # pair -> venue -> quote
+        self._best: Dict[str, Dict] = {}
+        self._open: Dict[Tuple[str, str, str], Dict] = {}  # (pair, buy venue, sell venue) -> event
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="price")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refreshes = 0
+
+    def subscribe(self, listener: Callable[[Dict], None]):
+        """Call listener(event) for every spread event"""
+        self._listeners.append(listener)
+
+    # ------------------------------------------------------------------
+    # Fetching
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _fetch_bulk(trader, symbols: List[str]) -> List[Dict]:
+        wanted = set(symbols)
+        return [ticker for ticker in trader.get_all_tickers() if ticker["symbol"] in wanted]
+
+    @staticmethod
+    def _fetch_one(trader, symbol: str) -> List[Dict]:
+        ticker = trader.get_ticker(symbol)
+        return [ticker] if ticker else []
+
+    def refresh(self) -> List[Dict]:
+        """Fetch every venue concurrently, update the book of quotes; returns spread events"""
+        jobs = []
+        for venue, (trader, symbols) in self.venues.items():
+            if hasattr(trader, "get_all_tickers"):
+                jobs.append((venue, self._pool.submit(self._fetch_bulk, trader, symbols)))
+            else:
+                jobs.extend((venue, self._pool.submit(self._fetch_one, trader, symbol)) for symbol in symbols)
+
+        received = time.time()
+        updates = []
+        for venue, job in jobs:
+            try:
+                tickers = job.result()
+            except Exception as e:
+                logger.error("Price fetch from %s failed: %s", venue, e)
+                continue
+            for ticker in tickers:
+                if ticker.get("bid") and ticker.get("ask"):
+                    updates.append((venue, ticker))
+
+        try:
+            self._gas_usd = self.gas_cost()
+        except Exception as e:
+            logger.error("Gas cost estimate failed: %s", e)
+
+        with self._lock:
+            self.refreshes += 1
+        return self._apply(updates, received)
+
+    def ingest(self, venue: str, tickers: List[Dict]) -> List[Dict]:
+        """Apply tickers a caller already fetched (an agent's own market data) - no requests made"""
+        updates = [(venue, ticker) for ticker in tickers if ticker.get("bid") and ticker.get("ask")]
+        return self._apply(updates, time.time())
+
+    def _apply(self, updates: List[Tuple[str, Dict]], received: float) -> List[Dict]:
+        """Store quotes, reconsolidate the touched pairs and dispatch spread events"""
+        with self._lock:
+            touched = set()
+            for venue, ticker in updates:
+                pair = normalize_pair(ticker["symbol"])
+                self._quotes.setdefault(pair, {})[venue] = {
+                    "venue": venue,
+                    "symbol": ticker["symbol"],
+                    "bid": ticker["bid"],
+                    "ask": ticker["ask"],
+                    "last": ticker["last"],
+                    "received": received
+                }
+                touched.add(pair)
+            events = []
+            for pair in touched:
+                self._best[pair] = self._consolidate(pair)
+            # Pairs with open spreads are rechecked even without fresh quotes, so they can expire
+            for pair in touched | {key[0] for key in self._open}:
+                events.extend(self._check_spreads(pair))
+
+        for event in events:
+            logger.info("%s %s: buy %s @ %.6f, sell %s @ %.6f, edge %.3f%% vs cost %.3f%%",
+                        event["type"], event["pair"], event["buy_venue"], event["ask"],
+                        event["sell_venue"], event["bid"], event["edge"] * 100, event["cost"] * 100)
+            for listener in self._listeners:
+                listener(event)
+        return events
+
+    def _live_quotes(self, pair: str) -> List[Dict]:
+        oldest = time.time() - self.max_age
+        return [quote for quote in self._quotes.get(pair, {}).values() if quote["received"] >= oldest]
+
+    def _consolidate(self, pair: str) -> Dict:
+        quotes = self._live_quotes(pair)
+        best_bid = max(quotes, key=lambda quote: quote["bid"])
+        best_ask = min(quotes, key=lambda quote: quote["ask"])
+        return {
+            "pair": pair,
+            "bid": best_bid["bid"],
+            "bid_venue": best_bid["venue"],
+            "ask": best_ask["ask"],
+            "ask_venue": best_ask["venue"],
+            "mid": (best_bid["bid"] + best_ask["ask"]) / 2,
+            "venues": len(quotes),
+            "received": min(quote["received"] for quote in quotes)
+        }
+
+    def _leg_cost(self, venue: str) -> float:
+        """Fee plus amortized gas for one leg, as a fraction of notional"""
+        costs = self.venue_costs.get(venue, {})
+        cost = costs.get("fee", 0.0)
+        if costs.get("gas"):
+            cost += self._gas_usd / self.notional
+        return cost
+
+    def _check_spreads(self, pair: str) -> List[Dict]:
+        quotes = self._live_quotes(pair)
+        events = []
+        for buy in quotes:
+            for sell in quotes:
+                if buy is sell:
+                    continue
+                key = (pair, buy["venue"], sell["venue"])
+                edge = (sell["bid"] - buy["ask"]) / buy["ask"]
+                cost = self._leg_cost(buy["venue"]) + self._leg_cost(sell["venue"])
+                was_open = key in self._open
+                if edge > cost and not was_open:
+                    event_type = SPREAD_OPENED
+                elif edge <= cost and was_open:
+                    event_type = SPREAD_CLOSED
+                else:
+                    continue
+                event = {
+                    "type": event_type,
+                    "pair": pair,
+                    "buy_venue": buy["venue"],
+                    "ask": buy["ask"],
+                    "sell_venue": sell["venue"],
+                    "bid": sell["bid"],
+                    "edge": edge,
+                    "cost": cost,
+                    "net": edge - cost,
+                    "timestamp": time.time()
+                }
+                if event_type == SPREAD_OPENED:
+                    self._open[key] = event
+                else:
+                    del self._open[key]
+                events.append(event)
+
+        live = {quote["venue"] for quote in quotes}
+        for key in [key for key in self._open if key[0] == pair]:
+            if key[1] not in live or key[2] not in live:
+                # A leg went stale or dropped out - the spread can no longer be traded
+                event = dict(self._open.pop(key), type=SPREAD_CLOSED, reason="stale", timestamp=time.time())
+                events.append(event)
+        return events
+
+    # ------------------------------------------------------------------
+    # Reads (cached - never fetch)
+    # ------------------------------------------------------------------
+
+    def best(self, pair: str) -> Optional[Dict]:
+        """Best bid/ask across venues for a pair or venue symbol, None if stale or unknown"""
+        pair = normalize_pair(pair)
+        with self._lock:
+            best = self._best.get(pair)
+            if best is None or time.time() - best["received"] > self.max_age:
+                return None
+            return dict(best)
+
+    def mid(self, pair: str) -> Optional[float]:
+        best = self.best(pair)
+        return best["mid"] if best else None
+
+    def quotes(self, pair: str) -> List[Dict]:
+        """Every venue's live quote for a pair"""
+        with self._lock:
+            return [dict(quote) for quote in self._live_quotes(normalize_pair(pair))]
+
+    def open_spreads(self) -> List[Dict]:
+        with self._lock:
+            return list(self._open.values())
+
+    # ------------------------------------------------------------------
+    # Continuous monitoring
+    # ------------------------------------------------------------------
+
+    def start(self, interval: float = PRICE_REFRESH_INTERVAL) -> "PriceService":
+        """Refresh every interval seconds on a background thread"""
+        def loop():
+            while not self._stop.is_set():
+                started = time.monotonic()
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error("Price refresh failed: %s", e)
+                self._stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="price-service", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._pool.shutdown(wait=False)
+
+
+def default_price_service() -> PriceService:
+    """Crypto.com and Uniswap on their overlapping ETH and stablecoin pairs, gas from the oracle"""
+    from trading import CryptoComTrader
+    from uniswap_trading import UniswapTrader
+    from gas_oracle import GasOracle
+    oracle = GasOracle().start()
+    service = PriceService({
+        "cryptocom": (CryptoComTrader(), PRICE_CRYPTOCOM_PAIRS),
+        "uniswap": (UniswapTrader(), TRADING_PAIRS)
+    })
+    service.gas_cost = lambda: oracle.gas_cost_usd(service.mid("ETH_USDC")) or PRICE_GAS_COST_USD
+    return service
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    service = default_price_service()
+    print(f"Monitoring cross-venue spreads every {PRICE_REFRESH_INTERVAL}s - Ctrl+C to stop")
+    try:
+        service.start()
+        while True:
+            time.sleep(PRICE_REFRESH_INTERVAL)
+            for pair in sorted({normalize_pair(s) for s in PRICE_CRYPTOCOM_PAIRS + TRADING_PAIRS}):
+                best = service.best(pair)
+                if best:
+                    print(f"  {pair}: bid {best['bid']:.6f} ({best['bid_venue']}) | "
+                          f"ask {best['ask']:.6f} ({best['ask_venue']}) | {best['venues']} venue(s)")
+    except KeyboardInterrupt:
+        service.stop()
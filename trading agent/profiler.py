@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+On-demand sampling profiler for a running agent
+
+Nothing is installed while the profiler is idle: no trace hooks, no sampler
+thread. A capture starts a short-lived thread that snapshots the agent
+thread's stack via sys._current_frames() for N seconds, then writes a
+collapsed-stack file (flamegraph.pl / speedscope ready) and a top-N report.
+"""
+import os
+import signal
+import sys
+import threading
+import time
+import logging
+from collections import Counter
+from typing import Dict, Optional, Tuple
+from config import (
+    PROFILE_SAMPLE_INTERVAL,
+    PROFILE_DEFAULT_SECONDS,
+    PROFILE_OUTPUT_DIR,
+    PROFILE_TOP_N
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """Samples one thread's call stack at a fixed interval for a bounded window"""
+
+    def __init__(self, thread_id: Optional[int] = None,
+                 interval: float = PROFILE_SAMPLE_INTERVAL,
+                 output_dir: str = PROFILE_OUTPUT_DIR,
+                 top_n: int = PROFILE_TOP_N):
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.interval = interval
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.last_report: Optional[Dict] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._sampler is not None and self._sampler.is_alive()
+
+    def set_target_thread(self, thread_id: Optional[int] = None):
+        """Profile the given thread (defaults to the calling thread)"""
+        self.thread_id = thread_id or threading.get_ident()
+
+    def start(self, seconds: float = PROFILE_DEFAULT_SECONDS) -> bool:
+        """Begin a capture; returns False if one is already in progress"""
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._sampler = threading.Thread(
+                target=self._run, args=(seconds,), name="agent-profiler", daemon=True
+            )
+            self._sampler.start()
+        logger.info("Profiler started for %.0fs (thread %s)", seconds, self.thread_id)
+        return True
+
+    def stop(self):
+        """End the current capture early (the report is still written)"""
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def _run(self, seconds: float):
+        stacks: Counter = Counter()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+        own_frames = sys._current_frames  # bound once - keeps the sampling loop tight
+
+        while not self._stop.is_set() and time.perf_counter() < deadline:
+            frame = own_frames().get(self.thread_id)
+            if frame is not None:
+                stacks[_collapse(frame)] += 1
+                samples += 1
+            self._stop.wait(self.interval)
+
+        elapsed = time.perf_counter() - started
+        try:
+            self.last_report = self._write_reports(stacks, samples, elapsed)
+            logger.info("Profiler finished: %d samples -> %s", samples, self.last_report["collapsed_file"])
+        except OSError as e:
+            logger.error("Failed to write profile: %s", e)
+
+    def _write_reports(self, stacks: Counter, samples: int, elapsed: float) -> Dict:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        collapsed_file = os.path.join(self.output_dir, f"profile-{stamp}.collapsed")
+        report_file = os.path.join(self.output_dir, f"profile-{stamp}.txt")
+
+        with open(collapsed_file, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        self_counts, total_counts = _function_counts(stacks)
+        top = [
+            {
+                "function": name,
+                "self": self_counts.get(name, 0),
+                "total": total,
+                "self_pct": self_counts.get(name, 0) / samples if samples else 0.0,
+                "total_pct": total / samples if samples else 0.0
+            }
+            for name, total in sorted(total_counts.items(),
+                                      key=lambda item: (self_counts.get(item[0], 0), item[1]),
+                                      reverse=True)[:self.top_n]
+        ]
+
+        with open(report_file, "w", encoding="utf-8") as f:
+            f.write(f"Samples: {samples} over {elapsed:.1f}s "
+                    f"(interval {self.interval * 1000:.1f}ms)\n\n")
+            f.write(f"{'self%':>7} {'total%':>7}  function\n")
+            for row in top:
+                f.write(f"{row['self_pct']:>7.1%} {row['total_pct']:>7.1%}  {row['function']}\n")
+
+        return {
+            "samples": samples,
+            "seconds": elapsed,
+            "collapsed_file": collapsed_file,
+            "report_file": report_file,
+            "top": top
+        }
+
+
+def _collapse(frame) -> Tuple[str, ...]:
+    """Root-first tuple of 'function (file:line)' entries"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def _function_counts(stacks: Counter) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Self (leaf) and inclusive sample counts per function"""
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    for stack, count in stacks.items():
+        if not stack:
+            continue
+        self_counts[stack[-1]] += count
+        for name in set(stack):
+            total_counts[name] += count
+    return self_counts, total_counts
+
+
+# One profiler per process; the agent loop registers itself as the target
+_profiler: Optional[SamplingProfiler] = None
+
+
+def get_profiler() -> SamplingProfiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = SamplingProfiler()
+    return _profiler
+
+
+def install_signal_handler(seconds: float = PROFILE_DEFAULT_SECONDS) -> bool:
+    """Make the calling thread the profiling target and capture it on SIGUSR1
+
+    SIGUSR1 only exists on POSIX; elsewhere the agent_http /profile
+    endpoint (relayed by the dashboard's /api/profile) is the only trigger.
+    """
+    profiler = get_profiler()
+    profiler.set_target_thread()
+
+    signum = getattr(signal, "SIGUSR1", None)
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def _handler(signum, frame):
+        profiler.start(seconds)
+
+    signal.signal(signum, _handler)
+    logger.debug("Profiler armed - send SIGUSR1 to pid %d to capture %.0fs", os.getpid(), seconds)
+    return True
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-hop swap routing over a cached graph of Uniswap pools
+"""
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+from config import ROUTE_MAX_HOPS, ROUTE_PRICE_TOLERANCE, ROUTE_LIQUIDITY_TOLERANCE, ROUTE_REFERENCE_NOTIONAL
+
+
+class PoolGraph:
+    """Tokens as nodes, pools as a pair of directed edges
+
+    An edge token_in -> token_out of a pool with price p (token_out per
+    token_in), fee f and liquidity L (USD value locked) weighs
+
+        -log(p) - log(1 - f) - log(1 - min(0.99, notional / L))
+
+    so the cheapest path is the best execution for a trade of about
+    `notional`: the sum of weights is -log of the product of effective
+    rates. Weights can be negative, so the search is a Bellman-Ford
+    relaxation bounded to max_hops (routes never revisit a token).
+
+    Routes are cached per (token_in, token_out) and tagged with the graph
+    version. update_pool() only bumps the version - and so invalidates the
+    cache - when a pool's price moved more than price_tolerance (relative)
+    or its liquidity more than liquidity_tolerance, or a pool appeared.
+    """
+
+    def __init__(self, max_hops: int = ROUTE_MAX_HOPS,
+                 price_tolerance: float = ROUTE_PRICE_TOLERANCE,
+                 liquidity_tolerance: float = ROUTE_LIQUIDITY_TOLERANCE,
+                 notional: float = ROUTE_REFERENCE_NOTIONAL):
+        self.max_hops = max_hops
+        self.price_tolerance = price_tolerance
+        self.liquidity_tolerance = liquidity_tolerance
+        self.notional = notional
+        self.pools: Dict[str, Dict] = {}
+        self.symbols: Dict[str, str] = {}  # token address -> symbol
+        self._edges: Dict[str, List[Tuple[str, str, float, float]]] = {}  # token -> (out, pool, weight, mid)
+        self._routes: Dict[Tuple[str, str], Tuple[int, Optional[Dict]]] = {}
+        self.version = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.pools)
+
+    def update_pool(self, address: str, token0: str, token1: str, fee: float,
+                    price: float, liquidity: Optional[float] = None,
+                    symbol0: Optional[str] = None, symbol1: Optional[str] = None) -> bool:
+        """Add or refresh a pool (price = token1 per token0); True if the change was material
+
+        liquidity=None keeps the pool's known TVL (price-only updates, e.g.
+        from on-chain reads); a pool never seen with a TVL gets no penalty.
+        """
+        address, token0, token1 = address.lower(), token0.lower(), token1.lower()
+        if price <= 0:
+            return False
+        with self._lock:
+            if symbol0:
+                self.symbols[token0] = symbol0
+            if symbol1:
+                self.symbols[token1] = symbol1
+            pool = self.pools.get(address)
+            if liquidity is None:
+                liquidity = pool["liquidity"] if pool is not None else math.inf
+            material = (pool is None
+                        or abs(price / pool["price"] - 1) > self.price_tolerance
+                        or self._liquidity_moved(pool["liquidity"], liquidity))
+            if pool is not None and not material:
+                return False
+            self.pools[address] = {"address": address, "token0": token0, "token1": token1,
+                                   "fee": fee, "price": price, "liquidity": liquidity}
+            self._rebuild_edges()
+            self.version += 1
+            return True
+
+    def _liquidity_moved(self, old: float, new: float) -> bool:
+        if math.isinf(old) or math.isinf(new):
+            return old != new
+        return abs(new - old) > self.liquidity_tolerance * max(old, 1e-9)
+
+    def remove_pool(self, address: str):
+        with self._lock:
+            if self.pools.pop(address.lower(), None) is not None:
+                self._rebuild_edges()
+                self.version += 1
+
+    def _weight(self, rate: float, pool: Dict) -> float:
+        impact = min(0.99, self.notional / pool["liquidity"]) if pool["liquidity"] > 0 else 0.99
+        return -math.log(rate) - math.log(1 - pool["fee"]) - math.log(1 - impact)
+
+    def _rebuild_edges(self):
+        edges: Dict[str, List[Tuple[str, str, float, float]]] = {}
+        for pool in self.pools.values():
+            forward, backward = pool["price"], 1 / pool["price"]
+            edges.setdefault(pool["token0"], []).append(
+                (pool["token1"], pool["address"], self._weight(forward, pool), forward))
+            edges.setdefault(pool["token1"], []).append(
+                (pool["token0"], pool["address"], self._weight(backward, pool), backward))
+        self._edges = edges
+
+    def best_route(self, token_in: str, token_out: str) -> Optional[Dict]:
+        """Cheapest path of at most max_hops pools, from the cache when the graph is unchanged
+
+        Returns {"path", "pools", "rate" (effective, after fees and impact),
+        "mid" (product of pool prices), "hops"} or None when unreachable.
+        """
+        key = (token_in.lower(), token_out.lower())
+        with self._lock:
+            cached = self._routes.get(key)
+            if cached is not None and cached[0] == self.version:
+                self.cache_hits += 1
+                return cached[1]
+            self.cache_misses += 1
+            route = self._search(*key)
+            self._routes[key] = (self.version, route)
+            return route
+
+    def _search(self, source: str, target: str) -> Optional[Dict]:
+        if source == target or source not in self._edges:
+            return None
+        # frontier: token -> (cost, mid, path, pools) for paths of exactly `hop` edges
+        frontier = {source: (0.0, 1.0, (source,), ())}
+        best = None
+        for _ in range(self.max_hops):
+            next_frontier: Dict[str, Tuple[float, float, tuple, tuple]] = {}
+            for token, (cost, mid, path, pools) in frontier.items():
+                for out, pool, weight, rate in self._edges.get(token, ()):
+                    if out in path:
+                        continue
+                    candidate = (cost + weight, mid * rate, path + (out,), pools + (pool,))
+                    if out == target:
+                        if best is None or candidate[0] < best[0]:
+                            best = candidate
+                        continue
+                    current = next_frontier.get(out)
+                    if current is None or candidate[0] < current[0]:
+                        next_frontier[out] = candidate
+            frontier = next_frontier
+            if not frontier:
+                break
+        if best is None:
+            return None
+        cost, mid, path, pools = best
+        return {"path": list(path), "pools": list(pools), "rate": math.exp(-cost),
+                "mid": mid, "hops": len(pools)}
+
+    def quote(self, token_in: str, token_out: str, amount: float) -> Optional[float]:
+        """Expected output for swapping `amount` of token_in along the best route"""
+        route = self.best_route(token_in, token_out)
+        return amount * route["rate"] if route else None
+
+    def route_symbols(self, route: Dict) -> List[str]:
+        return [self.symbols.get(token, token) for token in route["path"]]
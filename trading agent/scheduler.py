@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Fixed-rate heartbeat scheduler with market data prefetch
+"""
+import time
+import threading
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatScheduler:
+    """Fires a tick callback on a fixed-rate grid
+
+    Deadlines are start + k * interval on the monotonic clock, so the time a
+    heartbeat takes never shifts the next one. A heartbeat that runs past the
+    following deadline is counted as an overrun and the missed slots are
+    skipped rather than fired back to back.
+
+    With a prefetch callable, the next tick's market data is fetched on a
+    worker thread, started far enough ahead of the next deadline to be ready
+    when it fires. The lead adapts to observed fetch latency. The prefetch
+    is only submitted once the current tick has returned, so it overlaps
+    the idle wait between heartbeats and never a running tick - the fetch
+    updates trader state (snapshots, candles, order books, call counts)
+    that the tick reads.
+    """
+
+    def __init__(self, interval: float,
+                 prefetch: Optional[Callable[[], Dict]] = None,
+                 metrics=None,
+                 min_prefetch_lead: float = 0.5):
+        self.interval = interval
+        self.prefetch = prefetch
+        self.metrics = metrics
+        self.min_prefetch_lead = min_prefetch_lead
+
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.max_lateness = 0.0
+        self._fetch_latency = 0.0  # EWMA of prefetch duration
+        self._stop = threading.Event()
+
+    @property
+    def prefetch_lead(self) -> float:
+        """How far ahead of a deadline the prefetch starts"""
+        return min(self.interval, max(self.min_prefetch_lead, self._fetch_latency * 1.5))
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, tick: Callable[[Optional[Dict]], bool], max_ticks: Optional[int] = None):
+        """Call tick(market_data) every interval until it returns False
+
+        market_data is the prefetched snapshot, or None when prefetching is
+        off or failed (the tick then fetches inline).
+        """
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch") if self.prefetch else None
+        pending: Optional[Future] = None
+        deadline = time.monotonic()
+        self._stop.clear()
+
+        try:
+            while not self._stop.is_set() and (max_ticks is None or self.ticks < max_ticks):
+                delay = deadline - time.monotonic()
+                if delay > 0 and self._stop.wait(delay):
+                    break
+
+                fired = time.monotonic()
+                lateness = fired - deadline
+                self.max_lateness = max(self.max_lateness, lateness)
+                if self.metrics is not None:
+                    self.metrics.observe("schedule_lateness", lateness)
+
+                market_data = self._collect(pending)
+                pending = None
+
+                self.ticks += 1
+                if not tick(market_data):
+                    break
+
+                deadline += self.interval
+                finished = time.monotonic()
+                if finished > deadline:
+                    overrun = finished - deadline
+                    missed = int(overrun // self.interval) + 1
+                    self.overruns += 1
+                    self.skipped += missed
+                    deadline += missed * self.interval
+                    logger.warning("Heartbeat overran by %.3fs - skipping %d slot(s)", overrun, missed)
+
+                last_tick = max_ticks is not None and self.ticks >= max_ticks
+                if executor is not None and not last_tick and not self._stop.is_set():
+                    # starts at once when the tick ran into the lead window
+                    pending = executor.submit(self._prefetch_at, deadline - self.prefetch_lead)
+        finally:
+            self._stop.set()  # wakes a prefetch still waiting for its start time
+            if pending is not None:
+                pending.cancel()
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def _prefetch_at(self, start_at: float) -> Dict:
+        delay = start_at - time.monotonic()
+        if delay > 0:
+            self._stop.wait(delay)
+        started = time.monotonic()
+        data = self.prefetch()
+        elapsed = time.monotonic() - started
+        self._fetch_latency = elapsed if not self._fetch_latency else 0.8 * self._fetch_latency + 0.2 * elapsed
+        if self.metrics is not None:
+            self.metrics.observe("prefetch", elapsed)
+        return data
+
+    def _collect(self, pending: Optional[Future]) -> Optional[Dict]:
+        if pending is None:
+            return None
+        try:
+            return pending.result()
+        except Exception as e:
+            logger.error("Market data prefetch failed: %s", e)
+            return None
+
+    def stats(self) -> Dict:
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "max_lateness": self.max_lateness,
+            "prefetch_lead": self.prefetch_lead
+        }
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Two-stage universe screener - bulk ticker filter, then strategy on the top K
+"""
+import time
+import logging
+import numpy as np
+from typing import Dict, List, Optional
+from config import (
+    SCREENER_TOP_K,
+    SCREENER_REFRESH_INTERVAL,
+    SCREENER_MIN_VOLUME,
+    SCREENER_MAX_SPREAD,
+    SCREENER_MIN_CHANGE,
+    SCREENER_QUOTES,
+    TRADING_PAIRS
+)
+
+logger = logging.getLogger(__name__)
+
+
+class UniverseScreener:
+    """Picks which symbols are worth fetching candles for and analyzing
+
+    Stage 1 pulls every instrument's ticker in one bulk request and filters
+    them with vectorized NumPy masks on 24h traded value, bid/ask spread and
+    absolute 24h change; survivors are ranked by |change| weighted by
+    log10(traded value) and the top K kept. Stage 1 only reruns every
+    refresh_interval seconds. Stage 2 - candles plus the strategy - runs on
+    the candidates only, through the trader's normal get_market_data.
+    """
+
+    def __init__(self, trader,
+                 top_k: int = SCREENER_TOP_K,
+                 refresh_interval: float = SCREENER_REFRESH_INTERVAL,
+                 min_volume: float = SCREENER_MIN_VOLUME,
+                 max_spread: float = SCREENER_MAX_SPREAD,
+                 min_change: float = SCREENER_MIN_CHANGE,
+                 quotes: List[str] = SCREENER_QUOTES):
+        self.trader = trader
+        self.top_k = top_k
+        self.refresh_interval = refresh_interval
+        self.min_volume = min_volume
+        self.max_spread = max_spread
+        self.min_change = min_change
+        self.quotes = tuple(f"_{quote}" for quote in quotes)
+
+        self._candidates: List[str] = list(TRADING_PAIRS)
+        self._refreshed_at: Optional[float] = None
+        self.refreshes = 0
+        self.universe_size = 0
+
+    def rank(self, tickers: List[Dict]) -> List[str]:
+        """Stage 1: filter and rank a bulk ticker list, best first"""
+        tickers = [t for t in tickers if t["symbol"].endswith(self.quotes)]
+        self.universe_size = len(tickers)
+        if not tickers:
+            return []
+
+        bid = np.fromiter((t["bid"] for t in tickers), dtype=np.float64, count=len(tickers))
+        ask = np.fromiter((t["ask"] for t in tickers), dtype=np.float64, count=len(tickers))
+        value = np.fromiter((t["volume_value"] for t in tickers), dtype=np.float64, count=len(tickers))
+        change = np.abs(np.fromiter((t["change"] for t in tickers), dtype=np.float64, count=len(tickers)))
+
+        quoted = (bid > 0) & (ask >= bid)
+        mid = np.where(quoted, (bid + ask) / 2, 1.0)
+        spread = np.where(quoted, (ask - bid) / mid, np.inf)
+
+        mask = (value >= self.min_volume) & (spread <= self.max_spread) & (change >= self.min_change)
+        indexes = np.flatnonzero(mask)
+        if not len(indexes):
+            return []
+
+        score = change[indexes] * np.log10(value[indexes])
+        if len(indexes) > self.top_k:
+            top = np.argpartition(-score, self.top_k - 1)[:self.top_k]
+        else:
+            top = np.arange(len(indexes))
+        top = top[np.argsort(-score[top])]
+        return [tickers[i]["symbol"] for i in indexes[top]]
+
+    @property
+    def stale(self) -> bool:
+        return (self._refreshed_at is None
+                or time.monotonic() - self._refreshed_at >= self.refresh_interval)
+
+    def refresh(self) -> List[str]:
+        """Rerun stage 1 now (one API request)"""
+        self._refreshed_at = time.monotonic()
+        self.refreshes += 1
+        tickers = self.trader.get_all_tickers()
+        if not tickers:
+            logger.warning("Screener got no tickers - keeping %d candidates", len(self._candidates))
+            return self._candidates
+        ranked = self.rank(tickers)
+        if ranked:
+            self._candidates = ranked
+        logger.info("Screener: %d candidates from %d instruments: %s",
+                    len(ranked), self.universe_size, ", ".join(ranked))
+        return self._candidates
+
+    @property
+    def current(self) -> List[str]:
+        """Candidates as of the last refresh (never triggers one)"""
+        return self._candidates
+
+    def candidates(self) -> List[str]:
+        """Current top-K symbols, refreshed when older than refresh_interval"""
+        if self.stale:
+            return self.refresh()
+        return self._candidates
+
+    def scan(self, strategy) -> Dict:
+        """Stage 2: fetch the candidates' market data and run the strategy on it"""
+        market_data = self.trader.get_market_data(self.candidates())
+        return strategy.analyze(market_data)
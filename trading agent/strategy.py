@@ -3,11 +3,12 @@
 Trading strategies and decision logic
 """
 import numpy as np
-from typing import Dict, List
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 import logging
 from config import (
     RSI_PERIOD, RSI_OVERSOLD, RSI_OVERBOUGHT,
-    MA_FAST, MA_SLOW
+    MA_FAST, MA_SLOW, SIGNAL_CACHE_SIZE
 )
 
 logger = logging.getLogger(__name__)
@@ -19,6 +20,10 @@ class TradingStrategy:
     def __init__(self):
         self.name = "base_strategy"
     
+    def params(self) -> Tuple:
+        """Parameters that affect the signal (part of the memoization key)"""
+        return (RSI_PERIOD, RSI_OVERSOLD, RSI_OVERBOUGHT, MA_FAST, MA_SLOW)
+    
     def calculate_rsi(self, prices: List[float], period: int = RSI_PERIOD) -> float:
         """Calculate Relative Strength Index"""
         if len(prices) < period + 1:
@@ -133,6 +138,71 @@ class MomentumStrategy(TradingStrategy):
         return {"action": "HOLD", "confidence": 0.0, "reasons": ["No data"]}
 
 
+class SignalCache:
+    """LRU memo of strategy signals keyed by candle buckets and the latest close
+    
+    The key combines the strategy name and parameters with, per symbol,
+    the bucket of the last closed candle and the close of the forming one.
+    The forming candle's timestamp is left out (synthetic candles are
+    stamped with the fetch time), but every indicator - and so the
+    confidence - reads its close, so the strategy reruns whenever that
+    price moves or a new candle closes, and a hit is exactly the signal a
+    rerun would produce.
+    """
+    
+    def __init__(self, max_entries: int = SIGNAL_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def key(strategy: TradingStrategy, market_data: Dict) -> Tuple:
+        watermarks = []
+        for symbol in sorted(market_data):
+            candles = market_data[symbol].get("candles") or []
+            if len(candles) >= 2:
+                closed = candles[-2]
+                # whole seconds: synthetic candles' spacing jitters by a millisecond
+                interval = round((candles[-1]["timestamp"] - closed["timestamp"]) / 1000) * 1000
+                bucket = closed["timestamp"] // interval if interval > 0 else closed["timestamp"]
+                watermarks.append((symbol, bucket, len(candles), candles[-1]["close"]))
+            else:
+                watermarks.append((symbol, None, len(candles), candles[-1]["close"] if candles else None))
+        return (strategy.name, strategy.params(), tuple(watermarks))
+    
+    def get(self, key: Tuple) -> Optional[Dict]:
+        signal = self._entries.get(key)
+        if signal is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(signal)
+    
+    def put(self, key: Tuple, signal: Dict):
+        self._entries[key] = dict(signal)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    def stats(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "hit_rate": self.hit_rate
+        }
+
+
 def get_strategy(strategy_type: str) -> TradingStrategy:
     """Factory function to get strategy instance"""
     if strategy_type == "momentum":
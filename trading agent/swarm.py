@@ -0,0 +1,376 @@
+# -*- coding: utf-8 -*-
+"""
+Swarm runtime - many agents across worker processes sharing one market feed
+"""
+import sys
+import time
+import queue
+import pickle
+import struct
+import logging
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+from scheduler import HeartbeatScheduler
+from config import (
+    TRADING_PAIRS,
+    STRATEGY_TYPE,
+    GOODWILL_LEVEL_SWARM_LEADER,
+    SWARM_WORKERS,
+    SWARM_SNAPSHOT_BYTES,
+    SWARM_LOG_LEVEL,
+    SWARM_STEP_TIMEOUT,
+    COORDINATOR_HOST,
+    COORDINATOR_PORT
+)
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<QQ")  # sequence number, payload length
+
+
+def _shareable(market_data: Dict) -> Dict:
+    """Market data without process-local objects (order books hold locks)"""
+    return {symbol: {key: value for key, value in data.items() if key != "book"}
+            for symbol, data in market_data.items()}
+
+
+class SharedSnapshot:
+    """Market data published once into a shared memory segment
+
+    The writer pickles the snapshot into the segment behind a (sequence,
+    length) header; readers in other processes attach by name and unpickle
+    it. Only the sequence number travels through queues, so fan-out cost
+    does not grow with snapshot size.
+    """
+
+    def __init__(self, name: Optional[str] = None, size: int = SWARM_SNAPSHOT_BYTES):
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            _HEADER.pack_into(self._shm.buf, 0, 0, 0)
+            self.owner = True
+        else:
+            try:
+                # The creating process owns cleanup; don't let a reader's tracker unlink it
+                self._shm = shared_memory.SharedMemory(name=name, track=False)
+            except TypeError:  # Python < 3.13
+                self._shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.sequence = 0
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def publish(self, market_data: Dict) -> int:
+        payload = pickle.dumps(_shareable(market_data), protocol=pickle.HIGHEST_PROTOCOL)
+        if _HEADER.size + len(payload) > self._shm.size:
+            raise ValueError(f"Snapshot of {len(payload)} bytes exceeds SWARM_SNAPSHOT_BYTES")
+        self.sequence += 1
+        self._shm.buf[_HEADER.size:_HEADER.size + len(payload)] = payload
+        _HEADER.pack_into(self._shm.buf, 0, self.sequence, len(payload))
+        return self.sequence
+
+    def read(self, expected: Optional[int] = None) -> Dict:
+        sequence, length = _HEADER.unpack_from(self._shm.buf, 0)
+        if expected is not None and sequence != expected:
+            raise RuntimeError(f"Snapshot {expected} was overwritten by {sequence}")
+        return pickle.loads(self._shm.buf[_HEADER.size:_HEADER.size + length])
+
+    def close(self):
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+
+
+def _agent_status(agent) -> Dict:
+    return {
+        "name": agent.name,
+        "alive": agent.alive,
+        "gmac": agent.gmac,
+        "goodwill": agent.goodwill,
+        "heartbeats": agent.heartbeats,
+        "trades": agent.trades_executed,
+        "wins": agent.winning_trades,
+        "losses": agent.losing_trades,
+        "equity": agent.equity_usd,
+        "pnl": agent.pnl_usd,
+        "realized": agent.realized_pnl_usd,
+        "unrealized": agent.pnl_usd - agent.realized_pnl_usd,
+        "held": agent._held_symbols()
+    }
+
+
+def _worker_main(shard: List[Dict], snapshot_name: str, fetch_cost_share: float,
+                 ticks: mp.Queue, results: mp.Queue,
+                 coordinator: Optional[Tuple[str, str, int]] = None):
+    """Worker process: owns a shard of agents, runs them on each published snapshot
+
+    coordinator is the node's (node_id, host, port); the worker opens its own
+    connection so its agents claim their orders with the coordinator.
+    """
+    logging.basicConfig(format="%(processName)s %(name)s - %(message)s")
+    logging.getLogger().setLevel(SWARM_LOG_LEVEL)
+    from agent import TradingAgent
+    client = None
+    if coordinator is not None:
+        from coordinator import CoordinatorClient
+        node_id, host, port = coordinator
+        client = CoordinatorClient(node_id, host, port)
+
+    agents = []
+    for spec in shard:
+        agent = TradingAgent(spec["name"],
+                             strategy_type=spec.get("strategy", STRATEGY_TYPE),
+                             confidence_threshold=spec.get("confidence_threshold", 0.70),
+                             survival_confidence_threshold=spec.get("survival_confidence_threshold", 0.85))
+        agent.fetch_cost_share = fetch_cost_share
+        agent.coordinator = client
+        agents.append(agent)
+
+    snapshot = SharedSnapshot(snapshot_name)
+    try:
+        while True:
+            message = ticks.get()
+            if message is None:
+                break
+            sequence, tradable = message
+            market_data = snapshot.read(sequence)
+            statuses = []
+            for agent in agents:
+                if agent.alive:
+                    # New entries follow the node's assignment; held symbols stay in the snapshot for exits
+                    agent.tradable = tradable
+                    # Paper fills price off this snapshot - no per-agent requests
+                    agent.trader.set_market_snapshot(market_data)
+                    try:
+                        agent.heartbeat(market_data)
+                    except Exception as e:
+                        logger.error("Agent %s heartbeat failed: %s", agent.name, e)
+                statuses.append(_agent_status(agent))
+            results.put((sequence, statuses))
+    finally:
+        snapshot.close()
+        if client is not None:
+            client.close()
+
+
+class Swarm:
+    """Hosts many agents, fetching market data once per heartbeat for all of them
+
+    Agents are described by spec dicts (name, strategy, confidence_threshold,
+    survival_confidence_threshold) and split round-robin into one shard per
+    worker process. Each agent keeps its own GMAC, goodwill, positions and
+    paper balance; the fetch GMAC of the shared feed is split evenly between
+    them.
+
+    With a CoordinatorClient the swarm runs as one node of a multi-host
+    swarm: it trades only the symbols the coordinator assigns it, claims
+    every order with the coordinator before placing it, and reports
+    goodwill and P&L on every tick. When a rebalance moves a symbol away,
+    it keeps being fetched while any agent still holds it, so those
+    positions are marked and exit-checked until they close. The node elected leader also pulls the
+    swarm-wide totals (swarm_status) and logs them.
+    """
+
+    def __init__(self, specs: List[Dict], workers: int = SWARM_WORKERS,
+                 trader=None, symbols: List[str] = TRADING_PAIRS, coordinator=None):
+        if trader is None:
+            from trading import CryptoComTrader
+            trader = CryptoComTrader()
+        self.specs = specs
+        self.trader = trader
+        self.symbols = symbols
+        self.coordinator = coordinator
+        self.workers = max(1, min(workers, len(specs)))
+        self.status: Dict[str, Dict] = {}
+        self.swarm_status: Optional[Dict] = None  # coordinator totals, kept by the leader node
+        self._processes: List[mp.Process] = []
+        self._tick_queues: List[mp.Queue] = []
+        self._results: Optional[mp.Queue] = None
+        self._snapshot: Optional[SharedSnapshot] = None
+
+    def start(self):
+        self._snapshot = SharedSnapshot()
+        self._results = mp.Queue()
+        share = 1.0 / len(self.specs)
+        coordinator = None
+        if self.coordinator is not None:
+            host, port = self.coordinator.address
+            coordinator = (self.coordinator.node_id, host, port)
+        for index in range(self.workers):
+            shard = self.specs[index::self.workers]
+            ticks = mp.Queue()
+            process = mp.Process(target=_worker_main, name=f"swarm-{index}",
+                                 args=(shard, self._snapshot.name, share, ticks, self._results, coordinator),
+                                 daemon=True)
+            process.start()
+            self._processes.append(process)
+            self._tick_queues.append(ticks)
+        logger.info("Swarm started: %d agents on %d worker(s)", len(self.specs), self.workers)
+
+    def stop(self):
+        for ticks in self._tick_queues:
+            ticks.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                logger.warning("Worker %s did not exit - terminating it", process.name)
+                process.terminate()
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+        self._processes.clear()
+        self._tick_queues.clear()
+        if self._snapshot is not None:
+            self._snapshot.close()
+            self._snapshot = None
+
+    def step(self, market_data: Dict, timeout: float = SWARM_STEP_TIMEOUT) -> Dict[str, Dict]:
+        """Publish one snapshot and wait for every worker's heartbeat results
+
+        A worker that dies, or results that don't arrive within timeout,
+        fail the step: the swarm is stopped (releasing the shared memory
+        segment) and RuntimeError is raised rather than blocking forever.
+        """
+        sequence = self._snapshot.publish(market_data)
+        for ticks in self._tick_queues:
+            ticks.put((sequence, list(self.symbols)))
+        pending = len(self._tick_queues)
+        deadline = time.monotonic() + timeout
+        while pending:
+            try:
+                result_sequence, statuses = self._results.get(timeout=1.0)
+            except queue.Empty:
+                self._check_workers(sequence, deadline)
+                continue
+            if result_sequence != sequence:
+                continue
+            pending -= 1
+            for status in statuses:
+                self.status[status["name"]] = status
+        return self.status
+
+    def _check_workers(self, sequence: int, deadline: float):
+        dead = [process for process in self._processes if not process.is_alive()]
+        if dead:
+            error = ", ".join(f"{process.name} (exit code {process.exitcode})" for process in dead)
+            error = f"Swarm worker(s) died during tick {sequence}: {error}"
+        elif time.monotonic() > deadline:
+            error = f"Swarm tick {sequence} timed out waiting for worker results"
+        else:
+            return
+        logger.error(error)
+        self.stop()
+        raise RuntimeError(error)
+
+    def _report(self):
+        """Heartbeat to the coordinator and pick up any symbol reassignment"""
+        statuses = self.status.values()
+        try:
+            self.coordinator.heartbeat(
+                goodwill=max((status["goodwill"] for status in statuses), default=0),
+                realized=sum(status["realized"] for status in statuses),
+                unrealized=sum(status["unrealized"] for status in statuses),
+                trades=sum(status["trades"] for status in statuses))
+            self.symbols = self.coordinator.symbols
+            if self.coordinator.is_leader:
+                self._lead()
+        except OSError as e:
+            logger.error("Coordinator unreachable - keeping %s: %s", self.symbols, e)
+
+    def _lead(self):
+        """Leader-only: aggregate the whole swarm's P&L from the coordinator"""
+        status = self.coordinator.status()
+        if not status.get("ok"):
+            return
+        self.swarm_status = status
+        logger.info("Swarm epoch %d: %d node(s), %d trades, P&L $%.2f (realized $%.2f)",
+                    status["epoch"], len(status["nodes"]), status["trades"],
+                    status["total_pnl"], status["realized_pnl"])
+
+    @property
+    def alive(self) -> int:
+        return sum(1 for status in self.status.values() if status["alive"])
+
+    def fetch_symbols(self) -> List[str]:
+        """Assigned symbols plus any an agent still holds from an earlier assignment"""
+        held = sorted({symbol for status in self.status.values() for symbol in status.get("held", [])})
+        return list(self.symbols) + [symbol for symbol in held if symbol not in self.symbols]
+
+    def leader(self) -> Optional[Dict]:
+        """Highest-goodwill agent, if it has reached GOODWILL_LEVEL_SWARM_LEADER"""
+        best = max(self.status.values(), key=lambda status: status["goodwill"], default=None)
+        if best is not None and best["goodwill"] >= GOODWILL_LEVEL_SWARM_LEADER:
+            return best
+        return None
+
+    def run(self, interval: float, max_ticks: Optional[int] = None) -> Dict[str, Dict]:
+        """Fetch once per interval and fan the snapshot out to every agent"""
+        self.start()
+        if self.coordinator is not None:
+            self.coordinator.register()
+            self.symbols = self.coordinator.symbols
+        try:
+            def tick(market_data: Optional[Dict]) -> bool:
+                symbols = self.fetch_symbols()
+                if market_data is None and symbols:
+                    market_data = self.trader.get_market_data(symbols)
+                if market_data:
+                    self.step(market_data)
+                    logger.info("Swarm tick: %d/%d agents alive, %d API calls so far",
+                                self.alive, len(self.specs), self.trader.api_calls)
+                if self.coordinator is not None:
+                    self._report()
+                return not self.status or self.alive > 0
+
+            scheduler = HeartbeatScheduler(interval, prefetch=lambda: self.trader.get_market_data(self.fetch_symbols()))
+            scheduler.run(tick, max_ticks=max_ticks)
+        finally:
+            self.stop()
+            if self.coordinator is not None:
+                try:
+                    self.coordinator.leave()
+                except OSError:
+                    pass
+        return self.status
+
+
+def run_swarm_demo(agents: int = 20, cycles: int = 5):
+    """Run a swarm of agents with a spread of confidence thresholds"""
+    specs = [{"name": f"Swarm-{i:03d}", "confidence_threshold": 0.50 + 0.40 * i / max(1, agents - 1)}
+             for i in range(agents)]
+    swarm = Swarm(specs)
+    status = swarm.run(interval=5, max_ticks=cycles)
+
+    print("\n" + "=" * 80)
+    print(f"SWARM COMPLETE - {swarm.alive}/{agents} alive, {swarm.trader.api_calls} API calls")
+    print("=" * 80)
+    for entry in sorted(status.values(), key=lambda s: s["pnl"], reverse=True)[:10]:
+        print(f"  {entry['name']}: GMAC {entry['gmac']:.2f} | Goodwill {entry['goodwill']} | "
+              f"Trades {entry['trades']} | P&L ${entry['pnl']:.2f}")
+    leader = swarm.leader()
+    if leader:
+        print(f"\nSwarm leader: {leader['name']} (goodwill {leader['goodwill']})")
+
+
+def run_swarm_node(node_id: str, agents: int = 20, cycles: Optional[int] = None,
+                   host: str = COORDINATOR_HOST, port: int = COORDINATOR_PORT, interval: float = 5):
+    """Run this host's agents as one node of a coordinated swarm (start coordinator.py first)"""
+    from coordinator import CoordinatorClient
+    specs = [{"name": f"{node_id}-{i:03d}", "confidence_threshold": 0.50 + 0.40 * i / max(1, agents - 1)}
+             for i in range(agents)]
+    swarm = Swarm(specs, coordinator=CoordinatorClient(node_id, host, port))
+    swarm.run(interval=interval, max_ticks=cycles)
+    print(f"Node {node_id} done - {swarm.alive}/{agents} alive, symbols {swarm.symbols}")
+
+
+if __name__ == "__main__":
+    # python swarm.py                        - single-host demo
+    # python swarm.py node <node_id> [agents] - join the swarm served by coordinator.py
+    if len(sys.argv) > 2 and sys.argv[1] == "node":
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+        run_swarm_node(sys.argv[2], agents=int(sys.argv[3]) if len(sys.argv) > 3 else 20)
+    else:
+        run_swarm_demo()
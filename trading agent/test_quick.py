@@ -35,6 +35,244 @@ except Exception as e:
     print(f"   ❌ {e}\n")
     sys.exit(1)
 
+# Test 4: Checkpoint restore then journal replay
+print("4. Checkpoint Round Trip")
+try:
+    from position_book import PositionBook, LONG
+    
+    live = PositionBook(capacity=8)
+    ids = [live.open("ETH_USDT", LONG, 2000.0 + i, 1.0) for i in range(4)]
+    live.close(ids[1], 2100.0)
+    live.close(ids[2], 1900.0)
+    restored = PositionBook()
+    restored.set_state(live.get_state())
+    
+    # Replay the same journal on both: a fill opens a position, an exit settles it by id
+    for book in (live, restored):
+        reopened = book.open("ETH_USDT", LONG, 2050.0, 0.5, timestamp=1.0)
+        book.settle(reopened, 2060.0)
+        book.settle(ids[3], 2010.0, 0.25)
+        book.open("ETH_USDT", LONG, 2070.0, 2.0, timestamp=2.0)
+    assert restored.get_state() == live.get_state(), "restored book diverged from the live book"
+    assert len(restored) == len(live) == 3
+    print(f"   ✅ Restored book replays onto the same slots\n")
+except Exception as e:
+    print(f"   ❌ {e}\n")
+    sys.exit(1)
+
+# Test 5: Transaction pipeline on an in-process chain
+print("5. Transaction Pipeline (local chain)")
+try:
+    from web3 import Web3
+    from eth_account import Account
+    import eth_tester  # backs Web3.EthereumTesterProvider
+except ImportError as e:
+    print(f"   ⏭️  Skipped - {e} (pip install \"web3[tester]\")\n")
+else:
+    try:
+        import time
+        from tx_pipeline import TxPipeline, CONFIRMED
+
+        provider = Web3.EthereumTesterProvider()
+        w3 = Web3(provider)
+        account = Account.create()
+        w3.eth.send_transaction({"from": w3.eth.accounts[0], "to": account.address, "value": w3.to_wei(1, "ether")})
+        transfer = {"to": w3.eth.accounts[1], "value": 1, "gas": 21000}
+        # poll() is driven by hand; the tracker thread would sleep for a minute first
+        pipeline = TxPipeline(w3, account, confirmations=2, poll_interval=60, stuck_after=0.1)
+
+        # Nonces are assigned locally, back to back
+        sent = [pipeline.submit(transfer, label=f"transfer {i}") for i in range(3)]
+        assert [record["nonce"] for record in sent] == [0, 1, 2], "nonces not sequential"
+        assert w3.eth.get_transaction_count(account.address, "pending") == 3, "node nonce out of step"
+        provider.ethereum_tester.mine_blocks(1)
+        pipeline.poll()
+        assert all(record["status"] == CONFIRMED for record in sent), "transfers not confirmed"
+
+        # A transaction left unmined past stuck_after is resent with bumped fees
+        provider.ethereum_tester.disable_auto_mine_transactions()
+        stuck = pipeline.submit(transfer, label="stuck")
+        first_fee = stuck["tx"]["maxFeePerGas"]
+        time.sleep(0.2)
+        pipeline.poll()
+        assert stuck["replacements"] == 1 and len(stuck["hashes"]) == 2, "stuck transaction not replaced"
+        assert stuck["tx"]["nonce"] == 3, "replacement changed the nonce"
+        assert stuck["tx"]["maxFeePerGas"] >= int(first_fee * pipeline.fee_bump), "replacement fee not bumped"
+
+        # The replacement is what gets mined, and it confirms after enough blocks
+        provider.ethereum_tester.mine_blocks(1)
+        pipeline.poll()
+        assert stuck["receipt"]["transactionHash"] == stuck["hashes"][-1], "replacement not the mined hash"
+        provider.ethereum_tester.mine_blocks(1)
+        pipeline.poll()
+        assert stuck["status"] == CONFIRMED and pipeline.in_flight == 0, "replacement not confirmed"
+        assert w3.eth.get_transaction_count(account.address) == 4, "account nonce not at 4"
+        pipeline.stop()
+        print(f"   ✅ Nonces 0-3 sent, stuck nonce replaced and confirmed\n")
+    except Exception as e:
+        print(f"   ❌ {e}\n")
+        sys.exit(1)
+
+# Test 6: Ledger rounding
+print("6. Ledger Rounding")
+try:
+    from ledger import Ledger
+
+    ledger = Ledger({"USDT": 1000.0}, decimals={"ETH": 18, "USDT": 6})
+    assert ledger.units("USDT") == 1000 * 10**6
+    # A purchase's cost rounds up, a sale's proceeds round down, to the micro-dollar
+    assert ledger.apply_fill("ETH", "USDT", "BUY", 0.1, 3000.0000001) is None
+    assert ledger.units("USDT") == 1000 * 10**6 - 300000001, "buy cost not rounded up"
+    assert ledger.units("ETH") == 10**17
+    assert ledger.apply_fill("ETH", "USDT", "SELL", 0.1, 3000.0000009) is None
+    assert ledger.units("USDT") == 1000 * 10**6 - 300000001 + 300000000, "sale proceeds not rounded down"
+    assert ledger.units("ETH") == 0, "selling what was bought left dust"
+    assert ledger.apply_fill("ETH", "USDT", "SELL", 0.1, 3000.0) == "Insufficient balance"
+    assert ledger.to_units("ETH", 0.1) == 10**17 and ledger.from_units("USDT", 2500000) == 2.5
+    print(f"   ✅ Costs round up, proceeds down, base quantities exact\n")
+except Exception as e:
+    print(f"   ❌ {e}\n")
+    sys.exit(1)
+
+# Test 7: Exit engine triggers
+print("7. Exit Engine Triggers")
+try:
+    from exit_engine import ExitEngine, TAKE_PROFIT, STOP
+    from position_book import SHORT
+
+    engine = ExitEngine(profit_target=0.02, stop_loss=0.01)
+    levels = engine.register(1, "ETH_USDT", 2000.0)
+    assert abs(levels["take_profit"] - 2040.0) < 1e-9 and abs(levels["stop_loss"] - 1980.0) < 1e-9
+    engine.register(2, "ETH_USDT", 2060.0)
+    engine.register(3, "BTC_USDT", 50000.0, side=SHORT)
+    assert engine.check({"ETH_USDT": 2039.7, "BTC_USDT": 50100.0}) == [], "exit fired between levels"
+
+    # 2035 is under 2's stop (2039.4); the short's target is 2% below its entry
+    exits = engine.check({"ETH_USDT": 2035.0, "BTC_USDT": 49000.0})
+    reasons = {exit["position_id"]: exit["reason"] for exit in exits}
+    assert reasons == {2: STOP, 3: TAKE_PROFIT}, f"unexpected exits {reasons}"
+    exits = engine.check({"ETH_USDT": 2045.0})
+    assert [(exit["position_id"], exit["reason"], exit["price"]) for exit in exits] == [(1, TAKE_PROFIT, 2045.0)]
+    assert len(engine) == 0 and engine.check({"ETH_USDT": 1000.0}) == [], "exit fired twice"
+    print(f"   ✅ Targets and stops fire once, long and short\n")
+except Exception as e:
+    print(f"   ❌ {e}\n")
+    sys.exit(1)
+
+# Test 8: Fill simulator math
+print("8. Fill Simulator Math")
+try:
+    from fill_simulator import FillSimulator, ConstantProductSimulator
+
+    ticker = {"last": 100.0, "bid": 99.9, "ask": 100.1}
+    sim = FillSimulator(latency=0, depth=10000.0, max_slippage=0.01, fee_rate=0.001, realtime=False)
+    # 1001 notional at the 100.1 ask walks 1001 / (10000 * 100) of the linear book, paying half that on average
+    fill = sim.simulate("BUY", 10.0, ticker)
+    assert fill["filled"] == 10.0 and not fill["partial"]
+    assert abs(fill["price"] - 100.1 * (1 + 1001.0 / 1e6 / 2)) < 1e-9, f"buy price {fill['price']}"
+    assert abs(fill["fee"] - 10.0 * fill["price"] * 0.001) < 1e-9
+    # Walking 1% at most fills 1/20 of a 200-unit sell (it would walk 20%)
+    fill = sim.simulate("SELL", 200.0, ticker)
+    assert fill["partial"] and abs(fill["filled"] - 200.0 * 0.01 / (200.0 * 99.9 / 1e6)) < 1e-9
+    assert sim.simulate("BUY", 1.0, ticker, limit_price=99.0)["error"] == "Limit price not marketable"
+
+    pool = ConstantProductSimulator(liquidity=2000000.0, fee_rate=0.003, latency=0,
+                                    max_slippage=0.05, realtime=False)
+    # 10000 base / 1000000 quote reserves: taking 100 base costs 1000000 * 100 / 9900 before the fee
+    fill = pool.simulate("BUY", 100.0, {"last": 100.0})
+    quote_net = 1000000.0 * 100.0 / 9900.0
+    assert abs(fill["price"] - quote_net / 100.0) < 1e-9, f"pool price {fill['price']}"
+    assert abs(fill["fee"] - (quote_net / 0.997 - quote_net)) < 1e-9
+    assert "error" in pool.simulate("BUY", 1000.0, {"last": 100.0}), "10% impact swap did not revert"
+    print(f"   ✅ Linear book walk, partial fills, limits and x*y=k pricing\n")
+except Exception as e:
+    print(f"   ❌ {e}\n")
+    sys.exit(1)
+
+# Test 9: Multicall ABI encoding
+print("9. Multicall Encode/Decode")
+try:
+    from multicall import encode_aggregate, decode_aggregate, TRY_BLOCK_AND_AGGREGATE
+
+    token = "0x" + "11" * 20
+    balance_of = bytes.fromhex("70a08231") + bytes(12) + bytes.fromhex("22" * 20)
+    encoded = encode_aggregate([(token, balance_of), (token, b"\x18\x16\x0d\xdd")])
+    assert encoded[:4] == TRY_BLOCK_AND_AGGREGATE and (len(encoded) - 4) % 32 == 0
+    assert int.from_bytes(encoded[4:36], "big") == 0, "requireSuccess not false"
+    assert encoded.count(bytes.fromhex("11" * 20)) == 2 and balance_of in encoded
+
+    # Hand-built tryBlockAndAggregate return: block 19, hash, [(true, 42), (false, "")]
+    word = lambda value: value.to_bytes(32, "big")
+    results = [word(1) + word(64) + word(32) + word(42), word(0) + word(64) + word(0)]
+    response = (word(19) + bytes(32) + word(96) + word(2) + word(64) + word(64 + len(results[0]))
+                + b"".join(results))
+    block, decoded = decode_aggregate(response)
+    assert block == 19 and decoded == [(True, word(42)), (False, b"")], f"decoded {decoded}"
+    print(f"   ✅ Calls encode to ABI words, results decode with success flags\n")
+except Exception as e:
+    print(f"   ❌ {e}\n")
+    sys.exit(1)
+
+# Test 10: Route finder
+print("10. Route Finder")
+try:
+    from route_finder import PoolGraph
+
+    usdc, weth, wbtc, dai = ("0x" + c * 40 for c in "abcd")
+    graph = PoolGraph(max_hops=3, price_tolerance=0.001, notional=0)
+    graph.update_pool("0x01", weth, usdc, 0.0005, 2000.0, symbol0="WETH", symbol1="USDC")
+    graph.update_pool("0x02", wbtc, weth, 0.003, 20.0, symbol0="WBTC", symbol1="WETH")
+    graph.update_pool("0x03", wbtc, usdc, 0.01, 40000.0)
+    graph.update_pool("0x04", dai, usdc, 0.0001, 1.0, symbol0="DAI")
+
+    # WBTC -> WETH -> USDC pays 0.35% in fees against 1% direct
+    route = graph.best_route(wbtc, usdc)
+    assert route["pools"] == ["0x02", "0x01"] and route["hops"] == 2, f"route {route['pools']}"
+    assert abs(route["mid"] - 40000.0) < 1e-6
+    assert abs(graph.quote(wbtc, usdc, 1.0) - 40000.0 * 0.997 * 0.9995) < 1e-6
+    assert graph.route_symbols(graph.best_route(dai, wbtc)) == ["DAI", "USDC", "WETH", "WBTC"]
+    assert graph.best_route(wbtc, "0x" + "e" * 40) is None
+
+    # Cached until a material change; a small wiggle keeps the cache
+    hits = graph.cache_hits
+    graph.best_route(wbtc, usdc)
+    assert graph.cache_hits == hits + 1
+    assert not graph.update_pool("0x01", weth, usdc, 0.0005, 2000.5), "0.025% move invalidated the cache"
+    assert graph.update_pool("0x03", wbtc, usdc, 0.01, 41000.0), "2.5% move kept the cache"
+    assert graph.best_route(wbtc, usdc)["pools"] == ["0x03"], "route not recomputed after price move"
+    print(f"   ✅ Cheapest multi-hop path, cached until pools move\n")
+except Exception as e:
+    print(f"   ❌ {e}\n")
+    sys.exit(1)
+
+# Test 11: Coordinator symbol hashing
+print("11. Coordinator Hashing")
+try:
+    from coordinator import SwarmState, _weight
+
+    assert _weight("ETH_USDT", "node-a") == _weight("ETH_USDT", "node-a"), "weight not deterministic"
+    assert _weight("ETH_USDT", "node-a") != _weight("ETH_USDT", "node-b")
+
+    symbols = [f"SYM{i}_USDT" for i in range(40)]
+    swarm = SwarmState(symbols=symbols)
+    for node in ("node-a", "node-b", "node-c"):
+        swarm.register(node)
+    before = dict(swarm.assignment)
+    assert set(before) == set(symbols) and set(before.values()) == {"node-a", "node-b", "node-c"}
+    epoch = swarm.epoch
+    swarm.heartbeat("node-b")
+    assert swarm.assignment == before and swarm.epoch == epoch, "heartbeat moved symbols"
+
+    # Rendezvous hashing: dropping a node only moves the symbols it held
+    swarm.leave("node-c")
+    moved = [symbol for symbol in symbols if swarm.assignment[symbol] != before[symbol]]
+    assert moved and all(before[symbol] == "node-c" for symbol in moved), "surviving nodes lost symbols"
+    assert SwarmState(symbols=symbols).register("node-a")["symbols"] == sorted(symbols)
+    print(f"   ✅ Stable assignment, only a departed node's symbols move\n")
+except Exception as e:
+    print(f"   ❌ {e}\n")
+    sys.exit(1)
+
 print("="*60)
 print("✅ ALL TESTS PASSED!")
 print("="*60)
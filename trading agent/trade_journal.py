@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Durable trade journal - SQLite (WAL) with a batched background writer
+"""
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from config import TRADE_JOURNAL_PATH, TRADE_JOURNAL_BATCH, TRADE_JOURNAL_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    agent TEXT NOT NULL,
+    strategy TEXT,
+    symbol TEXT NOT NULL,
+    side TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    price REAL NOT NULL,
+    fee REAL NOT NULL DEFAULT 0,
+    pnl REAL,
+    reason TEXT,
+    position_id INTEGER  -- PositionBook uid: unique per position, unlike its reusable slot id
+);
+CREATE INDEX IF NOT EXISTS trades_symbol_ts ON trades (symbol, ts);
+CREATE INDEX IF NOT EXISTS trades_ts ON trades (ts);
+CREATE INDEX IF NOT EXISTS trades_strategy_ts ON trades (strategy, ts);
+
+CREATE TABLE IF NOT EXISTS daily_symbol_stats (
+    agent TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    day TEXT NOT NULL,
+    fills INTEGER NOT NULL DEFAULT 0,
+    closes INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    pnl REAL NOT NULL DEFAULT 0,
+    fees REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (agent, symbol, day)
+);
+
+CREATE TABLE IF NOT EXISTS daily_gmac (
+    agent TEXT NOT NULL,
+    day TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    spent REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (agent, day, phase)
+);
+"""
+
+_INSERT_TRADE = """
+INSERT INTO trades (ts, day, agent, strategy, symbol, side, quantity, price, fee, pnl, reason, position_id)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_UPSERT_STATS = """
+INSERT INTO daily_symbol_stats (agent, symbol, day, fills, closes, wins, losses, pnl, fees)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (agent, symbol, day) DO UPDATE SET
+    fills = fills + excluded.fills,
+    closes = closes + excluded.closes,
+    wins = wins + excluded.wins,
+    losses = losses + excluded.losses,
+    pnl = pnl + excluded.pnl,
+    fees = fees + excluded.fees
+"""
+
+_UPSERT_GMAC = """
+INSERT INTO daily_gmac (agent, day, phase, spent) VALUES (?, ?, ?, ?)
+ON CONFLICT (agent, day, phase) DO UPDATE SET spent = spent + excluded.spent
+"""
+
+
+class TradeJournal:
+    """Every fill and position close, plus GMAC spend, in one SQLite file
+
+    record_trade() and record_gmac() only enqueue; a writer thread drains
+    the queue every flush_interval seconds (or batch_size items) and writes
+    the batch in one transaction, folding it into the daily_symbol_stats and
+    daily_gmac aggregate tables at the same time, so dashboard queries read
+    a few aggregate rows instead of scanning the trades table. WAL mode lets
+    readers (the dashboard, possibly in another process) run alongside the
+    writer.
+    """
+
+    def __init__(self, path: str = TRADE_JOURNAL_PATH,
+                 batch_size: int = TRADE_JOURNAL_BATCH,
+                 flush_interval: float = TRADE_JOURNAL_FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._local = threading.local()
+        self.written = 0
+
+        connection = self._connect()
+        connection.executescript(_SCHEMA)
+        connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _ensure_writer(self):
+        if self._writer is None:
+            with self._start_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="trade-journal", daemon=True)
+                    self._writer.start()
+
+    # ------------------------------------------------------------------
+    # Writing (called from the heartbeat - enqueue only)
+    # ------------------------------------------------------------------
+
+    def record_trade(self, agent: str, symbol: str, side: str, quantity: float, price: float,
+                     fee: float = 0.0, pnl: Optional[float] = None, strategy: Optional[str] = None,
+                     reason: Optional[str] = None, position_id: Optional[int] = None,
+                     timestamp: Optional[float] = None):
+        """Journal one fill; pass pnl for fills that close (part of) a position"""
+        self._ensure_writer()
+        self._queue.put(("trade", (timestamp or time.time(), agent, strategy, symbol, side,
+                                   quantity, price, fee, pnl, reason, position_id)))
+
+    def record_fill(self, agent: str, symbol: str, side: str, quantity: float, price: float,
+                    fee: float = 0.0, closes: Optional[List[Dict]] = None,
+                    strategy: Optional[str] = None, reason: Optional[str] = None,
+                    opened: Optional[int] = None):
+        """Journal an order fill, one row per position fill it settled (with its P&L)
+
+        Rows carry the position's uid - `opened` for the fill that opened it,
+        each close's "uid" for fills that settled one.
+        """
+        if not closes:
+            self.record_trade(agent, symbol, side, quantity, price, fee, strategy=strategy, reason=reason,
+                              position_id=opened)
+            return
+        for close in closes:
+            share = close["quantity"] / quantity if quantity else 0.0
+            self.record_trade(agent, symbol, side, close["quantity"], price, fee * share,
+                              pnl=close["pnl"], strategy=strategy, reason=reason,
+                              position_id=close["uid"])
+
+    def record_gmac(self, agent: str, phase: str, amount: float, timestamp: Optional[float] = None):
+        self._ensure_writer()
+        self._queue.put(("gmac", (timestamp or time.time(), agent, phase, amount)))
+
+    def flush(self):
+        """Block until everything recorded so far is committed"""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def _write_loop(self):
+        connection = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                batch = [item]
+                deadline = time.monotonic() + self.flush_interval
+                while item is not None and len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+
+                stop = batch[-1] is None
+                records = [record for record in batch if record is not None]
+                try:
+                    if records:
+                        self._write_batch(connection, records)
+                except sqlite3.Error as e:
+                    logger.error("Trade journal write of %d record(s) failed: %s", len(records), e)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            connection.close()
+
+    def _write_batch(self, connection: sqlite3.Connection, records: List[tuple]):
+        trades = []
+        stats: Dict[tuple, List[float]] = {}
+        gmac: Dict[tuple, float] = {}
+        for kind, values in records:
+            day = datetime.fromtimestamp(values[0]).date().isoformat()
+            if kind == "trade":
+                ts, agent, strategy, symbol, side, quantity, price, fee, pnl, reason, position_id = values
+                trades.append((ts, day, agent, strategy, symbol, side, quantity, price, fee,
+                               pnl, reason, position_id))
+                row = stats.setdefault((agent, symbol, day), [0, 0, 0, 0, 0.0, 0.0])
+                row[0] += 1
+                row[5] += fee
+                if pnl is not None:
+                    row[1] += 1
+                    row[2] += pnl > 0
+                    row[3] += pnl < 0
+                    row[4] += pnl
+            else:
+                _, agent, phase, amount = values
+                gmac[(agent, day, phase)] = gmac.get((agent, day, phase), 0.0) + amount
+
+        with connection:
+            connection.executemany(_INSERT_TRADE, trades)
+            connection.executemany(_UPSERT_STATS, [key + tuple(row) for key, row in stats.items()])
+            connection.executemany(_UPSERT_GMAC, [key + (spent,) for key, spent in gmac.items()])
+        self.written += len(trades)
+
+    # ------------------------------------------------------------------
+    # Queries (any thread; one read connection per thread)
+    # ------------------------------------------------------------------
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+            connection.row_factory = sqlite3.Row
+        return connection
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict]:
+        return [dict(row) for row in self._reader().execute(sql, params)]
+
+    @staticmethod
+    def _agent_filter(agent: Optional[str], column: str = "agent") -> tuple:
+        if agent is None:
+            return "1 = 1", ()
+        return f"{column} = ?", (agent,)
+
+    def summary(self, agent: Optional[str] = None) -> Dict:
+        """Totals, win rate and GMAC spent, from the aggregate tables"""
+        where, params = self._agent_filter(agent)
+        totals = self._query(f"""
+            SELECT COALESCE(SUM(fills), 0) AS fills, COALESCE(SUM(closes), 0) AS closes,
+                   COALESCE(SUM(wins), 0) AS wins, COALESCE(SUM(losses), 0) AS losses,
+                   COALESCE(SUM(pnl), 0) AS pnl, COALESCE(SUM(fees), 0) AS fees
+            FROM daily_symbol_stats WHERE {where}""", params)[0]
+        gmac = self._query(f"SELECT phase, SUM(spent) AS spent FROM daily_gmac WHERE {where} GROUP BY phase",
+                           params)
+        decided = totals["wins"] + totals["losses"]
+        totals["win_rate"] = totals["wins"] / decided if decided else None
+        totals["gmac_spent"] = sum(row["spent"] for row in gmac)
+        totals["gmac_by_phase"] = {row["phase"]: row["spent"] for row in gmac}
+        return totals
+
+    def pnl_by_symbol(self, agent: Optional[str] = None, since_day: Optional[str] = None) -> List[Dict]:
+        where, params = self._agent_filter(agent)
+        if since_day is not None:
+            where, params = f"{where} AND day >= ?", params + (since_day,)
+        return self._query(f"""
+            SELECT symbol, SUM(fills) AS fills, SUM(closes) AS closes, SUM(wins) AS wins,
+                   SUM(losses) AS losses, SUM(pnl) AS pnl, SUM(fees) AS fees
+            FROM daily_symbol_stats WHERE {where} GROUP BY symbol ORDER BY pnl DESC""", params)
+
+    def pnl_by_day(self, agent: Optional[str] = None, symbol: Optional[str] = None,
+                   days: int = 30) -> List[Dict]:
+        where, params = self._agent_filter(agent)
+        if symbol is not None:
+            where, params = f"{where} AND symbol = ?", params + (symbol,)
+        gmac_where, gmac_params = self._agent_filter(agent, "g.agent")
+        rows = self._query(f"""
+            SELECT day, SUM(fills) AS fills, SUM(closes) AS closes, SUM(wins) AS wins,
+                   SUM(losses) AS losses, SUM(pnl) AS pnl, SUM(fees) AS fees
+            FROM daily_symbol_stats WHERE {where} GROUP BY day ORDER BY day DESC LIMIT ?""",
+                           params + (days,))
+        spent = {row["day"]: row["spent"] for row in self._query(f"""
+            SELECT g.day, SUM(g.spent) AS spent FROM daily_gmac g WHERE {gmac_where} GROUP BY g.day""",
+                                                                 gmac_params)}
+        for row in rows:
+            row["gmac_spent"] = spent.get(row["day"], 0.0)
+        return rows
+
+    def trades(self, symbol: Optional[str] = None, strategy: Optional[str] = None,
+               agent: Optional[str] = None, since: Optional[float] = None,
+               limit: int = 100) -> List[Dict]:
+        """Most recent trades first, filtered on indexed columns"""
+        clauses, params = [], []
+        for column, value in (("symbol", symbol), ("strategy", strategy), ("agent", agent)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        where = " AND ".join(clauses) or "1 = 1"
+        return self._query(f"SELECT * FROM trades WHERE {where} ORDER BY ts DESC LIMIT ?",
+                           tuple(params) + (limit,))
+
+
+_journals: Dict[str, TradeJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_trade_journal(path: str = TRADE_JOURNAL_PATH) -> TradeJournal:
+    """Get (or open) the process-wide journal for a database file"""
+    with _journals_lock:
+        journal = _journals.get(path)
+        if journal is None:
+            journal = _journals[path] = TradeJournal(path)
+        return journal
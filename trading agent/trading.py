@@ -5,15 +5,28 @@ Crypto.com API wrapper and trading execution
 import hashlib
 import hmac
 import time
+import threading
 import requests
 import json
 from typing import Dict, List, Optional
 import logging
+from ledger import Ledger
+from fill_simulator import FillSimulator, MarketSnapshot
+from order_book import OrderBook
+from candles import CandleAggregator, TIMEFRAME_MS
 from config import (
     CRYPTO_COM_API_KEY,
     CRYPTO_COM_SECRET_KEY,
     API_BASE_URL,
-    ENABLE_PAPER_TRADING
+    ENABLE_PAPER_TRADING,
+    ORDER_BOOK_DEPTH,
+    ORDER_BOOK_TOP_DEPTH,
+    ORDER_BOOK_RESYNC_INTERVAL,
+    CANDLE_BASE_TIMEFRAME,
+    CANDLE_TIMEFRAMES,
+    CANDLE_DEFAULT_TIMEFRAME,
+    CANDLE_WINDOW,
+    CANDLE_BASE_BACKFILL
 )
 
 logger = logging.getLogger(__name__)
@@ -27,37 +40,78 @@ class CryptoComTrader:
         self.secret_key = CRYPTO_COM_SECRET_KEY
         self.base_url = API_BASE_URL
         self.paper_trading = ENABLE_PAPER_TRADING
-        self.paper_balance = {"USDT": 1000.0, "BTC": 0.0, "ETH": 0.0, "CRO": 0.0}
+        self.paper_balance = Ledger({"USDT": 1000.0, "BTC": 0.0, "ETH": 0.0, "CRO": 0.0})
         self.paper_positions = []
+        self.fill_simulator = FillSimulator()
+        self.market_snapshot = MarketSnapshot()
+        self.order_books: Dict[str, OrderBook] = {}
+        self._book_synced_at: Dict[str, float] = {}
+        self.book_fetches = 0  # get-book requests (full or top), billed as GMAC by the agent
+        self.candle_aggregator = CandleAggregator()
+        self.api_calls = 0  # REST requests made, read by heartbeat instrumentation
+        self._thread_calls = threading.local()
+    
+    def _count_calls(self, calls: int = 1):
+        self.api_calls += calls
+        self._thread_calls.count = getattr(self._thread_calls, "count", 0) + calls
+    
+    @property
+    def thread_api_calls(self) -> int:
+        """Requests made by the calling thread - phases diff this, so a concurrent prefetch isn't charged to them"""
+        return getattr(self._thread_calls, "count", 0)
     
     def get_ticker(self, symbol: str) -> Optional[Dict]:
         """Get current ticker price"""
         try:
             url = f"{self.base_url}public/get-ticker"
             params = {"instrument_name": symbol}
+            self._count_calls()
             response = requests.get(url, params=params, timeout=10)
             data = response.json()
             
             if data.get("code") == 0 and data.get("result"):
-                result = data["result"]["data"][0]
-                return {
-                    "symbol": symbol,
-                    "last": float(result.get("a", 0)),
-                    "bid": float(result.get("b", 0)),
-                    "ask": float(result.get("a", 0)),
-                    "volume": float(result.get("v", 0)),
-                    "timestamp": result.get("t", 0)
-                }
+                return self._parse_ticker(symbol, data["result"]["data"][0])
             return None
         except Exception as e:
             logger.error(f"Failed to get ticker for {symbol}: {e}")
             return None
     
+    def get_all_tickers(self) -> List[Dict]:
+        """Every instrument's ticker in one request"""
+        try:
+            url = f"{self.base_url}public/get-ticker"
+            self._count_calls()
+            response = requests.get(url, timeout=10)
+            data = response.json()
+            
+            if data.get("code") == 0 and data.get("result"):
+                return [self._parse_ticker(result.get("i", ""), result) for result in data["result"]["data"]]
+            return []
+        except Exception as e:
+            logger.error(f"Failed to get tickers: {e}")
+            return []
+    
+    @staticmethod
+    def _parse_ticker(symbol: str, result: Dict) -> Dict:
+        last = float(result.get("a") or 0)
+        volume = float(result.get("v") or 0)
+        return {
+            "symbol": symbol,
+            "last": last,
+            "bid": float(result.get("b") or 0),
+            "ask": float(result.get("k") or 0),
+            "volume": volume,
+            "volume_value": float(result.get("vv") or volume * last),
+            "change": float(result.get("c") or 0),
+            "timestamp": result.get("t", 0)
+        }
+    
     def get_candlesticks(self, symbol: str, timeframe: str = "1m", count: int = 100) -> List[Dict]:
         """Get historical candlestick data"""
         try:
             url = f"{self.base_url}public/get-candlestick"
-            params = {"instrument_name": symbol, "timeframe": timeframe}
+            params = {"instrument_name": symbol, "timeframe": timeframe, "count": count}
+            self._count_calls()
             response = requests.get(url, params=params, timeout=10)
             data = response.json()
             
@@ -76,10 +130,74 @@ class CryptoComTrader:
             logger.error(f"Failed to get candlesticks for {symbol}: {e}")
             return []
     
+    def update_candles(self, symbol: str) -> Dict[str, List[Dict]]:
+        """Fetch only the base candles missing since the last call and aggregate them"""
+        last_ts = self.candle_aggregator.last_timestamp(symbol)
+        count = CANDLE_BASE_BACKFILL
+        if last_ts is not None:
+            missing = (int(time.time() * 1000) - last_ts) // TIMEFRAME_MS[CANDLE_BASE_TIMEFRAME]
+            if missing + 2 > CANDLE_BASE_BACKFILL:
+                # Too long a gap to stitch (e.g. a stale warm-start file) - start over
+                self.candle_aggregator.reset(symbol)
+                self._seed_candles(symbol)
+            else:
+                count = int(missing + 2)
+        else:
+            self._seed_candles(symbol)
+        self.candle_aggregator.ingest(symbol, self.get_candlesticks(symbol, CANDLE_BASE_TIMEFRAME, count))
+        return {tf: candles[-CANDLE_WINDOW:]
+                for tf, candles in self.candle_aggregator.get_timeframes(symbol).items()}
+    
+    def _seed_candles(self, symbol: str):
+        """Native exchange candles for the timeframes the base backfill can't fill to CANDLE_WINDOW"""
+        covered = CANDLE_BASE_BACKFILL * TIMEFRAME_MS[CANDLE_BASE_TIMEFRAME]
+        for timeframe in CANDLE_TIMEFRAMES:
+            if covered // TIMEFRAME_MS[timeframe] < CANDLE_WINDOW:
+                self.candle_aggregator.seed(symbol, timeframe,
+                                            self.get_candlesticks(symbol, timeframe, CANDLE_WINDOW + 1))
+    
+    def get_order_book(self, symbol: str) -> Optional[OrderBook]:
+        """Local order book, kept current from polled snapshots
+        
+        The first call (and one every ORDER_BOOK_RESYNC_INTERVAL) downloads a
+        full ORDER_BOOK_DEPTH snapshot; in between only the top
+        ORDER_BOOK_TOP_DEPTH levels are fetched and diffed into it.
+        """
+        book = self.order_books.get(symbol)
+        resync = book is None or time.monotonic() - self._book_synced_at.get(symbol, 0) > ORDER_BOOK_RESYNC_INTERVAL
+        data = self._fetch_book(symbol, ORDER_BOOK_DEPTH if resync else ORDER_BOOK_TOP_DEPTH)
+        if data is None:
+            return book
+        
+        if book is None:
+            book = self.order_books[symbol] = OrderBook(symbol)
+        if resync:
+            book.apply_snapshot(data.get("bids", []), data.get("asks", []), data.get("t", 0))
+            self._book_synced_at[symbol] = time.monotonic()
+        else:
+            book.apply_top(data.get("bids", []), data.get("asks", []), data.get("t", 0))
+        return book
+    
+    def _fetch_book(self, symbol: str, depth: int) -> Optional[Dict]:
+        try:
+            url = f"{self.base_url}public/get-book"
+            params = {"instrument_name": symbol, "depth": depth}
+            self._count_calls()
+            self.book_fetches += 1
+            response = requests.get(url, params=params, timeout=10)
+            data = response.json()
+            
+            if data.get("code") == 0 and data.get("result"):
+                return data["result"]["data"][0]
+            return None
+        except Exception as e:
+            logger.error(f"Failed to get order book for {symbol}: {e}")
+            return None
+    
     def get_balance(self) -> Dict[str, float]:
         """Get account balance"""
         if self.paper_trading:
-            return self.paper_balance.copy()
+            return self.paper_balance.balances()
         return {}
     
     def place_order(self, symbol: str, side: str, order_type: str, 
@@ -89,62 +207,87 @@ class CryptoComTrader:
             return self._place_paper_order(symbol, side, order_type, quantity, price)
         return {"success": False, "error": "Live trading not implemented"}
     
+    def set_market_snapshot(self, market_data: Dict):
+        """Remember the latest market data so paper orders need no extra request"""
+        self.market_snapshot.update(market_data)
+    
     def _place_paper_order(self, symbol: str, side: str, order_type: str,
                           quantity: float, price: float = None) -> Dict:
         """Simulate order execution for paper trading"""
-        ticker = self.get_ticker(symbol)
+        data = self.market_snapshot.get(symbol)
+        ticker = data["ticker"] if data else self.get_ticker(symbol)
         if not ticker:
             return {"success": False, "error": "Failed to get ticker price"}
         
-        exec_price = price if price and order_type == "LIMIT" else ticker["last"]
-        base_currency = symbol.split("_")[0]
-        quote_currency = symbol.split("_")[1]
+        fill = self.fill_simulator.simulate(side, quantity, ticker,
+                                            candles=data.get("candles") if data else None,
+                                            book=self.order_books.get(symbol),
+                                            limit_price=price if order_type == "LIMIT" else None)
+        if not fill["filled"]:
+            return {"success": False, "error": fill.get("error", "Order not filled")}
+        
+        filled = fill["filled"]
+        exec_price = fill["price"]
+        fee = fill["fee"]
         
         try:
-            if side == "BUY":
-                cost = quantity * exec_price
-                if self.paper_balance.get(quote_currency, 0) < cost:
-                    return {"success": False, "error": "Insufficient balance"}
-                
-                self.paper_balance[quote_currency] -= cost
-                self.paper_balance[base_currency] = self.paper_balance.get(base_currency, 0) + quantity
-            
-            elif side == "SELL":
-                if self.paper_balance.get(base_currency, 0) < quantity:
-                    return {"success": False, "error": "Insufficient balance"}
-                
-                self.paper_balance[base_currency] -= quantity
-                revenue = quantity * exec_price
-                self.paper_balance[quote_currency] = self.paper_balance.get(quote_currency, 0) + revenue
+            error = self.apply_paper_fill(symbol, side, filled, exec_price, fee)
+            if error:
+                return {"success": False, "error": error}
             
             order_id = f"PAPER_{int(time.time() * 1000)}"
-            logger.info(f"Paper trade: {side} {quantity:.6f} {symbol} @ ${exec_price:.2f}")
+            logger.info("Paper trade: %s %.6f %s @ $%.2f (fee $%.4f%s)", side, filled, symbol, exec_price,
+                        fee, ", partial" if fill["partial"] else "")
             
             return {
                 "success": True,
                 "order_id": order_id,
                 "symbol": symbol,
                 "side": side,
-                "quantity": quantity,
+                "quantity": filled,
+                "requested_quantity": quantity,
                 "price": exec_price,
+                "fee": fee,
+                "partial": fill["partial"],
                 "paper_trade": True
             }
         except Exception as e:
             logger.error(f"Paper trade failed: {e}")
             return {"success": False, "error": str(e)}
     
+    def apply_paper_fill(self, symbol: str, side: str, quantity: float,
+                         price: float, fee: float = 0.0) -> Optional[str]:
+        """Move paper balances for a fill; returns an error message if unfunded"""
+        base_currency, quote_currency = symbol.split("_")
+        return self.paper_balance.apply_fill(base_currency, quote_currency, side, quantity, price, fee)
+    
+    def get_state(self) -> Dict:
+        """Paper account state for checkpointing"""
+        return {"ledger": self.paper_balance.get_state()}
+    
+    def set_state(self, state: Dict):
+        if "ledger" in state:
+            self.paper_balance.set_state(state["ledger"])
+        else:  # checkpoint from before the integer ledger
+            self.paper_balance = Ledger(state["paper_balance"])
+    
     def get_market_data(self, symbols: List[str]) -> Dict:
         """Get comprehensive market data for multiple symbols"""
         market_data = {}
         
         for symbol in symbols:
             ticker = self.get_ticker(symbol)
-            candles = self.get_candlesticks(symbol, "5m", 50)
+            timeframes = self.update_candles(symbol)
+            candles = timeframes.get(CANDLE_DEFAULT_TIMEFRAME)
+            book = self.get_order_book(symbol)
             
             if ticker and candles:
                 market_data[symbol] = {
                     "ticker": ticker,
-                    "candles": candles
+                    "candles": candles,
+                    "timeframes": timeframes,
+                    "book": book
                 }
         
+        self.set_market_snapshot(market_data)
         return market_data
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+Pipelined transaction submission - local nonces, async confirmations, fee bumps
+"""
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+from config import (
+    TX_CONFIRMATIONS,
+    TX_POLL_INTERVAL,
+    TX_STUCK_SECONDS,
+    TX_FEE_BUMP,
+    TX_MAX_REPLACEMENTS,
+    UNISWAP_ROUTER_ADDRESS,
+    GAS_SWAP_UNITS
+)
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+CONFIRMED = "confirmed"
+FAILED = "failed"
+DROPPED = "dropped"
+
+MAX_UINT256 = 2 ** 256 - 1
+
+ERC20_ABI = [
+    {"constant": True, "inputs": [{"name": "owner", "type": "address"}, {"name": "spender", "type": "address"}],
+     "name": "allowance", "outputs": [{"name": "", "type": "uint256"}], "type": "function"},
+    {"constant": False, "inputs": [{"name": "spender", "type": "address"}, {"name": "amount", "type": "uint256"}],
+     "name": "approve", "outputs": [{"name": "", "type": "bool"}], "type": "function"}
+]
+
+# SwapRouter02.exactInputSingle((tokenIn, tokenOut, fee, recipient, amountIn, amountOutMinimum, sqrtPriceLimitX96))
+ROUTER_ABI = [
+    {"inputs": [{"components": [
+        {"name": "tokenIn", "type": "address"},
+        {"name": "tokenOut", "type": "address"},
+        {"name": "fee", "type": "uint24"},
+        {"name": "recipient", "type": "address"},
+        {"name": "amountIn", "type": "uint256"},
+        {"name": "amountOutMinimum", "type": "uint256"},
+        {"name": "sqrtPriceLimitX96", "type": "uint160"}],
+        "name": "params", "type": "tuple"}],
+     "name": "exactInputSingle", "outputs": [{"name": "amountOut", "type": "uint256"}],
+     "stateMutability": "payable", "type": "function"}
+]
+
+
+def _raw(signed) -> bytes:
+    # web3/eth-account renamed rawTransaction -> raw_transaction
+    return getattr(signed, "raw_transaction", None) or signed.rawTransaction
+
+
+class TxPipeline:
+    """Signs and sends transactions without waiting on each receipt
+
+    The pipeline owns the account's nonce: it is read once from the node
+    (pending count) and then assigned locally, so several transactions can
+    be in flight at once and the next one is signed while earlier ones
+    are still unmined. A tracker thread polls receipts for every in-flight
+    nonce, reports the outcome once `confirmations` blocks have passed, and
+    replaces a transaction that has sat unmined for `stuck_after` seconds
+    with the same nonce and fees multiplied by `fee_bump` (nodes require
+    at least +10% to accept a replacement). Every hash sent for a nonce is
+    watched, since any of them may be the one that gets mined.
+
+    fees() returns (max_fee_per_gas, max_priority_fee_per_gas) in wei; by
+    default it is derived from the latest block's base fee. Works against
+    any Web3 provider - mainnet, anvil (Web3.HTTPProvider at
+    127.0.0.1:8545) or Web3(Web3.EthereumTesterProvider()) in tests.
+    """
+
+    def __init__(self, w3: Web3, account,
+                 fees: Optional[Callable[[], Tuple[int, int]]] = None,
+                 confirmations: int = TX_CONFIRMATIONS,
+                 poll_interval: float = TX_POLL_INTERVAL,
+                 stuck_after: float = TX_STUCK_SECONDS,
+                 fee_bump: float = TX_FEE_BUMP,
+                 max_replacements: int = TX_MAX_REPLACEMENTS):
+        self.w3 = w3
+        self.account = account
+        self.address = account.address
+        self.chain_id = w3.eth.chain_id
+        self.fees = fees or self._default_fees
+        self.confirmations = confirmations
+        self.poll_interval = poll_interval
+        self.stuck_after = stuck_after
+        self.fee_bump = fee_bump
+        self.max_replacements = max_replacements
+
+        self._nonce = w3.eth.get_transaction_count(self.address, "pending")
+        self._pending: Dict[int, Dict] = {}  # nonce -> record
+        self._allowances: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._tracker: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[Dict], None]] = []
+
+    def _default_fees(self) -> Tuple[int, int]:
+        base_fee = self.w3.eth.get_block("latest").get("baseFeePerGas", 0)
+        priority = self.w3.to_wei(1, "gwei")
+        return 2 * base_fee + priority, priority
+
+    def subscribe(self, listener: Callable[[Dict], None]):
+        """Call listener(record) when a transaction confirms, fails or is dropped"""
+        self._listeners.append(listener)
+
+    # ------------------------------------------------------------------
+    # Submission
+    # ------------------------------------------------------------------
+
+    def submit(self, tx: Dict, label: str = "") -> Dict:
+        """Assign a nonce, sign, send and return immediately with the tracking record"""
+        with self._lock:
+            max_fee, priority = self.fees()
+            tx = dict(tx, nonce=self._nonce, chainId=self.chain_id,
+                      maxFeePerGas=max_fee, maxPriorityFeePerGas=priority)
+            tx.setdefault("from", self.address)
+            tx.setdefault("value", 0)
+            if "gas" not in tx:
+                tx["gas"] = self.w3.eth.estimate_gas(tx)
+            try:
+                tx_hash = self.w3.eth.send_raw_transaction(_raw(self.account.sign_transaction(tx)))
+            except Exception as e:
+                if "nonce" in str(e).lower():
+                    self.resync_nonce()
+                raise
+            record = {
+                "nonce": self._nonce,
+                "label": label,
+                "tx": tx,
+                "hashes": [tx_hash],
+                "status": PENDING,
+                "sent_at": time.monotonic(),
+                "replacements": 0,
+                "receipt": None,
+                "mined_block": None
+            }
+            self._pending[self._nonce] = record
+            self._nonce += 1
+        logger.info("Sent %s nonce %d: %s", label or "tx", record["nonce"], tx_hash.hex())
+        self._ensure_tracker()
+        return record
+
+    def resync_nonce(self):
+        """Re-read the nonce from the node (after an external transaction or a rejected send)"""
+        with self._lock:
+            self._nonce = max(self.w3.eth.get_transaction_count(self.address, "pending"),
+                              max(self._pending, default=-1) + 1)
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    # ------------------------------------------------------------------
+    # Tracking
+    # ------------------------------------------------------------------
+
+    def _ensure_tracker(self):
+        with self._lock:
+            if self._tracker is None:
+                self._stop.clear()
+                self._tracker = threading.Thread(target=self._track, name="tx-tracker", daemon=True)
+                self._tracker.start()
+
+    def _track(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error("Transaction tracking failed: %s", e)
+            with self._lock:
+                if not self._pending:
+                    self._tracker = None  # restarted by the next submit
+                    return
+
+    def poll(self):
+        """One tracking pass: pick up receipts, finalize confirmed ones, bump stuck ones
+
+        Receipts are fetched outside the lock; records are only changed under it.
+        """
+        head = self.w3.eth.block_number
+        finished = []
+        with self._lock:
+            records = list(self._pending.values())
+        for record in records:
+            receipt = None
+            if record["receipt"] is None:
+                with self._lock:
+                    hashes = list(record["hashes"])
+                receipt = self._find_receipt(hashes)
+            with self._lock:
+                if receipt is not None:
+                    record["receipt"] = receipt
+                    record["mined_block"] = receipt["blockNumber"]
+                if record["receipt"] is not None:
+                    if head - record["mined_block"] + 1 >= self.confirmations:
+                        record["status"] = CONFIRMED if record["receipt"]["status"] == 1 else FAILED
+                        finished.append(record)
+                elif time.monotonic() - record["sent_at"] > self.stuck_after:
+                    if record["replacements"] >= self.max_replacements or not self._replace(record):
+                        record["status"] = DROPPED
+                        finished.append(record)
+
+        with self._lock:
+            for record in finished:
+                self._pending.pop(record["nonce"], None)
+                if "allowance_key" in record and record["status"] != CONFIRMED:
+                    self._allowances.pop(record["allowance_key"], None)
+        for record in finished:
+            logger.info("%s nonce %d %s", record["label"] or "tx", record["nonce"], record["status"])
+            for listener in self._listeners:
+                listener(record)
+
+    def _find_receipt(self, hashes: List[bytes]) -> Optional[Dict]:
+        """Receipt of whichever of a nonce's hashes was mined, if any"""
+        for tx_hash in hashes:
+            try:
+                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+            if receipt is not None:
+                return receipt
+        return None
+
+    def _replace(self, record: Dict) -> bool:
+        """Resend the same nonce with bumped fees (called under the lock)
+
+        Returns False when the nonce turns out to be used by a transaction
+        the pipeline never sent - the record can no longer be mined.
+        """
+        tx = dict(record["tx"])
+        max_fee, priority = self.fees()
+        tx["maxFeePerGas"] = max(max_fee, int(tx["maxFeePerGas"] * self.fee_bump))
+        tx["maxPriorityFeePerGas"] = max(priority, int(tx["maxPriorityFeePerGas"] * self.fee_bump))
+        try:
+            tx_hash = self.w3.eth.send_raw_transaction(_raw(self.account.sign_transaction(tx)))
+        except Exception as e:
+            record["replacements"] += 1  # a failed resend uses up an attempt too
+            record["sent_at"] = time.monotonic()
+            if "nonce too low" not in str(e).lower():
+                logger.warning("Replacing nonce %d failed: %s", record["nonce"], e)
+                return True
+            # The nonce is taken: one of our hashes was mined since the last poll...
+            receipt = self._find_receipt(record["hashes"])
+            if receipt is not None:
+                record["receipt"] = receipt
+                record["mined_block"] = receipt["blockNumber"]
+                return True
+            # ...or a transaction sent from outside the pipeline used it
+            logger.warning("Nonce %d used by another transaction - dropping %s",
+                           record["nonce"], record["label"] or "tx")
+            self.resync_nonce()
+            return False
+        record["tx"] = tx
+        record["hashes"].append(tx_hash)
+        record["replacements"] += 1
+        record["sent_at"] = time.monotonic()
+        logger.warning("Nonce %d stuck - replaced with max fee %d wei: %s",
+                       record["nonce"], tx["maxFeePerGas"], tx_hash.hex())
+        return True
+
+    def wait(self, record: Dict, timeout: float = 300) -> str:
+        """Block until a record is final (for scripts; the pipeline itself never waits)"""
+        deadline = time.monotonic() + timeout
+        while record["status"] == PENDING and time.monotonic() < deadline:
+            self._ensure_tracker()
+            time.sleep(self.poll_interval)
+        return record["status"]
+
+    def stop(self):
+        self._stop.set()
+        tracker = self._tracker
+        if tracker is not None:
+            tracker.join()
+        self._tracker = None
+
+    # ------------------------------------------------------------------
+    # ERC-20 allowances and Uniswap swaps
+    # ------------------------------------------------------------------
+
+    def ensure_allowance(self, token: str, spender: str, amount: int) -> Optional[Dict]:
+        """Approve `spender` for `token` unless the cached allowance already covers amount
+
+        The allowance is read from the chain once per (token, spender) and
+        then tracked locally; an approval sets it to the maximum right away,
+        so a swap can be pipelined behind its approval (next nonce). A
+        failed approval drops the cache entry.
+        """
+        token, spender = Web3.to_checksum_address(token), Web3.to_checksum_address(spender)
+        key = (token, spender)
+        with self._lock:
+            allowance = self._allowances.get(key)
+            if allowance is None:
+                contract = self.w3.eth.contract(address=token, abi=ERC20_ABI)
+                allowance = self._allowances[key] = contract.functions.allowance(self.address, spender).call()
+            if allowance >= amount:
+                return None
+            contract = self.w3.eth.contract(address=token, abi=ERC20_ABI)
+            tx = contract.functions.approve(spender, MAX_UINT256).build_transaction(
+                {"from": self.address, "nonce": self._nonce, "gas": 60000,
+                 "maxFeePerGas": 0, "maxPriorityFeePerGas": 0})
+            record = self.submit(tx, label=f"approve {token[:10]}")
+            record["allowance_key"] = key
+            self._allowances[key] = MAX_UINT256
+            return record
+
+    def spend_allowance(self, token: str, spender: str, amount: int):
+        key = (Web3.to_checksum_address(token), Web3.to_checksum_address(spender))
+        with self._lock:
+            if key in self._allowances and self._allowances[key] != MAX_UINT256:
+                self._allowances[key] = max(0, self._allowances[key] - amount)
+
+    def swap_exact_input(self, token_in: str, token_out: str, fee_tier: int, amount_in: int,
+                         min_amount_out: int, router: str = UNISWAP_ROUTER_ADDRESS,
+                         gas: int = GAS_SWAP_UNITS) -> List[Dict]:
+        """Approve if needed, then swap through the Uniswap router - both sent without waiting
+
+        fee_tier is in hundredths of a bip (500 = 0.05%); amounts are base units.
+        gas is the swap's gas limit - price the trade with the same figure.
+        """
+        records = []
+        approval = self.ensure_allowance(token_in, router, amount_in)
+        if approval is not None:
+            records.append(approval)
+        contract = self.w3.eth.contract(address=Web3.to_checksum_address(router), abi=ROUTER_ABI)
+        tx = contract.functions.exactInputSingle((
+            Web3.to_checksum_address(token_in), Web3.to_checksum_address(token_out), fee_tier,
+            self.address, amount_in, min_amount_out, 0
+        )).build_transaction({"from": self.address, "nonce": 0, "gas": gas,
+                              "maxFeePerGas": 0, "maxPriorityFeePerGas": 0})
+        records.append(self.submit(tx, label=f"swap {amount_in}"))
+        self.spend_allowance(token_in, router, amount_in)
+        return records
@@ -6,12 +6,54 @@ Uses Uniswap's public APIs and on-chain data
 import requests
 import json
 import time
+import threading
 from typing import Dict, List, Optional
 import logging
-from config import ENABLE_PAPER_TRADING
+from ledger import Ledger
+from fill_simulator import ConstantProductSimulator, MarketSnapshot
+from candles import CandleAggregator
+from route_finder import PoolGraph
+from pool_reader import PoolReader
+from config import (
+    ENABLE_PAPER_TRADING,
+    CANDLE_WINDOW,
+    ROUTE_POOL_COUNT,
+    ROUTE_POOL_REFRESH,
+    UNISWAP_ONCHAIN_PRICES
+)
 
 logger = logging.getLogger(__name__)
 
+# Tracked tokens on Ethereum mainnet (pools among others are discovered)
+TOKENS = {
+    "WETH": {"address": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2", "decimals": 18},
+    "USDC": {"address": "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48", "decimals": 6},
+    "USDT": {"address": "0xdAC17F958D2ee523a2206206994597C13D831ec7", "decimals": 6},
+    "DAI": {"address": "0x6B175474E89094C44Da98b954EedeAC495271d0F", "decimals": 18}
+}
+
+# Pools read on-chain every block: address -> (token0, token1, fee)
+POOLS = {
+    "0x88e6A0c2dDD26FEEb64F039a2c41296FcB3f5640": ("USDC", "WETH", 0.0005),
+    "0x4e68Ccd3E89f51C3074ca5072bbAC773960dFa36": ("WETH", "USDT", 0.003),
+    "0x3416cF6C708Da44DB2624D63ea0AAef7113527C6": ("USDC", "USDT", 0.0001),
+    "0x5777d92f208679DB4b9778590Fa3CAB3aC9e2168": ("DAI", "USDC", 0.0001)
+}
+
+_POOLS_QUERY = """
+{
+  pools(first: %d, orderBy: totalValueLockedUSD, orderDirection: desc,
+        where: {totalValueLockedUSD_gt: "100000"}) {
+    id
+    feeTier
+    token0 { id symbol }
+    token1 { id symbol }
+    token1Price
+    totalValueLockedUSD
+  }
+}
+"""
+
 
 class UniswapTrader:
     """Wrapper for Uniswap API and DEX trading"""
@@ -23,18 +65,44 @@ class UniswapTrader:
         
         # Paper trading setup
         self.paper_trading = ENABLE_PAPER_TRADING
-        self.paper_balance = {
+        self.paper_balance = Ledger({
             "USDT": 1000.0,
             "WETH": 0.0,
             "USDC": 0.0,
             "DAI": 0.0
-        }
+        })
         self.paper_positions = []
+        self.fill_simulator = ConstantProductSimulator()
+        self.market_snapshot = MarketSnapshot()
+        self.candle_aggregator = CandleAggregator()  # built from observed prices
+        self.api_calls = 0  # subgraph requests made, read by heartbeat instrumentation
+        self._thread_calls = threading.local()
+        
+        # Pool graph for multi-hop quotes, refreshed from the subgraph in one query
+        self.pool_graph = PoolGraph()
+        self.token_addresses = {symbol: token["address"].lower() for symbol, token in TOKENS.items()}
+        self._pools_refreshed_at: Optional[float] = None
+        
+        # Chain-head prices: slot0 of every tracked pool in one Multicall per block
+        self.pool_reader = PoolReader({
+            address: {"token0": token0, "token1": token1, "fee": fee,
+                      "decimals0": TOKENS[token0]["decimals"], "decimals1": TOKENS[token1]["decimals"]}
+            for address, (token0, token1, fee) in POOLS.items()
+        }) if UNISWAP_ONCHAIN_PRICES else None
         
         logger.info(f"Uniswap Trader initialized (Paper: {self.paper_trading})")
     
+    def _count_calls(self, calls: int = 1):
+        self.api_calls += calls
+        self._thread_calls.count = getattr(self._thread_calls, "count", 0) + calls
+    
+    @property
+    def thread_api_calls(self) -> int:
+        """Requests made by the calling thread (see CryptoComTrader.thread_api_calls)"""
+        return getattr(self._thread_calls, "count", 0)
+    
     def get_token_price(self, token_address: str) -> Optional[float]:
-        """Get current token price from Uniswap"""
+        """Get current token price in USD from the Uniswap subgraph"""
         try:
             # Query Uniswap v3 subgraph
             query = """
@@ -50,6 +118,7 @@ class UniswapTrader:
             }
             """ % token_address.lower()
             
+            self._count_calls()
             response = requests.post(
                 self.api_base,
                 json={'query': query},
@@ -70,43 +139,128 @@ class UniswapTrader:
             logger.error(f"Failed to get price for {token_address}: {e}")
             return None
     
+    def refresh_pools(self, force: bool = False) -> int:
+        """Load the top pools by TVL into the pool graph; returns how many changed materially"""
+        if not force and self._pools_refreshed_at is not None \
+                and time.monotonic() - self._pools_refreshed_at < ROUTE_POOL_REFRESH:
+            return 0
+        self._pools_refreshed_at = time.monotonic()
+        try:
+            self._count_calls()
+            response = requests.post(self.api_base, json={'query': _POOLS_QUERY % ROUTE_POOL_COUNT}, timeout=10)
+            pools = (response.json().get("data") or {}).get("pools") or []
+        except Exception as e:
+            logger.error(f"Failed to load pools: {e}")
+            return 0
+        
+        changed = 0
+        for pool in pools:
+            token0, token1 = pool["token0"], pool["token1"]
+            for token in (token0, token1):
+                self.token_addresses.setdefault(token["symbol"], token["id"].lower())
+            changed += self.pool_graph.update_pool(
+                pool["id"], token0["id"], token1["id"], int(pool["feeTier"]) / 1e6,
+                float(pool["token1Price"]), float(pool["totalValueLockedUSD"]),
+                token0["symbol"], token1["symbol"])
+        if changed:
+            logger.info("Pool graph: %d pools, %d changed (version %d)",
+                        len(self.pool_graph), changed, self.pool_graph.version)
+        return changed
+    
+    def refresh_onchain(self) -> int:
+        """Feed the latest block's pool prices into the graph; returns pools changed materially"""
+        if self.pool_reader is None:
+            return 0
+        requests_before = self.pool_reader.multicall.requests
+        states = self.pool_reader.read()
+        self._count_calls(self.pool_reader.multicall.requests - requests_before)
+        changed = 0
+        for address, state in states.items():
+            pool = self.pool_reader.pools[address]
+            changed += self.pool_graph.update_pool(
+                address, self.token_addresses[pool["token0"]], self.token_addresses[pool["token1"]],
+                pool["fee"], state["price"], symbol0=pool["token0"], symbol1=pool["token1"])
+        return changed
+    
+    def get_route(self, token_in: str, token_out: str) -> Optional[Dict]:
+        """Best multi-hop route between two token symbols (local, cached)"""
+        address_in = self.token_addresses.get(token_in)
+        address_out = self.token_addresses.get(token_out)
+        if address_in is None or address_out is None:
+            return None
+        return self.pool_graph.best_route(address_in, address_out)
+    
+    def pool_depth(self, symbol: str) -> Optional[Dict]:
+        """In-range liquidity (quote value, both sides) and fee of the deepest tracked pool for a pair"""
+        if self.pool_reader is None:
+            return None
+        base, quote = symbol.split("_")
+        best = None
+        for address, pool in self.pool_reader.pools.items():
+            if {pool["token0"], pool["token1"]} != {base, quote}:
+                continue
+            reserves = self.pool_reader.virtual_reserves(address)
+            if reserves is None:
+                continue
+            liquidity = 2 * (reserves[0] if pool["token0"] == quote else reserves[1])
+            if best is None or liquidity > best["liquidity"]:
+                best = {"address": address, "liquidity": liquidity, "fee": pool["fee"]}
+        return best
+    
+    def pool_quote(self, token_in: str, token_out: str, fee: float, amount_in: float) -> Optional[float]:
+        """Output of swapping amount_in through the tracked pool for this pair and fee tier
+        
+        This is the pool an exactInputSingle swap executes in (get_route may
+        pick a multi-hop path instead): constant-product output on the pool's
+        in-range virtual reserves after its fee. None when the pool isn't
+        tracked or has no on-chain state.
+        """
+        if self.pool_reader is None:
+            return None
+        for address, pool in self.pool_reader.pools.items():
+            if {pool["token0"], pool["token1"]} != {token_in, token_out} or pool["fee"] != fee:
+                continue
+            self.refresh_onchain()
+            reserves = self.pool_reader.virtual_reserves(address)
+            if reserves is None:
+                return None
+            reserve_in, reserve_out = reserves if pool["token0"] == token_in else reserves[::-1]
+            amount = amount_in * (1 - fee)
+            return reserve_out * amount / (reserve_in + amount)
+        return None
+    
     def get_ticker(self, symbol: str) -> Optional[Dict]:
-        """Get ticker data for a trading pair"""
-        # Common token addresses on Ethereum mainnet
-        tokens = {
-            "WETH_USDT": {
-                "base": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",  # WETH
-                "quote": "0xdAC17F958D2ee523a2206206994597C13D831ec7"  # USDT
-            },
-            "WETH_USDC": {
-                "base": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",  # WETH
-                "quote": "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"  # USDC
-            },
-            "USDC_USDT": {
-                "base": "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48",  # USDC
-                "quote": "0xdAC17F958D2ee523a2206206994597C13D831ec7"  # USDT
-            }
-        }
+        """Get ticker data for a trading pair
         
-        if symbol not in tokens:
+        Priced off the pool graph: bid is what selling one base token yields
+        along the best route, ask what buying one costs. The graph is
+        refreshed here rather than relying on get_market_data having run
+        (pool list every ROUTE_POOL_REFRESH, slot0 prices once per block).
+        None when no route connects the pair - there is no real bid/ask to
+        report.
+        """
+        base, quote = symbol.split("_")
+        if base not in self.token_addresses or quote not in self.token_addresses:
             logger.warning(f"Unknown symbol: {symbol}")
             return None
         
         try:
-            pair = tokens[symbol]
-            base_price = self.get_token_price(pair["base"])
-            
-            if base_price:
-                return {
-                    "symbol": symbol,
-                    "last": base_price,
-                    "bid": base_price * 0.999,
-                    "ask": base_price * 1.001,
-                    "volume": 1000000,  # Simulated
-                    "timestamp": int(time.time() * 1000)
-                }
-            
-            return None
+            self.refresh_pools()
+            self.refresh_onchain()
+            sell = self.get_route(base, quote)
+            buy = self.get_route(quote, base)
+            if not (sell and buy):
+                logger.warning(f"No pool route for {symbol}")
+                return None
+            return {
+                "symbol": symbol,
+                "last": sell["mid"],
+                "bid": sell["rate"],
+                "ask": 1 / buy["rate"],
+                "route": self.pool_graph.route_symbols(sell),
+                "volume": 1000000,  # Simulated
+                "timestamp": int(time.time() * 1000)
+            }
         except Exception as e:
             logger.error(f"Failed to get ticker for {symbol}: {e}")
             return None
@@ -144,7 +298,7 @@ class UniswapTrader:
     def get_balance(self) -> Dict[str, float]:
         """Get account balance"""
         if self.paper_trading:
-            return self.paper_balance.copy()
+            return self.paper_balance.balances()
         return {}
     
     def place_order(self, symbol: str, side: str, order_type: str,
@@ -154,44 +308,49 @@ class UniswapTrader:
             return self._place_paper_order(symbol, side, order_type, quantity, price)
         return {"success": False, "error": "Live trading not implemented"}
     
+    def set_market_snapshot(self, market_data: Dict):
+        """Remember the latest market data so paper orders need no extra request"""
+        self.market_snapshot.update(market_data)
+    
     def _place_paper_order(self, symbol: str, side: str, order_type: str,
                           quantity: float, price: float = None) -> Dict:
         """Simulate order execution for paper trading"""
-        ticker = self.get_ticker(symbol)
+        data = self.market_snapshot.get(symbol)
+        ticker = data["ticker"] if data else self.get_ticker(symbol)
         if not ticker:
             return {"success": False, "error": "Failed to get ticker price"}
         
-        exec_price = price if price and order_type == "LIMIT" else ticker["last"]
-        base_currency = symbol.split("_")[0]
-        quote_currency = symbol.split("_")[1]
+        pool = self.pool_depth(symbol) or {}  # the real pool's depth and fee when read on-chain
+        fill = self.fill_simulator.simulate(side, quantity, ticker,
+                                            candles=data.get("candles") if data else None,
+                                            limit_price=price if order_type == "LIMIT" else None,
+                                            liquidity=pool.get("liquidity"), fee_rate=pool.get("fee"))
+        if not fill["filled"]:
+            return {"success": False, "error": fill.get("error", "Order not filled")}
+        
+        filled = fill["filled"]
+        exec_price = fill["price"]
+        fee = fill["fee"]
         
         try:
-            if side == "BUY":
-                cost = quantity * exec_price
-                if self.paper_balance.get(quote_currency, 0) < cost:
-                    return {"success": False, "error": "Insufficient balance"}
-                
-                self.paper_balance[quote_currency] -= cost
-                self.paper_balance[base_currency] = self.paper_balance.get(base_currency, 0) + quantity
-            
-            elif side == "SELL":
-                if self.paper_balance.get(base_currency, 0) < quantity:
-                    return {"success": False, "error": "Insufficient balance"}
-                
-                self.paper_balance[base_currency] -= quantity
-                revenue = quantity * exec_price
-                self.paper_balance[quote_currency] = self.paper_balance.get(quote_currency, 0) + revenue
+            error = self.apply_paper_fill(symbol, side, filled, exec_price, fee)
+            if error:
+                return {"success": False, "error": error}
             
             order_id = f"UNI_PAPER_{int(time.time() * 1000)}"
-            logger.info(f"Paper trade: {side} {quantity:.6f} {symbol} @ ${exec_price:.2f}")
+            logger.info("Paper trade: %s %.6f %s @ $%.2f (fee $%.4f%s)", side, filled, symbol, exec_price,
+                        fee, ", partial" if fill["partial"] else "")
             
             return {
                 "success": True,
                 "order_id": order_id,
                 "symbol": symbol,
                 "side": side,
-                "quantity": quantity,
+                "quantity": filled,
+                "requested_quantity": quantity,
                 "price": exec_price,
+                "fee": fee,
+                "partial": fill["partial"],
                 "paper_trade": True,
                 "dex": "Uniswap"
             }
@@ -199,18 +358,40 @@ class UniswapTrader:
             logger.error(f"Paper trade failed: {e}")
             return {"success": False, "error": str(e)}
     
+    def apply_paper_fill(self, symbol: str, side: str, quantity: float,
+                         price: float, fee: float = 0.0) -> Optional[str]:
+        """Move paper balances for a fill; returns an error message if unfunded"""
+        base_currency, quote_currency = symbol.split("_")
+        return self.paper_balance.apply_fill(base_currency, quote_currency, side, quantity, price, fee)
+    
+    def get_state(self) -> Dict:
+        """Paper account state for checkpointing"""
+        return {"ledger": self.paper_balance.get_state()}
+    
+    def set_state(self, state: Dict):
+        if "ledger" in state:
+            self.paper_balance.set_state(state["ledger"])
+        else:  # checkpoint from before the integer ledger
+            self.paper_balance = Ledger(state["paper_balance"])
+    
     def get_market_data(self, symbols: List[str]) -> Dict:
         """Get comprehensive market data for multiple symbols"""
         market_data = {}
+        self.refresh_pools()
+        self.refresh_onchain()
         
         for symbol in symbols:
             ticker = self.get_ticker(symbol)
             candles = self.get_candlesticks(symbol, "1h", 50)
             
             if ticker and candles:
+                self.candle_aggregator.ingest_tick(symbol, ticker["last"])
                 market_data[symbol] = {
                     "ticker": ticker,
-                    "candles": candles
+                    "candles": candles,
+                    "timeframes": {tf: series[-CANDLE_WINDOW:] for tf, series
+                                   in self.candle_aggregator.get_timeframes(symbol).items()}
                 }
         
+        self.set_market_snapshot(market_data)
         return market_data